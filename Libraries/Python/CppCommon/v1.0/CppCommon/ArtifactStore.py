@@ -0,0 +1,646 @@
+# ----------------------------------------------------------------------
+# |
+# |  ArtifactStore.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 16:04:27
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Content-addressed store of build outputs, allowing a build with the same inputs
+to be restored rather than rebuilt.
+
+Entries are located in two steps:
+
+    1)  A manifest is selected by a key calculated from the CMake files, the
+        toolchain, the compiler, and the configuration values (see `CalculateKey`);
+        these are inexpensive to calculate and do not require a configured build.
+
+    2)  Each manifest contains one or more entries that record the dependencies
+        (source, header, and CMake files) discovered when the outputs were built and
+        the hash of each. An entry is selected if all of its dependencies are
+        unchanged.
+
+Paths within the source root (the root of the repository) are recorded relative
+to it, so that entries can be used by a checkout at a different location.
+
+An artifact contains the outputs along with the other files required to run them
+(for example, shared libraries and CTest files). Outputs are restored via hardlinks
+(falling back to copies when hardlinks are not supported), files that contain the
+fullpaths of the output or source root dirs are rewritten for the restoring
+checkout, and the size of the store is bounded by evicting the least recently
+used artifacts.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+from CommonEnvironment import Process
+
+from CppCommon import CMakeFingerprint
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variable that specifies the store directory
+STORE_DIR_ENVIRONMENT_VARIABLE              = "DEVELOPMENT_ENVIRONMENT_CPP_ARTIFACT_STORE_DIR"
+
+# Environment variable that specifies the maximum size of the store
+MAX_SIZE_ENVIRONMENT_VARIABLE               = "DEVELOPMENT_ENVIRONMENT_CPP_ARTIFACT_STORE_MAX_SIZE_MB"
+
+DEFAULT_MAX_SIZE_MB                         = 4096
+
+# Maximum number of entries (each with different dependency content) retained in a manifest
+MAX_MANIFEST_ENTRIES                        = 16
+
+# Version of the store layout; modify this value to invalidate existing entries
+_STORE_VERSION                              = 2
+
+# File written to the root of each repository by RepositoryBootstrap
+_REPOSITORY_ID_FILENAME                     = "__RepositoryId__"
+
+# Files within an artifact dir
+_ARTIFACT_INDEX_FILENAME                    = "index.json"
+_ARTIFACT_FILES_DIRNAME                     = "files"
+
+# File written to the output dir that lists the files restored via hardlinks
+RESTORED_FILENAME                           = "ArtifactStore.restored.json"
+
+# Compilers searched for (in order) by CMake when the corresponding environment
+# variable isn't set.
+_DEFAULT_COMPILER_NAMES                     = [
+    ("CXX", ["c++", "g++", "cl", "clang++"]),
+    ("CC", ["cc", "gcc", "cl", "clang"]),
+]
+
+_compiler_identities                        = {}
+_compiler_identities_lock                   = threading.Lock()
+
+# ----------------------------------------------------------------------
+def GetMaxSizeMB():
+    return int(os.getenv(MAX_SIZE_ENVIRONMENT_VARIABLE) or DEFAULT_MAX_SIZE_MB)
+
+
+# ----------------------------------------------------------------------
+def GetSourceRoot(cmake_dir):
+    """Returns the root of the repository that contains the CMake directory (or the CMake directory if it isn't within a repository)"""
+
+    cmake_dir = os.path.normpath(os.path.abspath(cmake_dir))
+
+    directory = cmake_dir
+
+    while True:
+        if os.path.isfile(os.path.join(directory, _REPOSITORY_ID_FILENAME)):
+            return directory
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return cmake_dir
+
+        directory = parent
+
+
+# ----------------------------------------------------------------------
+def GetCompilerIdentity(environment=None):
+    """\
+    Returns a string that identifies the C++ and C compilers used when configuring
+    a build dir in the environment (the compiler name, the fullpath of each compiler,
+    and the version information it reports).
+    """
+
+    if environment is None:
+        environment = os.environ
+
+    identity = [environment.get("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME")]
+
+    for variable_name, default_names in _DEFAULT_COMPILER_NAMES:
+        compiler = environment.get(variable_name)
+
+        if compiler:
+            compiler = shutil.which(compiler, path=environment.get("PATH")) or compiler
+        else:
+            for default_name in default_names:
+                compiler = shutil.which(default_name, path=environment.get("PATH"))
+                if compiler is not None:
+                    break
+
+        if compiler is None:
+            identity.append(None)
+            continue
+
+        with _compiler_identities_lock:
+            version = _compiler_identities.get(compiler)
+
+        if version is None:
+            # The output is used regardless of the result, as not all compilers
+            # support '--version' (cl displays its version in any case).
+            version = Process.Execute('"{}" --version'.format(compiler))[1].strip()
+
+            with _compiler_identities_lock:
+                _compiler_identities[compiler] = version
+
+        identity.append([compiler, version])
+
+    return json.dumps(identity)
+
+
+# ----------------------------------------------------------------------
+def CalculateKey(
+    cmake_dir,
+    values,
+    compiler_identity,
+    root_dir,
+    environment=None,
+):
+    """\
+    Returns the key used to locate the manifest for a CMake directory built with the
+    provided values by the compiler (see `GetCompilerIdentity`); paths within `root_dir`
+    do not impact the key.
+    """
+
+    fingerprint = CMakeFingerprint.Calculate(
+        cmake_dir,
+        values=values,
+        environment=environment,
+        root_dir=root_dir,
+    )
+
+    return hashlib.sha256(
+        json.dumps([_STORE_VERSION, fingerprint, compiler_identity], sort_keys=True).encode("utf-8"),
+    ).hexdigest()
+
+
+# ----------------------------------------------------------------------
+def Lookup(store_dir, key, root_dir):
+    """\
+    Returns (artifact_id, output_relpaths) for the most recent entry whose dependencies
+    are unchanged or None if a matching entry does not exist.
+    """
+
+    manifest = _LoadManifest(store_dir, key)
+
+    hash_cache = {}
+
+    for entry in manifest:
+        artifact_dir = _GetArtifactDir(store_dir, entry["artifact"])
+        if not os.path.isdir(artifact_dir):
+            continue
+
+        if all(
+            _HashFile(_FromStoredFilename(filename, root_dir), hash_cache) == file_hash
+            for filename, file_hash in entry["dependencies"].items()
+        ):
+            return entry["artifact"], entry["outputs"]
+
+    return None
+
+
+# ----------------------------------------------------------------------
+def Restore(store_dir, artifact_id, output_dir, root_dir):
+    """Restores the artifact's files to the output dir, returning True if all of the files were restored"""
+
+    artifact_dir = _GetArtifactDir(store_dir, artifact_id)
+    files_dir = os.path.join(artifact_dir, _ARTIFACT_FILES_DIRNAME)
+
+    try:
+        with open(os.path.join(artifact_dir, _ARTIFACT_INDEX_FILENAME)) as f:
+            index = json.load(f)
+
+        # Files linked to the store must be removed before the output dir is built again
+        # (see `RemoveRestored`); record them before they are restored.
+        _WriteRestored(output_dir, _ReadRestored(output_dir) + index["files"])
+
+        for relpath in index["files"]:
+            source = os.path.join(files_dir, relpath)
+            dest = os.path.join(output_dir, relpath)
+
+            FileSystem.MakeDirs(os.path.dirname(dest))
+            FileSystem.RemoveFile(dest)
+
+            try:
+                os.link(source, dest)
+            except (OSError, AttributeError):
+                # Hardlinks aren't supported across file systems (or on some platforms)
+                shutil.copy2(source, dest)
+
+        replacements = [
+            (placeholder, path)
+            for path, placeholder in _GetPathReplacements(output_dir, root_dir)
+        ]
+
+        for relpath in index["relocated_files"]:
+            with open(os.path.join(files_dir, relpath), "rb") as f:
+                content = f.read()
+
+            for placeholder, path in replacements:
+                content = content.replace(placeholder, path)
+
+            dest = os.path.join(output_dir, relpath)
+
+            FileSystem.MakeDirs(os.path.dirname(dest))
+            FileSystem.RemoveFile(dest)
+
+            with open(dest, "wb") as f:
+                f.write(content)
+
+        # Record the access time for eviction
+        os.utime(artifact_dir, None)
+
+    except (OSError, IOError, ValueError, KeyError):
+        return False
+
+    return True
+
+
+# ----------------------------------------------------------------------
+def RemoveRestored(output_dir):
+    """\
+    Removes files restored to the output dir via hardlinks, so that a subsequent build
+    doesn't modify the content of the store in place.
+    """
+
+    for relpath in _ReadRestored(output_dir):
+        FileSystem.RemoveFile(os.path.join(output_dir, relpath))
+
+    FileSystem.RemoveFile(os.path.join(output_dir, RESTORED_FILENAME))
+
+
+# ----------------------------------------------------------------------
+def Store(
+    store_dir,
+    key,
+    root_dir,
+    output_dir,
+    output_filenames,
+    dependencies,
+    additional_filenames=None,
+    relocated_filenames=None,
+    max_size_mb=None,
+):
+    """\
+    Adds the outputs to the store, returning the artifact id or None if the outputs
+    could not be stored.
+
+    `dependencies` are the fullpaths of all files (other than those hashed by
+    `CalculateKey`) that impacted the outputs.
+
+    `additional_filenames` are other files within the output dir required to run the
+    outputs (for example, shared libraries), while `relocated_filenames` are files within
+    the output dir that contain the fullpaths of the output dir or root dir (for example,
+    CTest files); these paths are replaced when the files are restored.
+    """
+
+    output_relpaths = _GetRelpaths(output_dir, output_filenames)
+    additional_relpaths = _GetRelpaths(output_dir, additional_filenames or [])
+    relocated_relpaths = _GetRelpaths(output_dir, relocated_filenames or [])
+
+    if output_relpaths is None or additional_relpaths is None or relocated_relpaths is None:
+        return None
+
+    file_relpaths = sorted(set(output_relpaths + additional_relpaths))
+
+    hash_cache = {}
+
+    dependency_hashes = {}
+
+    for filename in sorted(set(dependencies)):
+        file_hash = _HashFile(filename, hash_cache)
+        if file_hash is None:
+            return None
+
+        dependency_hashes[_ToStoredFilename(filename, root_dir)] = file_hash
+
+    artifact_id = hashlib.sha256(
+        json.dumps(
+            [key, dependency_hashes, output_relpaths, file_relpaths, relocated_relpaths],
+            sort_keys=True,
+        ).encode("utf-8"),
+    ).hexdigest()
+
+    artifact_dir = _GetArtifactDir(store_dir, artifact_id)
+
+    if not os.path.isdir(artifact_dir):
+        temp_dir = os.path.join(store_dir, "tmp", str(uuid.uuid4()))
+        files_dir = os.path.join(temp_dir, _ARTIFACT_FILES_DIRNAME)
+
+        try:
+            for relpath in file_relpaths:
+                dest = os.path.join(files_dir, relpath)
+
+                FileSystem.MakeDirs(os.path.dirname(dest))
+
+                # Copy rather than link, as the outputs may be modified by a subsequent build
+                shutil.copy2(os.path.join(output_dir, relpath), dest)
+
+            replacements = _GetPathReplacements(output_dir, root_dir)
+
+            for relpath in relocated_relpaths:
+                with open(os.path.join(output_dir, relpath), "rb") as f:
+                    content = f.read()
+
+                for path, placeholder in replacements:
+                    content = content.replace(path, placeholder)
+
+                dest = os.path.join(files_dir, relpath)
+
+                FileSystem.MakeDirs(os.path.dirname(dest))
+
+                with open(dest, "wb") as f:
+                    f.write(content)
+
+            with open(os.path.join(temp_dir, _ARTIFACT_INDEX_FILENAME), "w") as f:
+                json.dump(
+                    {
+                        "files": file_relpaths,
+                        "relocated_files": relocated_relpaths,
+                    },
+                    f,
+                )
+
+            _MakeDirs(os.path.dirname(artifact_dir))
+
+            try:
+                os.rename(temp_dir, artifact_dir)
+            except OSError:
+                # Another process stored the same artifact
+                if not os.path.isdir(artifact_dir):
+                    raise
+
+        except (OSError, IOError):
+            return None
+
+        finally:
+            FileSystem.RemoveTree(temp_dir)
+
+    # Update the manifest; the most recent entry is first
+    manifest = [
+        entry
+        for entry in _LoadManifest(store_dir, key)
+        if entry["artifact"] != artifact_id
+    ]
+
+    manifest.insert(
+        0,
+        {
+            "artifact": artifact_id,
+            "dependencies": dependency_hashes,
+            "outputs": output_relpaths,
+        },
+    )
+
+    _SaveManifest(store_dir, key, manifest[:MAX_MANIFEST_ENTRIES])
+
+    Evict(store_dir, GetMaxSizeMB() if max_size_mb is None else max_size_mb)
+
+    return artifact_id
+
+
+# ----------------------------------------------------------------------
+def Evict(store_dir, max_size_mb):
+    """Removes the least recently used artifacts until the store is no larger than `max_size_mb`"""
+
+    artifacts_dir = os.path.join(store_dir, "artifacts")
+    if not os.path.isdir(artifacts_dir):
+        return
+
+    artifacts = []
+    total_size = 0
+
+    for prefix in os.listdir(artifacts_dir):
+        prefix_dir = os.path.join(artifacts_dir, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+
+        for artifact_id in os.listdir(prefix_dir):
+            artifact_dir = os.path.join(prefix_dir, artifact_id)
+
+            size = sum(
+                os.path.getsize(filename)
+                for filename in FileSystem.WalkFiles(artifact_dir)
+            )
+
+            artifacts.append((os.path.getmtime(artifact_dir), size, artifact_dir))
+            total_size += size
+
+    max_size = max_size_mb * 1024 * 1024
+
+    for _, size, artifact_dir in sorted(artifacts):
+        if total_size <= max_size:
+            break
+
+        # Manifest entries that reference this artifact are ignored by `Lookup` and
+        # pruned when the manifest is next updated.
+        FileSystem.RemoveTree(artifact_dir)
+        total_size -= size
+
+
+# ----------------------------------------------------------------------
+def GetNinjaDependencies(build_dir):
+    """\
+    Returns the fullpaths of files that were discovered by the compiler while building
+    (via depfiles or /showIncludes) or None if the information is not available.
+    """
+
+    if not os.path.isfile(os.path.join(build_dir, ".ninja_deps")):
+        return None
+
+    ninja = "ninja"
+
+    cmake_cache_filename = os.path.join(build_dir, "CMakeCache.txt")
+    if os.path.isfile(cmake_cache_filename):
+        with open(cmake_cache_filename) as f:
+            for line in f:
+                if line.startswith("CMAKE_MAKE_PROGRAM:"):
+                    ninja = line.split("=", 1)[-1].strip()
+                    break
+
+    result, output = Process.Execute('"{}" -C "{}" -t deps'.format(ninja, build_dir))
+    if result != 0:
+        return None
+
+    dependencies = set()
+
+    # Output is in the form:
+    #
+    #     <output>: #deps <count>, deps mtime <time> (VALID)
+    #         <dependency>
+    #         ...
+    #
+    for line in output.split("\n"):
+        if not line.startswith(" "):
+            continue
+
+        line = line.strip()
+        if line:
+            dependencies.add(os.path.normpath(os.path.join(build_dir, line)))
+
+    return sorted(dependencies)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _GetArtifactDir(store_dir, artifact_id):
+    return os.path.join(store_dir, "artifacts", artifact_id[:2], artifact_id)
+
+
+# ----------------------------------------------------------------------
+def _GetRelpaths(output_dir, filenames):
+    """Returns the paths of the files relative to the output dir or None if any are outside of it or do not exist"""
+
+    relpaths = []
+
+    for filename in filenames:
+        relpath = os.path.relpath(filename, output_dir)
+
+        if relpath.startswith(os.pardir) or not os.path.isfile(filename):
+            return None
+
+        relpaths.append(relpath)
+
+    return relpaths
+
+
+# ----------------------------------------------------------------------
+def _ToStoredFilename(filename, root_dir):
+    """Returns the filename relative to the root dir if it is within it; fullpaths outside of the root dir are unchanged"""
+
+    relpath = os.path.relpath(filename, root_dir)
+    if relpath.startswith(os.pardir) or os.path.isabs(relpath):
+        return filename
+
+    return relpath
+
+
+# ----------------------------------------------------------------------
+def _FromStoredFilename(filename, root_dir):
+    if os.path.isabs(filename):
+        return filename
+
+    return os.path.join(root_dir, filename)
+
+
+# ----------------------------------------------------------------------
+def _GetPathReplacements(output_dir, root_dir):
+    """\
+    Returns a list of (path, placeholder) bytes used to relocate file content. The
+    output dir is replaced before the root dir, as it is commonly within the root dir.
+    """
+
+    replacements = []
+
+    for name, path in [("OUTPUT_DIR", output_dir), ("ROOT_DIR", root_dir)]:
+        path = os.path.normpath(os.path.abspath(path))
+
+        # CMake uses forward slashes on all platforms
+        for suffix, potential_path in [("", path), ("_CMAKE", path.replace(os.path.sep, "/"))]:
+            replacements.append(
+                (
+                    potential_path.encode("utf-8"),
+                    "@ARTIFACT_STORE_{}{}@".format(name, suffix).encode("utf-8"),
+                ),
+            )
+
+    return replacements
+
+
+# ----------------------------------------------------------------------
+def _ReadRestored(output_dir):
+    filename = os.path.join(output_dir, RESTORED_FILENAME)
+    if not os.path.isfile(filename):
+        return []
+
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (ValueError, IOError):
+        return []
+
+
+# ----------------------------------------------------------------------
+def _WriteRestored(output_dir, relpaths):
+    FileSystem.MakeDirs(output_dir)
+
+    with open(os.path.join(output_dir, RESTORED_FILENAME), "w") as f:
+        json.dump(sorted(set(relpaths)), f)
+
+
+# ----------------------------------------------------------------------
+def _GetManifestFilename(store_dir, key):
+    return os.path.join(store_dir, "manifests", key[:2], "{}.json".format(key))
+
+
+# ----------------------------------------------------------------------
+def _LoadManifest(store_dir, key):
+    filename = _GetManifestFilename(store_dir, key)
+    if not os.path.isfile(filename):
+        return []
+
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (ValueError, IOError):
+        return []
+
+
+# ----------------------------------------------------------------------
+def _SaveManifest(store_dir, key, manifest):
+    filename = _GetManifestFilename(store_dir, key)
+
+    _MakeDirs(os.path.dirname(filename))
+
+    # Write to a temporary file so that concurrent readers never see a partial manifest
+    temp_filename = "{}.{}.tmp".format(filename, uuid.uuid4())
+
+    with open(temp_filename, "w") as f:
+        json.dump(manifest, f)
+
+    os.replace(temp_filename, filename)
+
+
+# ----------------------------------------------------------------------
+def _MakeDirs(path):
+    try:
+        FileSystem.MakeDirs(path)
+    except OSError:
+        # Another process may have created the directory
+        if not os.path.isdir(path):
+            raise
+
+
+# ----------------------------------------------------------------------
+def _HashFile(filename, hash_cache):
+    """Returns the hash of the file's content or None if the file does not exist"""
+
+    file_hash = hash_cache.get(filename, hash_cache)
+    if file_hash is not hash_cache:
+        return file_hash
+
+    if os.path.isfile(filename):
+        hasher = hashlib.sha256()
+
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                hasher.update(chunk)
+
+        file_hash = hasher.hexdigest()
+    else:
+        file_hash = None
+
+    hash_cache[filename] = file_hash
+    return file_hash
@@ -0,0 +1,442 @@
+# ----------------------------------------------------------------------
+# |
+# |  BenchmarkHistory.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 19:12:44
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Append-only history of benchmark results, used to detect performance regressions.
+
+Results are stored in a SQLite database specified by an environment variable;
+history is not recorded (and regressions are not detected) when the environment
+variable is not defined.
+
+A benchmark has regressed when its mean is both:
+
+    1)  Slower than the mean of its baseline (the most recent results recorded
+        on the same machine for the same build identity - the compiler,
+        architecture, and configuration) by more than the threshold percentage.
+
+    2)  Outside of the one-sided 99% prediction interval calculated from the
+        baseline, which ensures that the change is significant given the
+        variation observed between previous runs.
+
+Results that regressed are recorded but excluded from subsequent baselines, so
+that a regression continues to be reported until it is fixed.
+
+A slowdown that is expected (for example, when a benchmark is changed to measure
+more work) is accepted by running the benchmarks with the rebaseline environment
+variable defined (for example, DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_REBASELINE=1).
+The results of that run are not compared to the baseline and start a new baseline;
+previous results are retained in the history but are no longer included in the
+baseline. Regressions are detected again once the new baseline contains enough
+results.
+"""
+
+import math
+import os
+import platform
+import re
+import sqlite3
+import sys
+import textwrap
+import time
+
+from collections import namedtuple
+
+import six
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variable that specifies the history database filename
+FILENAME_ENVIRONMENT_VARIABLE               = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_HISTORY_FILENAME"
+
+# Environment variable that specifies the slowdown (as a percentage) above which
+# a significant change is considered to be a regression
+THRESHOLD_ENVIRONMENT_VARIABLE              = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_REGRESSION_THRESHOLD"
+
+DEFAULT_THRESHOLD_PERCENT                   = 10.0
+
+# Environment variable that, when defined, records the results as the start of a new
+# baseline rather than comparing them to the existing baseline
+REBASELINE_ENVIRONMENT_VARIABLE             = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_REBASELINE"
+
+# Maximum number of previous results that constitute a baseline
+BASELINE_SIZE                               = 10
+
+# Minimum number of previous results required before regressions are detected
+MIN_BASELINE_SIZE                           = 3
+
+# Prefix of the line written to the test output that contains the build identity
+BUILD_IDENTITY_PREFIX                       = "CppCommon benchmark build: "
+
+_build_identity_regex                       = re.compile(
+    r"^{}(?P<identity>\S*)\s*$".format(re.escape(BUILD_IDENTITY_PREFIX)),
+    re.MULTILINE,
+)
+
+# ----------------------------------------------------------------------
+Regression                                  = namedtuple(
+    "Regression",
+    [
+        "suite",
+        "name",
+        "units",
+        "baseline_mean",
+        "mean",
+        "percent",
+    ],
+)
+
+# One-sided 99% critical values of the t distribution, by degrees of freedom
+_T_CRITICAL_VALUES                          = [
+    (1, 31.821),
+    (2, 6.965),
+    (3, 4.541),
+    (4, 3.747),
+    (5, 3.365),
+    (6, 3.143),
+    (7, 2.998),
+    (8, 2.896),
+    (9, 2.821),
+    (10, 2.764),
+    (15, 2.602),
+    (20, 2.528),
+    (30, 2.457),
+]
+
+
+# ----------------------------------------------------------------------
+def GetFilename():
+    """Returns the history database filename or None if history should not be recorded"""
+    return os.getenv(FILENAME_ENVIRONMENT_VARIABLE) or None
+
+
+# ----------------------------------------------------------------------
+def GetThresholdPercent():
+    return float(os.getenv(THRESHOLD_ENVIRONMENT_VARIABLE) or DEFAULT_THRESHOLD_PERCENT)
+
+
+# ----------------------------------------------------------------------
+def IsRebaseline():
+    """Returns True if results should start a new baseline"""
+    return os.getenv(REBASELINE_ENVIRONMENT_VARIABLE, "0") not in ["", "0"]
+
+
+# ----------------------------------------------------------------------
+def GetBuildIdentity(context):
+    """\
+    Returns a string that identifies the build that generates benchmark results: the
+    compiler and architecture of the active environment and the configuration
+    (including LTO and PGO) described by the compiler context.
+    """
+
+    configuration = ["Debug" if context.get("is_debug", False) else "Release"]
+
+    if context.get("lto", None):
+        configuration.append("LTO-{}".format(context["lto"]))
+    if context.get("is_pgo", False):
+        configuration.append("PGO")
+    if context.get("is_profile", False):
+        configuration.append("Profile")
+
+    return ",".join(
+        # The identity is written to the output via 'echo', so limit the characters used
+        re.sub(r"[^\w.+-]", "-", value)
+        for value in [
+            os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME") or "",
+            os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_ARCHITECTURE") or "",
+            "+".join(configuration),
+        ]
+    )
+
+
+# ----------------------------------------------------------------------
+def CreateBuildIdentityCommandLine(context):
+    """\
+    Returns a command line that writes the build identity to the test output, where it
+    is retrieved by `ExtractBuildIdentity` once the tests have completed (test parsers
+    only have access to the output).
+    """
+
+    return "echo {}{}".format(BUILD_IDENTITY_PREFIX, GetBuildIdentity(context))
+
+
+# ----------------------------------------------------------------------
+def ExtractBuildIdentity(test_data):
+    """Returns the build identity written to the test output or an empty string if it doesn't exist"""
+
+    match = _build_identity_regex.search(test_data)
+    if not match:
+        return ""
+
+    return match.group("identity")
+
+
+# ----------------------------------------------------------------------
+def Update(
+    benchmark_data,
+    build_identity="",
+    output_stream=sys.stdout,
+):
+    """\
+    Records the benchmark data (as returned by a test parser) in the history database
+    (if one has been specified), returning False if any benchmarks have regressed.
+    """
+
+    filename = GetFilename()
+    if filename is None:
+        return True
+
+    rebaseline = IsRebaseline()
+
+    regressions = Record(
+        filename,
+        benchmark_data,
+        GetThresholdPercent(),
+        build_identity=build_identity,
+        rebaseline=rebaseline,
+    )
+
+    if rebaseline:
+        output_stream.write(
+            "\nBenchmark results were recorded as the new baseline for '{}' in '{}'.\n".format(
+                build_identity,
+                filename,
+            ),
+        )
+
+    if not regressions:
+        return True
+
+    output_stream.write(
+        textwrap.dedent(
+            """\
+
+            Benchmark regressions (compared to the baseline for '{}' in '{}'):
+
+            """,
+        ).format(build_identity, filename),
+    )
+
+    for regression in regressions:
+        output_stream.write(
+            "    {suite} - {name}: {baseline_mean:.2f} {units} -> {mean:.2f} {units} (+{percent:.1f}%)\n".format(
+                **regression._asdict()
+            ),
+        )
+
+    output_stream.write("\n")
+
+    return False
+
+
+# ----------------------------------------------------------------------
+def Record(
+    filename,
+    benchmark_data,
+    threshold_percent,
+    build_identity="",
+    machine=None,
+    timestamp=None,
+    rebaseline=False,
+):
+    """\
+    Adds the benchmark data to the history and returns a list of Regressions
+    (calculated relative to the results for the build identity that existed before
+    this invocation). When `rebaseline` is True, the data is not compared to the
+    baseline and previous results are excluded from subsequent baselines.
+    """
+
+    machine = machine or platform.node()
+    timestamp = timestamp or time.time()
+
+    regressions = []
+
+    with _Open(filename) as connection:
+        for suite, stats in six.iteritems(benchmark_data):
+            for stat in stats:
+                key = (machine, build_identity, suite, stat.Name, stat.Units)
+
+                if rebaseline:
+                    regression = None
+                else:
+                    # The baseline begins with the most recent rebaselined result
+                    baseline = [
+                        row[0]
+                        for row in connection.execute(
+                            textwrap.dedent(
+                                """\
+                                SELECT mean FROM results
+                                WHERE machine = ? AND build = ? AND suite = ? AND name = ? AND units = ? AND regressed = 0
+                                    AND id >= (
+                                        SELECT COALESCE(MAX(id), 0) FROM results
+                                        WHERE machine = ? AND build = ? AND suite = ? AND name = ? AND units = ? AND rebaseline = 1
+                                    )
+                                ORDER BY id DESC
+                                LIMIT ?
+                                """,
+                            ),
+                            key + key + (BASELINE_SIZE,),
+                        )
+                    ]
+
+                    regression = _CalculateRegression(
+                        suite,
+                        stat.Name,
+                        stat.Units,
+                        stat.Mean,
+                        baseline,
+                        threshold_percent,
+                    )
+                    if regression is not None:
+                        regressions.append(regression)
+
+                connection.execute(
+                    "INSERT INTO results (timestamp, machine, build, suite, name, units, mean, regressed, rebaseline) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        timestamp,
+                        machine,
+                        build_identity,
+                        suite,
+                        stat.Name,
+                        stat.Units,
+                        stat.Mean,
+                        0 if regression is None else 1,
+                        1 if rebaseline else 0,
+                    ),
+                )
+
+    return regressions
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+class _Open(object):
+    """Opens the database, committing all changes on success"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, filename):
+        self._filename                      = filename
+        self._connection                    = None
+
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        dirname = os.path.dirname(self._filename)
+        if dirname and not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Another process may have created the directory
+                if not os.path.isdir(dirname):
+                    raise
+
+        # Multiple tests may be running concurrently
+        self._connection = sqlite3.connect(self._filename, timeout=60)
+
+        self._connection.execute(
+            textwrap.dedent(
+                """\
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    machine TEXT NOT NULL,
+                    build TEXT NOT NULL DEFAULT '',
+                    suite TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    units TEXT NOT NULL,
+                    mean REAL NOT NULL,
+                    regressed INTEGER NOT NULL DEFAULT 0,
+                    rebaseline INTEGER NOT NULL DEFAULT 0
+                )
+                """,
+            ),
+        )
+
+        # Add columns missing from databases created by previous versions
+        column_names = set(row[1] for row in self._connection.execute("PRAGMA table_info(results)"))
+
+        for column_name, column_definition in [
+            ("build", "TEXT NOT NULL DEFAULT ''"),
+            ("regressed", "INTEGER NOT NULL DEFAULT 0"),
+            ("rebaseline", "INTEGER NOT NULL DEFAULT 0"),
+        ]:
+            if column_name not in column_names:
+                self._connection.execute(
+                    "ALTER TABLE results ADD COLUMN {} {}".format(column_name, column_definition),
+                )
+
+        self._connection.execute("DROP INDEX IF EXISTS results_baseline")
+
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_build_baseline ON results (machine, build, suite, name, units, id)",
+        )
+
+        return self._connection
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._connection.commit()
+        finally:
+            self._connection.close()
+
+
+# ----------------------------------------------------------------------
+def _CalculateRegression(suite, name, units, mean, baseline, threshold_percent):
+    """Returns a Regression if the mean has regressed relative to the baseline or None if it has not"""
+
+    if len(baseline) < MIN_BASELINE_SIZE:
+        return None
+
+    baseline_mean = sum(baseline) / float(len(baseline))
+    if baseline_mean <= 0.0:
+        return None
+
+    percent = (mean - baseline_mean) / baseline_mean * 100.0
+    if percent <= threshold_percent:
+        return None
+
+    # The difference is large enough to be a regression; ensure that it is also
+    # significant given the variation between runs in the baseline.
+    baseline_deviation = math.sqrt(
+        sum((value - baseline_mean) ** 2 for value in baseline) / (len(baseline) - 1),
+    )
+
+    upper_bound = baseline_mean + (
+        _GetTCriticalValue(len(baseline) - 1)
+        * baseline_deviation
+        * math.sqrt(1.0 + 1.0 / len(baseline))
+    )
+
+    if mean <= upper_bound:
+        return None
+
+    return Regression(suite, name, units, baseline_mean, mean, percent)
+
+
+# ----------------------------------------------------------------------
+def _GetTCriticalValue(degrees_of_freedom):
+    # Use the value associated with the closest smaller degrees of freedom, which
+    # is more conservative.
+    for df, value in reversed(_T_CRITICAL_VALUES):
+        if degrees_of_freedom >= df:
+            return value
+
+    assert False, degrees_of_freedom
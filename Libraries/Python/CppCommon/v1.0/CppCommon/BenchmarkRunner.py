@@ -0,0 +1,504 @@
+# ----------------------------------------------------------------------
+# |
+# |  BenchmarkRunner.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 20:03:17
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Runs a Catch2 benchmark executable in a way that produces stable results.
+
+    - The process is pinned to specific CPUs (isolated CPUs are used when available).
+    - The executable is invoked (and its results discarded) to warm up caches
+      before results are measured.
+    - The executable is invoked multiple times; the results of each invocation
+      (generated by the Catch2 XML reporter) are aggregated into a single XML
+      document written to stdout.
+    - Results that vary too much between invocations are flagged as noisy.
+    - Results are tagged with the CPUs that they ran on.
+
+Benchmarks can be run concurrently by CTest, with each benchmark pinned to its own
+physical core (or NUMA node). CTest allocates the resources described by the file
+written by `WriteResourceSpecFile` to tests with the "RESOURCE_GROUPS" property,
+and the runner pins the process to the allocated CPUs.
+
+Settings are read from environment variables so that the command line can be
+embedded in build files (for example, CTest test commands) and configured when
+the benchmarks are run.
+
+This module is limited to the python standard library so that it is inexpensive
+to launch.
+
+Usage:
+    python BenchmarkRunner.py <command line...>
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from xml.etree import ElementTree
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = os.path.realpath(__file__)
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variable that specifies the CPUs (for example, "2,3" or "2-3") that
+# benchmarks are pinned to
+CPUS_ENVIRONMENT_VARIABLE                   = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_CPUS"
+
+# Environment variable that specifies the number of invocations used to warm up
+WARMUP_RUNS_ENVIRONMENT_VARIABLE            = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_WARMUP_RUNS"
+
+# Environment variable that specifies the number of invocations whose results are aggregated
+REPETITIONS_ENVIRONMENT_VARIABLE            = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_REPETITIONS"
+
+# Environment variables passed to Catch2 as '--benchmark-samples' and '--benchmark-resamples'
+SAMPLES_ENVIRONMENT_VARIABLE                = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_SAMPLES"
+RESAMPLES_ENVIRONMENT_VARIABLE              = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_RESAMPLES"
+
+# Environment variable that specifies the maximum coefficient of variation (as a
+# percentage) of the means of each invocation before a result is considered noisy
+MAX_CV_ENVIRONMENT_VARIABLE                 = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_MAX_CV"
+
+# Environment variable that causes the runner to fail when noisy results are encountered
+FAIL_ON_NOISE_ENVIRONMENT_VARIABLE          = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_FAIL_ON_NOISE"
+
+# Environment variable that specifies how benchmarks are run concurrently: "core" (each
+# benchmark is pinned to a different physical core), "numa" (each benchmark is pinned to
+# a different NUMA node), or "none" (benchmarks are run one at a time)
+PARALLEL_MODE_ENVIRONMENT_VARIABLE          = "DEVELOPMENT_ENVIRONMENT_CPP_BENCHMARK_PARALLEL_MODE"
+
+# CTest resource type used by benchmark tests (see 'BuildHelpers.cmake::build_tests')
+RESOURCE_TYPE                               = "cores"
+
+RESOURCE_SPEC_FILENAME                      = "CppCommon_benchmark_resources.json"
+
+DEFAULT_PARALLEL_MODE                       = "core"
+DEFAULT_WARMUP_RUNS                         = 1
+DEFAULT_REPETITIONS                         = 3
+DEFAULT_MAX_CV_PERCENT                      = 5.0
+
+# ----------------------------------------------------------------------
+def CreateCommandLine(command_line):
+    """Returns a command line that invokes `command_line` via the runner"""
+
+    return '"{python}" "{script}" {command_line}'.format(
+        python=sys.executable,
+        script=_script_fullpath,
+        command_line=command_line,
+    )
+
+
+# ----------------------------------------------------------------------
+def GetLauncherCMakeArgs():
+    """Returns the cmake args that cause the benchmark tests created by 'BuildHelpers.cmake::build_tests' to be invoked via the runner"""
+
+    return [
+        '"-DCppCommon_BENCHMARK_LAUNCHER={};{}"'.format(
+            sys.executable.replace(os.path.sep, "/"),
+            _script_fullpath.replace(os.path.sep, "/"),
+        ),
+    ]
+
+
+# ----------------------------------------------------------------------
+def GetCpus():
+    """Returns the CPUs that benchmarks should be pinned to or None if pinning isn't supported"""
+
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+
+    # Use the CPUs allocated by CTest when running benchmarks concurrently
+    resource_value = _GetAllocatedResourceId()
+    if resource_value is not None:
+        return _ResourceIdToCpus(resource_value)
+
+    cpus, is_restricted = _GetCandidateCpus()
+    if is_restricted:
+        return cpus
+
+    # Otherwise, use the last CPU, as the first CPU generally handles the most interrupts
+    return set([max(cpus)])
+
+
+# ----------------------------------------------------------------------
+def GetCpuGroups(mode=None):
+    """\
+    Returns a list of CPU sets that benchmarks can be run on concurrently without
+    interfering with each other, or None if benchmarks should be run one at a time.
+    """
+
+    mode = (mode or os.getenv(PARALLEL_MODE_ENVIRONMENT_VARIABLE) or DEFAULT_PARALLEL_MODE).lower()
+
+    if mode == "none" or not hasattr(os, "sched_getaffinity"):
+        return None
+
+    cpus, _ = _GetCandidateCpus()
+
+    if mode == "core":
+        # Use one CPU from each physical core, as hardware threads on the same core
+        # share execution resources.
+        cores = {}
+
+        for cpu in cpus:
+            siblings = None
+
+            for filename in ["core_cpus_list", "thread_siblings_list"]:
+                siblings = _ReadCpuListFile(
+                    "/sys/devices/system/cpu/cpu{}/topology/{}".format(cpu, filename),
+                )
+                if siblings:
+                    break
+
+            cores.setdefault(frozenset(siblings or [cpu]), set()).add(cpu)
+
+        groups = [set([min(core_cpus)]) for core_cpus in cores.values()]
+
+    elif mode == "numa":
+        groups = []
+
+        node_dir = "/sys/devices/system/node"
+
+        if os.path.isdir(node_dir):
+            for item in os.listdir(node_dir):
+                if not item.startswith("node") or not item[len("node"):].isdigit():
+                    continue
+
+                node_cpus = (_ReadCpuListFile(os.path.join(node_dir, item, "cpulist")) or set()) & cpus
+                if node_cpus:
+                    groups.append(node_cpus)
+
+    else:
+        raise Exception("'{}' is not a valid parallel mode; valid values are 'core', 'numa', and 'none'".format(mode))
+
+    # Avoid the first CPU (which generally handles the most interrupts) when possible
+    if len(groups) > 2:
+        groups = [group for group in groups if 0 not in group] or groups
+
+    if len(groups) < 2:
+        return None
+
+    return sorted(groups, key=min)
+
+
+# ----------------------------------------------------------------------
+def WriteResourceSpecFile(filename, cpu_groups):
+    """Writes a CTest resource specification file where each CPU group is a resource"""
+
+    with open(filename, "w") as f:
+        json.dump(
+            {
+                "version": {"major": 1, "minor": 0},
+                "local": [
+                    {
+                        RESOURCE_TYPE: [
+                            {"id": _CpusToResourceId(cpus), "slots": 1}
+                            for cpus in cpu_groups
+                        ],
+                    },
+                ],
+            },
+            f,
+            indent=2,
+        )
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    command_line,
+    cpus=None,
+    warmup_runs=None,
+    repetitions=None,
+    samples=None,
+    resamples=None,
+    max_cv_percent=None,
+    output_stream=sys.stdout,
+    error_stream=sys.stderr,
+):
+    """\
+    Runs the command line (a list of arguments), writing the aggregated results to the
+    output stream. Returns the number of noisy results, or the invocation's exit code
+    (as a negative value) if an invocation fails.
+    """
+
+    if warmup_runs is None:
+        warmup_runs = _GetIntEnvironmentValue(WARMUP_RUNS_ENVIRONMENT_VARIABLE, DEFAULT_WARMUP_RUNS)
+    if repetitions is None:
+        repetitions = max(1, _GetIntEnvironmentValue(REPETITIONS_ENVIRONMENT_VARIABLE, DEFAULT_REPETITIONS))
+    if samples is None:
+        samples = _GetIntEnvironmentValue(SAMPLES_ENVIRONMENT_VARIABLE, None)
+    if resamples is None:
+        resamples = _GetIntEnvironmentValue(RESAMPLES_ENVIRONMENT_VARIABLE, None)
+    if max_cv_percent is None:
+        max_cv_percent = float(os.getenv(MAX_CV_ENVIRONMENT_VARIABLE) or DEFAULT_MAX_CV_PERCENT)
+
+    command_line = list(command_line)
+
+    if samples is not None:
+        command_line += ["--benchmark-samples", str(samples)]
+    if resamples is not None:
+        command_line += ["--benchmark-resamples", str(resamples)]
+
+    if cpus is None:
+        cpus = GetCpus()
+
+    if cpus:
+        # Child processes inherit the affinity
+        os.sched_setaffinity(0, cpus)
+
+    documents = []
+
+    for index in range(warmup_runs + repetitions):
+        process = subprocess.Popen(
+            command_line,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+        output = process.communicate()[0]
+
+        if process.returncode != 0:
+            output_stream.write(output)
+            return -abs(process.returncode)
+
+        if index < warmup_runs:
+            continue
+
+        try:
+            documents.append(ElementTree.fromstring(output.encode("utf-8")))
+        except ElementTree.ParseError:
+            # This isn't output generated by the Catch2 XML reporter, so it can't be
+            # aggregated.
+            output_stream.write(output)
+            return 0
+
+    noisy_names = _Aggregate(documents, max_cv_percent, cpus)
+
+    output_stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    output_stream.write(ElementTree.tostring(documents[0]).decode("utf-8"))
+    output_stream.write("\n")
+
+    if noisy_names:
+        error_stream.write(
+            "WARNING: The results of these benchmarks varied by more than {}% across {} invocations:\n".format(
+                max_cv_percent,
+                repetitions,
+            ),
+        )
+
+        for name in noisy_names:
+            error_stream.write("    {}\n".format(name))
+
+    return len(noisy_names)
+
+
+# ----------------------------------------------------------------------
+def Main():
+    if len(sys.argv) < 2:
+        sys.stderr.write("Usage: {} <command line...>\n".format(_script_name))
+        return -1
+
+    result = Execute(sys.argv[1:])
+
+    if result > 0 and os.getenv(FAIL_ON_NOISE_ENVIRONMENT_VARIABLE) != "1":
+        result = 0
+
+    return result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _GetIntEnvironmentValue(name, default_value):
+    value = os.getenv(name)
+    if not value:
+        return default_value
+
+    return int(value)
+
+
+# ----------------------------------------------------------------------
+def _GetCandidateCpus():
+    """\
+    Returns (cpus, is_restricted), where `is_restricted` is True if the CPUs were
+    explicitly specified or isolated from the scheduler.
+    """
+
+    available_cpus = os.sched_getaffinity(0)
+
+    value = os.getenv(CPUS_ENVIRONMENT_VARIABLE)
+    if value:
+        return _ParseCpuList(value), True
+
+    # Prefer CPUs that have been isolated from the scheduler (via the 'isolcpus' kernel parameter)
+    isolated_cpus = (_ReadCpuListFile("/sys/devices/system/cpu/isolated") or set()) & available_cpus
+    if isolated_cpus:
+        return isolated_cpus, True
+
+    return available_cpus, False
+
+
+# ----------------------------------------------------------------------
+def _GetAllocatedResourceId():
+    """Returns the id of the resource allocated by CTest or None if a resource wasn't allocated"""
+
+    # Values are in the form "id:<id>,slots:<slots>"
+    value = os.getenv("CTEST_RESOURCE_GROUP_0_{}".format(RESOURCE_TYPE.upper()))
+    if not value:
+        return None
+
+    for item in value.split(","):
+        key, item_value = item.split(":", 1)
+        if key == "id":
+            return item_value
+
+    return None
+
+
+# ----------------------------------------------------------------------
+def _CpusToResourceId(cpus):
+    # Resource ids are limited to lowercase letters, digits, and underscores
+    return "cpus_{}".format("_".join(str(cpu) for cpu in sorted(cpus)))
+
+
+# ----------------------------------------------------------------------
+def _ResourceIdToCpus(resource_id):
+    assert resource_id.startswith("cpus_"), resource_id
+    return set(int(cpu) for cpu in resource_id[len("cpus_"):].split("_"))
+
+
+# ----------------------------------------------------------------------
+def _ReadCpuListFile(filename):
+    """Returns the CPUs in a file in the form "0,2-4,7" or None if the file doesn't exist"""
+
+    if not os.path.isfile(filename):
+        return None
+
+    with open(filename) as f:
+        return _ParseCpuList(f.read().strip())
+
+
+# ----------------------------------------------------------------------
+def _ParseCpuList(value):
+    """Parses values in the form "0,2-4,7" """
+
+    cpus = set()
+
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+
+        if "-" in item:
+            first, last = item.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(item))
+
+    return cpus
+
+
+# ----------------------------------------------------------------------
+def _Aggregate(documents, max_cv_percent, cpus):
+    """\
+    Updates the benchmark results in the first document with values aggregated from
+    all documents, returning the names of noisy benchmarks.
+    """
+
+    cpus_value = ",".join(str(cpu) for cpu in sorted(cpus)) if cpus else None
+
+    # Invocations run the same benchmarks in the same order
+    all_results = [list(document.iter("BenchmarkResults")) for document in documents]
+
+    noisy_names = []
+
+    for index, results_element in enumerate(all_results[0]):
+        name = results_element.get("name")
+
+        elements = [
+            results[index]
+            for results in all_results
+            if index < len(results) and results[index].get("name") == name
+        ]
+
+        means = []
+        deviations = []
+
+        for element in elements:
+            mean_element = element.find("mean")
+            deviation_element = element.find("standardDeviation")
+
+            # A failed benchmark won't contain results
+            if mean_element is None or deviation_element is None:
+                continue
+
+            means.append(float(mean_element.get("value")))
+            deviations.append(float(deviation_element.get("value")))
+
+        if len(means) != len(documents):
+            continue
+
+        # The median is used to reduce the impact of an outlier invocation; the bounds
+        # reflect the range of the invocations' means.
+        mean = _Median(means)
+
+        mean_element = results_element.find("mean")
+        mean_element.set("value", repr(mean))
+        mean_element.set("lowerBound", repr(min(means)))
+        mean_element.set("upperBound", repr(max(means)))
+
+        results_element.find("standardDeviation").set("value", repr(_Median(deviations)))
+
+        if len(means) > 1:
+            average = sum(means) / len(means)
+            deviation = (sum((value - average) ** 2 for value in means) / (len(means) - 1)) ** 0.5
+
+            cv_percent = deviation / average * 100.0 if average else 0.0
+        else:
+            cv_percent = 0.0
+
+        is_noisy = cv_percent > max_cv_percent
+
+        results_element.set("invocations", str(len(means)))
+        results_element.set("invocationCv", "{:.2f}".format(cv_percent))
+        results_element.set("noisy", "true" if is_noisy else "false")
+
+        if cpus_value is not None:
+            results_element.set("cpus", cpus_value)
+
+        if is_noisy:
+            noisy_names.append("{} ({:.2f}%)".format(name, cv_percent))
+
+    return noisy_names
+
+
+# ----------------------------------------------------------------------
+def _Median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+
+    if len(values) % 2:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(Main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,205 @@
+# ----------------------------------------------------------------------
+# |
+# |  CMakeFileApi.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 14:41:52
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Contains functionality that retrieves information about targets and the files
+read during configuration via the CMake File API (available in CMake 3.14 and later).
+"""
+
+import json
+import os
+
+from collections import namedtuple
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+API_DIRNAME                                 = ".cmake"
+
+# ----------------------------------------------------------------------
+Target                                      = namedtuple(
+    "Target",
+    [
+        "name",
+        "type",                             # "EXECUTABLE", "STATIC_LIBRARY", "SHARED_LIBRARY", "MODULE_LIBRARY", "OBJECT_LIBRARY", "INTERFACE_LIBRARY", or "UTILITY"
+        "artifacts",                        # Fullpaths
+        "sources",                          # Fullpaths
+    ],
+)
+
+
+# ----------------------------------------------------------------------
+def WriteQuery(build_dir):
+    """Requests the codemodel and cmake files for the build dir; this must be invoked before cmake is configured"""
+
+    api_dir = os.path.join(build_dir, API_DIRNAME, "api", "v1")
+
+    # Remove any existing reply so that it isn't mistaken for a reply to this query
+    FileSystem.RemoveTree(os.path.join(api_dir, "reply"))
+
+    query_dir = os.path.join(api_dir, "query")
+    FileSystem.MakeDirs(query_dir)
+
+    for query_name in ["codemodel-v2", "cmakeFiles-v1"]:
+        with open(os.path.join(query_dir, query_name), "w"):
+            pass
+
+
+# ----------------------------------------------------------------------
+def ReadTargets(
+    build_dir,
+    configuration=None,
+):
+    """\
+    Returns the Targets associated with the configuration (or the first configuration
+    if `configuration` is None) or None if a reply isn't available (which is the
+    case with versions of CMake prior to 3.14).
+    """
+
+    reply_dir = _GetReplyDir(build_dir)
+
+    codemodel = _ReadReplyObject(reply_dir, "codemodel", 2)
+    if codemodel is None:
+        return None
+
+    configurations = codemodel.get("configurations", [])
+    if not configurations:
+        return []
+
+    if configuration is None:
+        configuration_info = configurations[0]
+    else:
+        configuration_info = next(
+            (info for info in configurations if info.get("name") == configuration),
+            None,
+        )
+
+        if configuration_info is None:
+            return []
+
+    source_dir = codemodel.get("paths", {}).get("source", build_dir)
+
+    targets = []
+
+    for target_info in configuration_info.get("targets", []):
+        with open(os.path.join(reply_dir, target_info["jsonFile"])) as f:
+            target = json.load(f)
+
+        targets.append(
+            Target(
+                target["name"],
+                target["type"],
+                [
+                    os.path.normpath(os.path.join(build_dir, artifact["path"]))
+                    for artifact in target.get("artifacts", [])
+                ],
+                [
+                    os.path.normpath(os.path.join(source_dir, source["path"]))
+                    for source in target.get("sources", [])
+                    if not source.get("isGenerated", False)
+                ],
+            ),
+        )
+
+    return targets
+
+
+# ----------------------------------------------------------------------
+def ReadCMakeFiles(build_dir):
+    """\
+    Returns the fullpaths of the files read by CMake during configuration (excluding
+    files generated by CMake) or None if a reply isn't available.
+    """
+
+    cmake_files = _ReadReplyObject(_GetReplyDir(build_dir), "cmakeFiles", 1)
+    if cmake_files is None:
+        return None
+
+    source_dir = cmake_files.get("paths", {}).get("source", build_dir)
+
+    return [
+        os.path.normpath(os.path.join(source_dir, input_info["path"]))
+        for input_info in cmake_files.get("inputs", [])
+        if not input_info.get("isGenerated", False)
+    ]
+
+
+# ----------------------------------------------------------------------
+def GetExecutableFilenames(targets):
+    """Returns the fullpaths of executables produced by the targets"""
+
+    filenames = []
+
+    for target in targets:
+        if target.type != "EXECUTABLE":
+            continue
+
+        # Artifacts may include debug information (for example, .pdb files); the first
+        # artifact is the executable itself.
+        if target.artifacts:
+            filenames.append(target.artifacts[0])
+
+    return filenames
+
+
+# ----------------------------------------------------------------------
+def CreateSourceIndex(targets):
+    """Returns a dictionary of source filenames and the names of the targets that compile them"""
+
+    index = {}
+
+    for target in targets:
+        for source in target.sources:
+            index.setdefault(source, []).append(target.name)
+
+    return index
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _GetReplyDir(build_dir):
+    return os.path.join(build_dir, API_DIRNAME, "api", "v1", "reply")
+
+
+# ----------------------------------------------------------------------
+def _ReadReplyObject(reply_dir, kind, major_version):
+    """Returns the content of the reply object or None if it doesn't exist"""
+
+    if not os.path.isdir(reply_dir):
+        return None
+
+    # The most recent index file is the one with the greatest name
+    index_filenames = sorted(
+        item for item in os.listdir(reply_dir) if item.startswith("index-") and item.endswith(".json")
+    )
+
+    if not index_filenames:
+        return None
+
+    with open(os.path.join(reply_dir, index_filenames[-1])) as f:
+        index = json.load(f)
+
+    for obj in index.get("objects", []):
+        if obj.get("kind") == kind and obj.get("version", {}).get("major") == major_version:
+            with open(os.path.join(reply_dir, obj["jsonFile"])) as f:
+                return json.load(f)
+
+    return None
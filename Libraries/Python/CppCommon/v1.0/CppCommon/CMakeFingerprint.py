@@ -0,0 +1,327 @@
+# ----------------------------------------------------------------------
+# |
+# |  CMakeFingerprint.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 09:12:41
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""
+Contains functionality that calculates fingerprints used to determine if the
+inputs to a CMake configuration have changed.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from collections import OrderedDict
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+
+from CppCommon import CMakeFileApi
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variables that impact the toolchain used when configuring a CMake project
+TOOLCHAIN_ENVIRONMENT_VARIABLES             = [
+    "CC",
+    "CXX",
+    "CFLAGS",
+    "CXXFLAGS",
+    "LDFLAGS",
+    "STATICLIB_LDFLAGS",
+    "SHLIB_LDFLAGS",
+    "MODULE_LDFLAGS",
+    "INCLUDE",
+    "LIB",
+    "PATH",
+]
+
+# Environment variable prefixes that impact the toolchain used when configuring a CMake project
+TOOLCHAIN_ENVIRONMENT_VARIABLE_PREFIXES     = [
+    "DEVELOPMENT_ENVIRONMENT_CPP_",
+    "DEVELOPMENT_ENVIRONMENT_CMAKE_",
+]
+
+# ----------------------------------------------------------------------
+def Calculate(
+    cmake_dir,
+    values=None,
+    environment=None,
+    build_dir=None,
+    root_dir=None,
+    configure_inputs=None,
+):
+    """\
+    Returns a fingerprint (an OrderedDict of component names and hashes) based on:
+
+        - The CMakeLists.txt and .cmake files found within `cmake_dir`
+        - The files read by CMake when `build_dir` was configured (this includes files
+          outside of `cmake_dir`); the fingerprint should be calculated again once
+          `build_dir` has been configured, as these files are not known before then
+        - `configure_inputs`, which are files read during a previous configuration
+          (as returned by `EnumConfigureInputs`) for build dirs that no longer contain
+          that information
+        - The .cmake files found in the CMake module path (this includes the CppCommon modules)
+        - Environment variables that impact the toolchain
+        - Any additional values (for example, command line parameters)
+
+    When `root_dir` is provided, paths within it are hashed relative to it so that the
+    fingerprint does not depend upon where the root dir is located.
+    """
+
+    if environment is None:
+        environment = os.environ
+
+    fingerprint = OrderedDict()
+
+    cmake_filenames = EnumCMakeFiles(cmake_dir)
+
+    if build_dir is not None:
+        cmake_filenames = sorted(set(cmake_filenames) | set(EnumConfigureInputs(build_dir) or []))
+
+    if configure_inputs:
+        cmake_filenames = sorted(set(cmake_filenames) | set(configure_inputs))
+
+    fingerprint["cmake_files"] = _HashFiles(cmake_filenames, root_dir)
+
+    module_filenames = []
+
+    for module_dir in (environment.get("DEVELOPMENT_ENVIRONMENT_CMAKE_MODULE_PATH") or "").split(os.pathsep):
+        if module_dir and os.path.isdir(module_dir):
+            module_filenames += EnumCMakeFiles(module_dir)
+
+    fingerprint["cmake_modules"] = _HashFiles(module_filenames, root_dir)
+
+    fingerprint["toolchain"] = _HashValues(
+        [
+            (k, environment[k])
+            for k in sorted(environment.keys())
+            if k in TOOLCHAIN_ENVIRONMENT_VARIABLES
+            or any(k.startswith(prefix) for prefix in TOOLCHAIN_ENVIRONMENT_VARIABLE_PREFIXES)
+        ],
+        root_dir,
+    )
+
+    fingerprint["values"] = _HashValues(values or [], root_dir)
+
+    return fingerprint
+
+
+# ----------------------------------------------------------------------
+def EnumCMakeFiles(cmake_dir):
+    """Returns the CMakeLists.txt and .cmake files within the directory, skipping build directories"""
+
+    return sorted(
+        FileSystem.WalkFiles(
+            cmake_dir,
+            include_file_names=[
+                lambda name: name == "CMakeLists.txt" or os.path.splitext(name)[1] == ".cmake",
+            ],
+            traverse_exclude_dir_names=list(FileSystem.CODE_EXCLUDE_DIR_NAMES) + ["build", "CMakeFiles"],
+        ),
+    )
+
+
+# ----------------------------------------------------------------------
+def EnumConfigureInputs(build_dir):
+    """\
+    Returns the fullpaths of the files read by CMake when the build dir was configured
+    (excluding files within the build dir) or None if they cannot be determined.
+
+    The files are those that cause the build tool to configure the build dir again
+    when they change; they are read from the CMake File API reply (when available)
+    or from the files generated by CMake.
+    """
+
+    filenames = CMakeFileApi.ReadCMakeFiles(build_dir)
+
+    if filenames is None:
+        for func in [
+            _ReadNinjaRegenerationDependencies,
+            _ReadMakefileRegenerationDependencies,
+            _ReadVisualStudioRegenerationDependencies,
+        ]:
+            filenames = func(build_dir)
+            if filenames is not None:
+                break
+
+        else:
+            return None
+
+    build_dir = os.path.normpath(build_dir)
+
+    return sorted(
+        set(
+            filename
+            for filename in (os.path.normpath(os.path.join(build_dir, filename)) for filename in filenames)
+            if not filename.startswith(build_dir + os.path.sep)
+        ),
+    )
+
+
+# ----------------------------------------------------------------------
+def Load(filename):
+    """Returns the fingerprint previously saved to the file or None if it does not exist or is invalid"""
+
+    if not os.path.isfile(filename):
+        return None
+
+    try:
+        with open(filename) as f:
+            return json.load(f, object_pairs_hook=OrderedDict)
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+def Save(filename, fingerprint):
+    with open(filename, "w") as f:
+        json.dump(fingerprint, f, indent=2)
+
+
+# ----------------------------------------------------------------------
+def GetChanges(fingerprint, previous_fingerprint):
+    """Returns the names of components that have changed; an empty list indicates that the fingerprints match"""
+
+    if previous_fingerprint is None:
+        return list(fingerprint.keys())
+
+    return [
+        k
+        for k in sorted(set(fingerprint.keys()) | set(previous_fingerprint.keys()))
+        if fingerprint.get(k) != previous_fingerprint.get(k)
+    ]
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _HashFiles(filenames, root_dir=None):
+    hasher = hashlib.sha256()
+
+    for filename in filenames:
+        hasher.update(_ReplaceRootDir(filename, root_dir).encode("utf-8"))
+
+        # Files read during a previous configuration may have been removed
+        if not os.path.isfile(filename):
+            hasher.update(b"<missing>")
+            continue
+
+        with open(filename, "rb") as f:
+            hasher.update(hashlib.sha256(f.read()).digest())
+
+    return hasher.hexdigest()
+
+
+# ----------------------------------------------------------------------
+def _HashValues(values, root_dir=None):
+    return hashlib.sha256(
+        json.dumps(_ReplaceRootDir(values, root_dir), sort_keys=True).encode("utf-8"),
+    ).hexdigest()
+
+
+# ----------------------------------------------------------------------
+def _ReplaceRootDir(value, root_dir):
+    """Replaces occurrences of the root dir within strings (recursively) with a placeholder"""
+
+    if root_dir is None:
+        return value
+
+    if isinstance(value, (list, tuple)):
+        return [_ReplaceRootDir(item, root_dir) for item in value]
+
+    if not isinstance(value, str):
+        return value
+
+    root_dir = os.path.normpath(root_dir)
+
+    # CMake uses forward slashes on all platforms
+    for potential_root_dir in [root_dir, root_dir.replace(os.path.sep, "/")]:
+        value = value.replace(potential_root_dir, "<root_dir>")
+
+    return value
+
+
+# ----------------------------------------------------------------------
+def _ReadNinjaRegenerationDependencies(build_dir):
+    # The dependencies are in the form:
+    #
+    #     build build.ninja: RERUN_CMAKE | <dependency> <dependency> $
+    #         <dependency> ...
+    #
+    filename = os.path.join(build_dir, "build.ninja")
+    if not os.path.isfile(filename):
+        return None
+
+    with open(filename) as f:
+        content = f.read()
+
+    match = re.search(
+        r"^build build\.ninja(?: [^\n]*?)?: RERUN_CMAKE [^|\n]*\|(?P<dependencies>(?:\$\n|[^\n])*)",
+        content,
+        re.MULTILINE,
+    )
+    if not match:
+        return None
+
+    dependencies = re.sub(r"\$\n\s*", " ", match.group("dependencies"))
+
+    # Spaces, colons, and dollar signs are escaped with '$'
+    return [
+        re.sub(r"\$(.)", r"\1", dependency)
+        for dependency in re.findall(r"(?:\$.|[^\s$])+", dependencies)
+    ]
+
+
+# ----------------------------------------------------------------------
+def _ReadMakefileRegenerationDependencies(build_dir):
+    filename = os.path.join(build_dir, "CMakeFiles", "Makefile.cmake")
+    if not os.path.isfile(filename):
+        return None
+
+    with open(filename) as f:
+        content = f.read()
+
+    match = re.search(r"set\(CMAKE_MAKEFILE_DEPENDS(?P<dependencies>.*?)\)", content, re.DOTALL)
+    if not match:
+        return None
+
+    return re.findall(r'"(.+?)"', match.group("dependencies"))
+
+
+# ----------------------------------------------------------------------
+def _ReadVisualStudioRegenerationDependencies(build_dir):
+    # Each directory with a 'CMakeLists.txt' file has its own stamp file; the stamp
+    # files are listed in 'generate.stamp.list'.
+    list_filename = os.path.join(build_dir, "CMakeFiles", "generate.stamp.list")
+    if not os.path.isfile(list_filename):
+        return None
+
+    with open(list_filename) as f:
+        stamp_filenames = [line.strip() for line in f if line.strip()]
+
+    dependencies = []
+
+    for stamp_filename in stamp_filenames:
+        depend_filename = os.path.join(build_dir, "{}.depend".format(stamp_filename))
+        if not os.path.isfile(depend_filename):
+            continue
+
+        with open(depend_filename) as f:
+            dependencies += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    return dependencies
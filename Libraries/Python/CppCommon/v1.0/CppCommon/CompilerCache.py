@@ -0,0 +1,600 @@
+# ----------------------------------------------------------------------
+# |
+# |  CompilerCache.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 13:27:05
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Content-addressed object cache used as a compiler launcher (via
+CMAKE_<LANG>_COMPILER_LAUNCHER).
+
+Objects are keyed by the compiler identity, the compiler flags, and the
+preprocessed source. This module is invoked once per translation unit and is
+therefore limited to the python standard library so that it is inexpensive to
+launch.
+
+The size of the cache is bounded by evicting the least recently used objects
+across the entire cache. Scanning the cache is too expensive to do during each
+compilation, so the size of each added object is appended to a ledger; once the
+objects added since the last eviction exceed a fraction of the maximum size, the
+launcher that adds the next object evicts objects (other than the one it added)
+until the cache is within the maximum size.
+
+Statistics (hits, misses, and the size of the objects restored and stored) are
+only recorded when the environment variable that specifies the statistics
+filename is defined; the invoker creates a file for each run so that statistics
+aren't combined with those of other runs.
+
+Usage:
+    python CompilerCache.py <cache dir> <compiler> <compiler args...>
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import uuid
+
+from collections import namedtuple
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = os.path.realpath(__file__)
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variable that specifies the default cache directory
+CACHE_DIR_ENVIRONMENT_VARIABLE              = "DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_CACHE_DIR"
+
+# Environment variable that specifies the maximum size of the cache
+MAX_SIZE_ENVIRONMENT_VARIABLE               = "DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_CACHE_MAX_SIZE_MB"
+
+# Environment variable that specifies the file that statistics are written to
+STATISTICS_FILENAME_ENVIRONMENT_VARIABLE    = "DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_CACHE_STATISTICS_FILENAME"
+
+DEFAULT_MAX_SIZE_MB                         = 5120
+
+SOURCE_EXTENSIONS                           = [".c", ".cc", ".cpp", ".cxx", ".c++", ".C"]
+
+# Arguments that produce output that isn't captured by the cache or depend upon
+# input that isn't captured by the preprocessed source
+UNSUPPORTED_GCC_ARG_PREFIXES                = [
+    "@",
+    "--coverage",
+    "-fprofile-",
+    "-ftest-coverage",
+    "-include-pch",
+    "-E",
+]
+
+UNSUPPORTED_MSVC_ARG_PREFIXES               = [
+    "@",
+    "/Zi",
+    "-Zi",
+    "/ZI",
+    "-ZI",
+    "/Yc",
+    "-Yc",
+    "/Yu",
+    "-Yu",
+    "/E",
+    "-E",
+    "/P",
+    "-P",
+    "/GENPROFILE",
+    "/FASTGENPROFILE",
+    "/USEPROFILE",
+]
+
+# Version of the cache layout; modify this value to invalidate existing cache entries
+_CACHE_VERSION                              = 1
+
+# Objects are evicted once the size of the objects added since the last eviction
+# exceeds this fraction of the maximum size.
+_EVICTION_FRACTION                          = 0.05
+
+# Name of the file that the sizes of objects added since the last eviction are appended to
+_LEDGER_FILENAME                            = "added"
+
+# ----------------------------------------------------------------------
+Statistics                                  = namedtuple(
+    "Statistics",
+    [
+        "hits",
+        "misses",
+        "uncacheable",
+        "bytes_restored",
+        "bytes_stored",
+    ],
+)
+
+
+# ----------------------------------------------------------------------
+def GetDefaultCacheDir():
+    return os.getenv(CACHE_DIR_ENVIRONMENT_VARIABLE) or os.path.join(
+        os.path.expanduser("~"),
+        ".CppCommon",
+        "CompilerCache",
+    )
+
+
+# ----------------------------------------------------------------------
+def GetMaxSizeMB():
+    return int(os.getenv(MAX_SIZE_ENVIRONMENT_VARIABLE) or DEFAULT_MAX_SIZE_MB)
+
+
+# ----------------------------------------------------------------------
+def GetLauncher(cache_dir):
+    """Returns the compiler launcher (a list suitable for CMAKE_<LANG>_COMPILER_LAUNCHER) that uses the cache"""
+    return [sys.executable, _script_fullpath, os.path.realpath(cache_dir)]
+
+
+# ----------------------------------------------------------------------
+def GetLauncherCMakeArgs(cache_dir):
+    """Returns the cmake command line arguments that enable the cache"""
+
+    launcher = ";".join(GetLauncher(cache_dir))
+
+    return [
+        '"-DCMAKE_{}_COMPILER_LAUNCHER={}"'.format(language, launcher)
+        for language in ["C", "CXX"]
+    ]
+
+
+# ----------------------------------------------------------------------
+def GetStatistics(statistics_filename):
+    """\
+    Returns a dictionary of cache dirs and the Statistics recorded in the file (as
+    specified by the statistics filename environment variable during the build).
+    """
+
+    counts = {}
+
+    if os.path.isfile(statistics_filename):
+        with open(statistics_filename) as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t", 2)
+                if len(parts) != 3:
+                    continue
+
+                value, num_bytes, cache_dir = parts
+
+                cache_counts = counts.setdefault(cache_dir, {"h": 0, "m": 0, "u": 0, "hb": 0, "mb": 0})
+
+                if value not in cache_counts:
+                    continue
+
+                cache_counts[value] += 1
+
+                if value in ["h", "m"]:
+                    try:
+                        cache_counts[value + "b"] += int(num_bytes)
+                    except ValueError:
+                        pass
+
+    return {
+        cache_dir: Statistics(
+            cache_counts["h"],
+            cache_counts["m"],
+            cache_counts["u"],
+            cache_counts["hb"],
+            cache_counts["mb"],
+        )
+        for cache_dir, cache_counts in counts.items()
+    }
+
+
+# ----------------------------------------------------------------------
+def CreateStatisticsSummary(cache_dir, statistics):
+    """Returns a single line summary of the Statistics or None if the cache wasn't used"""
+
+    total = statistics.hits + statistics.misses + statistics.uncacheable
+    if not total:
+        return None
+
+    return "Compiler cache '{}': {} hits, {} misses, {} uncacheable ({:.1f}% hit rate); {:.1f} MB restored, {:.1f} MB stored".format(
+        cache_dir,
+        statistics.hits,
+        statistics.misses,
+        statistics.uncacheable,
+        100.0 * statistics.hits / total,
+        statistics.bytes_restored / (1024.0 * 1024.0),
+        statistics.bytes_stored / (1024.0 * 1024.0),
+    )
+
+
+# ----------------------------------------------------------------------
+def Evict(cache_dir, max_size_mb=None, exclude_entry_dirs=None):
+    """\
+    Removes the least recently used objects (across all subdirectories) until the
+    cache is no larger than `max_size_mb`. Entries in `exclude_entry_dirs` are not
+    removed.
+    """
+
+    if max_size_mb is None:
+        max_size_mb = GetMaxSizeMB()
+
+    exclude_entry_dirs = set(exclude_entry_dirs or [])
+
+    objects_dir = os.path.join(cache_dir, "objects")
+    if not os.path.isdir(objects_dir):
+        return
+
+    entries = []
+    total_size = 0
+
+    for subdir in os.scandir(objects_dir):
+        if not subdir.is_dir():
+            continue
+
+        for entry in os.scandir(subdir.path):
+            try:
+                size = sum(item.stat().st_size for item in os.scandir(entry.path))
+                mtime = entry.stat().st_mtime
+            except OSError:
+                # The entry was removed by another process
+                continue
+
+            total_size += size
+
+            if entry.path not in exclude_entry_dirs:
+                entries.append((mtime, size, entry.path))
+
+    max_size = max_size_mb * 1024 * 1024
+
+    for _, size, entry_dir in sorted(entries):
+        if total_size <= max_size:
+            break
+
+        # Launchers that are reading from the entry while it is being removed
+        # compile the source instead.
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= size
+
+
+# ----------------------------------------------------------------------
+def Execute(cache_dir, command_line):
+    """Compiles using the command line, returning the compiler's exit code"""
+
+    compiler = command_line[0]
+    args = command_line[1:]
+
+    try:
+        parse_result = _ParseCommandLine(compiler, args)
+        if parse_result is None:
+            _WriteStatistic(cache_dir, "u")
+            return subprocess.call(command_line)
+
+        output_filename, preprocess_args, key_args = parse_result
+
+        # Calculate the key
+        hasher = hashlib.sha256()
+
+        hasher.update(json.dumps([_CACHE_VERSION, _GetCompilerIdentity(compiler), key_args]).encode("utf-8"))
+
+        # Diagnostics are reported by the compiler rather than the preprocessor
+        with open(os.devnull, "wb") as devnull:
+            process = subprocess.Popen(
+                [compiler] + preprocess_args,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+            )
+
+            for chunk in iter(lambda: process.stdout.read(65536), b""):
+                hasher.update(chunk)
+
+            result = process.wait()
+
+        if result != 0:
+            _WriteStatistic(cache_dir, "u")
+            return subprocess.call(command_line)
+
+        key = hasher.hexdigest()
+
+    except (OSError, IOError):
+        _WriteStatistic(cache_dir, "u")
+        return subprocess.call(command_line)
+
+    entry_dir = os.path.join(cache_dir, "objects", key[:2], key)
+
+    # Hit
+    if os.path.isdir(entry_dir):
+        try:
+            _CopyFile(os.path.join(entry_dir, "object"), output_filename)
+
+            for name, stream in [("stdout", sys.stdout), ("stderr", sys.stderr)]:
+                with open(os.path.join(entry_dir, name), "rb") as f:
+                    content = f.read()
+
+                if content:
+                    stream.flush()
+                    getattr(stream, "buffer", stream).write(content)
+                    stream.flush()
+
+            # Record the access time for eviction
+            os.utime(entry_dir, None)
+
+            _WriteStatistic(cache_dir, "h", os.path.getsize(output_filename))
+            return 0
+
+        except (OSError, IOError):
+            # Fall through to compile
+            pass
+
+    # Miss
+    process = subprocess.Popen(
+        command_line,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    stdout, stderr = process.communicate()
+
+    for content, stream in [(stdout, sys.stdout), (stderr, sys.stderr)]:
+        if content:
+            stream.flush()
+            getattr(stream, "buffer", stream).write(content)
+            stream.flush()
+
+    result = process.returncode
+
+    if result == 0:
+        num_bytes = 0
+
+        try:
+            num_bytes = _StoreEntry(cache_dir, entry_dir, output_filename, stdout, stderr)
+            _EvictIfNecessary(cache_dir, entry_dir, num_bytes)
+        except (OSError, IOError):
+            pass
+
+        _WriteStatistic(cache_dir, "m", num_bytes)
+
+    return result
+
+
+# ----------------------------------------------------------------------
+def Main():
+    if len(sys.argv) < 3:
+        sys.stderr.write("Usage: {} <cache dir> <compiler> <compiler args...>\n".format(_script_name))
+        return -1
+
+    return Execute(sys.argv[1], sys.argv[2:])
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _ParseCommandLine(compiler, args):
+    """\
+    Returns (output_filename, preprocess_args, key_args) or None if the command line
+    cannot be cached. `key_args` are the args without the names of generated files.
+    """
+
+    is_msvc = os.path.splitext(os.path.basename(compiler))[0].lower() in ["cl", "clang-cl"]
+
+    if is_msvc:
+        unsupported_prefixes = UNSUPPORTED_MSVC_ARG_PREFIXES
+    else:
+        unsupported_prefixes = UNSUPPORTED_GCC_ARG_PREFIXES
+
+    sources = []
+    output_filename = None
+    is_compile_only = False
+
+    preprocess_args = []
+    key_args = []
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        index += 1
+
+        if any(arg.startswith(prefix) for prefix in unsupported_prefixes):
+            return None
+
+        if is_msvc:
+            if arg in ["/c", "-c"]:
+                is_compile_only = True
+                continue
+
+            if arg[:3] in ["/Fo", "-Fo"]:
+                output_filename = arg[3:]
+                continue
+
+            if arg in ["/showIncludes", "-showIncludes"]:
+                # Included files are written to the output, which is replayed on cache hits
+                key_args.append(arg)
+                continue
+
+        else:
+            if arg == "-c":
+                is_compile_only = True
+                continue
+
+            if arg == "-o":
+                if index == len(args):
+                    return None
+
+                output_filename = args[index]
+                index += 1
+                continue
+
+            if arg.startswith("-o"):
+                output_filename = arg[2:]
+                continue
+
+            if arg == "-x" and index < len(args) and args[index].endswith("-header"):
+                return None
+
+            # The dependency file is generated by the preprocessor, so these args are
+            # passed to it but are not a part of the key.
+            if arg in ["-MF", "-MT", "-MQ"]:
+                if index == len(args):
+                    return None
+
+                preprocess_args += [arg, args[index]]
+                index += 1
+                continue
+
+        if not arg.startswith("-") and not (is_msvc and arg.startswith("/") and not os.path.isfile(arg)):
+            if os.path.splitext(arg)[1] in SOURCE_EXTENSIONS:
+                sources.append(arg)
+                preprocess_args.append(arg)
+                continue
+
+        preprocess_args.append(arg)
+        key_args.append(arg)
+
+    if not is_compile_only or len(sources) != 1 or not output_filename:
+        return None
+
+    if is_msvc:
+        if output_filename.endswith(("/", "\\")):
+            return None
+
+        preprocess_args = ["/E"] + [arg for arg in preprocess_args if arg not in ["/showIncludes", "-showIncludes"]]
+    else:
+        preprocess_args = ["-E"] + preprocess_args
+
+    return output_filename, preprocess_args, key_args
+
+
+# ----------------------------------------------------------------------
+def _GetCompilerIdentity(compiler):
+    fullpath = shutil.which(compiler) or compiler
+    fullpath = os.path.realpath(fullpath)
+
+    stat = os.stat(fullpath)
+
+    return [os.path.normcase(fullpath), stat.st_size, int(stat.st_mtime)]
+
+
+# ----------------------------------------------------------------------
+def _StoreEntry(cache_dir, entry_dir, output_filename, stdout, stderr):
+    """Returns the number of bytes stored"""
+
+    if os.path.isdir(entry_dir):
+        return 0
+
+    temp_dir = os.path.join(cache_dir, "tmp", str(uuid.uuid4()))
+    os.makedirs(temp_dir)
+
+    try:
+        shutil.copyfile(output_filename, os.path.join(temp_dir, "object"))
+
+        num_bytes = os.path.getsize(os.path.join(temp_dir, "object"))
+
+        for name, content in [("stdout", stdout), ("stderr", stderr)]:
+            with open(os.path.join(temp_dir, name), "wb") as f:
+                f.write(content)
+
+            num_bytes += len(content)
+
+        parent_dir = os.path.dirname(entry_dir)
+        if not os.path.isdir(parent_dir):
+            try:
+                os.makedirs(parent_dir)
+            except OSError:
+                # Another process may have created the directory
+                if not os.path.isdir(parent_dir):
+                    raise
+
+        try:
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # Another process stored the same entry
+            if not os.path.isdir(entry_dir):
+                raise
+
+            return 0
+
+        return num_bytes
+
+    finally:
+        if os.path.isdir(temp_dir):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+def _EvictIfNecessary(cache_dir, entry_dir, num_bytes):
+    """Evicts objects if the size of the objects added since the last eviction exceeds its threshold"""
+
+    if not num_bytes:
+        return
+
+    ledger_filename = os.path.join(cache_dir, _LEDGER_FILENAME)
+
+    # Single-line appends are atomic, so concurrent launchers do not need to coordinate
+    with open(ledger_filename, "a") as f:
+        f.write("{}\n".format(num_bytes))
+
+    max_size_mb = GetMaxSizeMB()
+
+    total_bytes = 0
+
+    with open(ledger_filename) as f:
+        for line in f:
+            try:
+                total_bytes += int(line)
+            except ValueError:
+                pass
+
+    if total_bytes < max_size_mb * 1024 * 1024 * _EVICTION_FRACTION:
+        return
+
+    # Only the launcher that claims the ledger evicts objects; the others continue
+    # to append to a new ledger.
+    claimed_filename = "{}.{}".format(ledger_filename, uuid.uuid4())
+
+    try:
+        os.rename(ledger_filename, claimed_filename)
+    except OSError:
+        return
+
+    try:
+        Evict(cache_dir, max_size_mb, exclude_entry_dirs=[entry_dir])
+    finally:
+        os.remove(claimed_filename)
+
+
+# ----------------------------------------------------------------------
+def _CopyFile(source, dest):
+    temp_dest = "{}.{}.tmp".format(dest, uuid.uuid4())
+
+    shutil.copyfile(source, temp_dest)
+    os.replace(temp_dest, dest)
+
+
+# ----------------------------------------------------------------------
+def _WriteStatistic(cache_dir, value, num_bytes=0):
+    statistics_filename = os.getenv(STATISTICS_FILENAME_ENVIRONMENT_VARIABLE)
+    if not statistics_filename:
+        return
+
+    try:
+        # Single-line appends are atomic, so concurrent launchers do not need to coordinate
+        with open(statistics_filename, "a") as f:
+            f.write("{}\t{}\t{}\n".format(value, num_bytes, cache_dir))
+
+    except (OSError, IOError):
+        pass
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(Main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,239 @@
+# ----------------------------------------------------------------------
+# |
+# |  JobServer.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 15:36:08
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Token pool shared by concurrently running processes (in the spirit of the GNU
+make jobserver).
+
+Each token is a file within the pool directory; a token is held by obtaining an
+exclusive lock on its file, which the operating system releases if the process
+terminates unexpectedly. The command is invoked with CMAKE_BUILD_PARALLEL_LEVEL
+set to the number of tokens acquired, which is honored by `cmake --build`.
+
+The module can also be used as a compiler launcher (see `GetLauncher`), where
+each compilation holds a single token from the pool specified by environment
+variables (see `GetLauncherEnvironment`) while it runs; builds that share a pool
+in this way make use of tokens as soon as they are released by other builds.
+Compilations are invoked directly when the environment variables are not defined.
+
+This module is limited to the python standard library so that it is inexpensive
+to launch.
+
+Usage:
+    python JobServer.py <pool dir> <pool size> <max tokens> -- <command line...>
+    python JobServer.py -- <compiler command line...>
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = os.path.realpath(__file__)
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Environment variable that specifies the number of tokens in the pool
+POOL_SIZE_ENVIRONMENT_VARIABLE              = "DEVELOPMENT_ENVIRONMENT_CPP_JOBSERVER_POOL_SIZE"
+
+# Environment variable that specifies the pool used by compiler launchers
+POOL_DIR_ENVIRONMENT_VARIABLE               = "DEVELOPMENT_ENVIRONMENT_CPP_JOBSERVER_POOL_DIR"
+
+# ----------------------------------------------------------------------
+def GetDefaultPoolSize():
+    return int(os.getenv(POOL_SIZE_ENVIRONMENT_VARIABLE) or multiprocessing.cpu_count())
+
+
+# ----------------------------------------------------------------------
+def GetDefaultPoolDir(pool_size):
+    return os.path.join(tempfile.gettempdir(), "CppCommon_JobServer_{}".format(pool_size))
+
+
+# ----------------------------------------------------------------------
+def GetDefaultMaxTokens(pool_size):
+    """\
+    Returns the maximum number of tokens acquired by a single command. Tokens are
+    held for the lifetime of the command, so limiting this value ensures that at
+    least two commands can run concurrently.
+    """
+
+    return max(1, pool_size // 2)
+
+
+# ----------------------------------------------------------------------
+def CreateCommandLine(
+    command_line,
+    max_tokens=None,
+    pool_size=None,
+    pool_dir=None,
+):
+    """Returns a command line that invokes `command_line` once tokens have been acquired from the pool"""
+
+    pool_size = pool_size or GetDefaultPoolSize()
+    pool_dir = pool_dir or GetDefaultPoolDir(pool_size)
+    max_tokens = max_tokens or GetDefaultMaxTokens(pool_size)
+
+    return '"{python}" "{script}" "{pool_dir}" {pool_size} {max_tokens} -- {command_line}'.format(
+        python=sys.executable,
+        script=_script_fullpath,
+        pool_dir=pool_dir,
+        pool_size=pool_size,
+        max_tokens=max_tokens,
+        command_line=command_line,
+    )
+
+
+# ----------------------------------------------------------------------
+def GetLauncher():
+    """\
+    Returns the compiler launcher (a list suitable for CMAKE_<LANG>_COMPILER_LAUNCHER)
+    that acquires a token from the pool specified by the environment before invoking
+    the compiler; it may be followed by other launchers.
+    """
+
+    return [sys.executable, _script_fullpath, "--"]
+
+
+# ----------------------------------------------------------------------
+def GetLauncherEnvironment(pool_size, pool_dir=None):
+    """Returns the environment variables that specify the pool used by compiler launchers"""
+
+    return {
+        POOL_SIZE_ENVIRONMENT_VARIABLE: str(pool_size),
+        POOL_DIR_ENVIRONMENT_VARIABLE: pool_dir or GetDefaultPoolDir(pool_size),
+    }
+
+
+# ----------------------------------------------------------------------
+def AcquireTokens(
+    pool_dir,
+    pool_size,
+    max_tokens,
+    poll_seconds=0.1,
+):
+    """\
+    Blocks until at least one token is available and returns a list of open files
+    (one per acquired token, up to `max_tokens`); close the files to release the tokens.
+    """
+
+    if not os.path.isdir(pool_dir):
+        try:
+            os.makedirs(pool_dir)
+        except OSError:
+            # Another process may have created the directory
+            if not os.path.isdir(pool_dir):
+                raise
+
+    while True:
+        tokens = []
+
+        for index in range(pool_size):
+            f = open(os.path.join(pool_dir, "token-{}".format(index)), "a+")
+
+            if _TryLock(f):
+                tokens.append(f)
+
+                if len(tokens) == max_tokens:
+                    break
+            else:
+                f.close()
+
+        if tokens:
+            return tokens
+
+        time.sleep(poll_seconds)
+
+
+# ----------------------------------------------------------------------
+def Main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--":
+        return _Launch(sys.argv[2:])
+
+    if len(sys.argv) < 6 or sys.argv[4] != "--":
+        sys.stderr.write("Usage: {} <pool dir> <pool size> <max tokens> -- <command line...>\n".format(_script_name))
+        return -1
+
+    pool_dir = sys.argv[1]
+    pool_size = int(sys.argv[2])
+    max_tokens = int(sys.argv[3])
+    command_line = sys.argv[5:]
+
+    tokens = AcquireTokens(pool_dir, pool_size, max_tokens)
+
+    try:
+        environment = dict(os.environ)
+        environment["CMAKE_BUILD_PARALLEL_LEVEL"] = str(len(tokens))
+
+        return subprocess.call(command_line, env=environment)
+
+    finally:
+        for f in tokens:
+            f.close()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _Launch(command_line):
+    pool_dir = os.getenv(POOL_DIR_ENVIRONMENT_VARIABLE)
+    if not pool_dir:
+        return subprocess.call(command_line)
+
+    tokens = AcquireTokens(pool_dir, GetDefaultPoolSize(), 1)
+
+    try:
+        return subprocess.call(command_line)
+
+    finally:
+        for f in tokens:
+            f.close()
+
+
+# ----------------------------------------------------------------------
+if os.name == "nt":
+    import msvcrt
+
+    # ----------------------------------------------------------------------
+    def _TryLock(f):
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except (OSError, IOError):
+            return False
+
+else:
+    import fcntl
+
+    # ----------------------------------------------------------------------
+    def _TryLock(f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (OSError, IOError):
+            return False
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(Main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,386 @@
+# ----------------------------------------------------------------------
+# |
+# |  NinjaLog.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2026-10-18 11:02:17
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2026
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""
+Contains functionality that creates build time reports from the .ninja_log
+file written by Ninja.
+"""
+
+import json
+import os
+import re
+
+from collections import namedtuple, OrderedDict
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+LOG_FILENAME                                = ".ninja_log"
+DEFAULT_TOP_COUNT                           = 10
+
+COMPILE_EXTENSIONS                          = [".o", ".obj", ".gch", ".pch"]
+LINK_EXTENSIONS                             = [".a", ".lib", ".so", ".dll", ".dylib", ".exe"]
+
+# ----------------------------------------------------------------------
+Step                                        = namedtuple(
+    "Step",
+    [
+        "start_ms",
+        "end_ms",
+        "output",
+        "kind",                             # "compile", "link", or "other"
+        "target",
+    ],
+)
+
+
+# ----------------------------------------------------------------------
+def GetLogPosition(filename):
+    """\
+    Returns the current end of the log; provide this value to `CreateReport` after
+    a build to report on the steps written by that build.
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return [None, 0]
+
+    return [stat.st_ino, stat.st_size]
+
+
+# ----------------------------------------------------------------------
+def CreateReport(
+    filename,
+    position=None,
+    top_count=DEFAULT_TOP_COUNT,
+):
+    """\
+    Returns a report (an OrderedDict suitable for serialization as json) for the
+    steps written to the log after `position` (as returned by `GetLogPosition`
+    before the build) or for all of the steps in the log if `position` is None.
+    Returns None if there aren't any steps to report on.
+
+    Ninja appends to the log as commands complete, so the steps written by a
+    build are the lines that follow the position recorded before it started.
+    Ninja occasionally rewrites the log to remove stale entries (which replaces
+    the file); it isn't possible to determine which steps were written by the
+    build in this scenario, so None is returned.
+
+    The log does not contain dependency information, so the report includes the
+    longest serial tail (an estimate) rather than the critical path: the chain of
+    steps found by walking back from the last step to finish, selecting the step
+    that finished most recently before the current step started at each point.
+    Steps in the tail did not necessarily depend upon each other; the tail shows
+    where the build was running serially, which is often (but not always) caused
+    by the critical path.
+    """
+
+    lines = _ReadLines(filename, position)
+    if lines is None:
+        return None
+
+    steps = [
+        Step(start_ms, end_ms, output, *_Classify(output))
+        for start_ms, end_ms, output in _ParseLines(lines)
+    ]
+
+    if not steps:
+        return None
+
+    # Totals
+    wall_time_ms = max(step.end_ms for step in steps) - min(step.start_ms for step in steps)
+    total_time_ms = sum(step.end_ms - step.start_ms for step in steps)
+
+    # Per-target
+    targets = OrderedDict()
+
+    for step in steps:
+        if step.target is None:
+            continue
+
+        info = targets.get(step.target)
+        if info is None:
+            info = OrderedDict(
+                [
+                    ("name", step.target),
+                    ("compile_ms", 0),
+                    ("link_ms", 0),
+                    ("total_ms", 0),
+                    ("steps", 0),
+                ],
+            )
+            targets[step.target] = info
+
+        duration_ms = step.end_ms - step.start_ms
+
+        if step.kind == "compile":
+            info["compile_ms"] += duration_ms
+        elif step.kind == "link":
+            info["link_ms"] += duration_ms
+
+        info["total_ms"] += duration_ms
+        info["steps"] += 1
+
+    # ----------------------------------------------------------------------
+    def Slowest(kind):
+        return [
+            _StepToDict(step)
+            for step in sorted(
+                (step for step in steps if step.kind == kind),
+                key=lambda step: step.end_ms - step.start_ms,
+                reverse=True,
+            )[:top_count]
+        ]
+
+    # ----------------------------------------------------------------------
+
+    serial_tail = _EstimateLongestSerialTail(steps)
+
+    return OrderedDict(
+        [
+            ("log", filename),
+            ("steps", len(steps)),
+            ("wall_time_ms", wall_time_ms),
+            ("total_time_ms", total_time_ms),
+            ("parallelism", round(float(total_time_ms) / wall_time_ms, 2) if wall_time_ms else 0.0),
+            ("slowest_compiles", Slowest("compile")),
+            ("slowest_links", Slowest("link")),
+            (
+                "targets",
+                sorted(targets.values(), key=lambda info: info["total_ms"], reverse=True),
+            ),
+            (
+                "longest_serial_tail",
+                OrderedDict(
+                    [
+                        (
+                            "duration_ms",
+                            (serial_tail[-1].end_ms - serial_tail[0].start_ms) if serial_tail else 0,
+                        ),
+                        ("steps", [_StepToDict(step) for step in serial_tail]),
+                    ],
+                ),
+            ),
+        ],
+    )
+
+
+# ----------------------------------------------------------------------
+def Load(filename):
+    """Returns the report previously saved to the file or None if it does not exist or is invalid"""
+
+    if not os.path.isfile(filename):
+        return None
+
+    try:
+        with open(filename) as f:
+            return json.load(f, object_pairs_hook=OrderedDict)
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+def Save(filename, report):
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+# ----------------------------------------------------------------------
+def WriteSummary(
+    report,
+    output_stream,
+    top_count=DEFAULT_TOP_COUNT,
+):
+    """Writes a human-readable summary of the report"""
+
+    # ----------------------------------------------------------------------
+    def Seconds(ms):
+        return "{:.2f}s".format(ms / 1000.0)
+
+    # ----------------------------------------------------------------------
+    def WriteSteps(header, items):
+        if not items:
+            return
+
+        output_stream.write("\n{}:\n".format(header))
+
+        for item in items[:top_count]:
+            output_stream.write("    {:>10}  {}\n".format(Seconds(item["duration_ms"]), item["output"]))
+
+    # ----------------------------------------------------------------------
+
+    output_stream.write(
+        "Build time: {wall} wall, {total} total across {steps} steps ({parallelism}x parallelism)\n".format(
+            wall=Seconds(report["wall_time_ms"]),
+            total=Seconds(report["total_time_ms"]),
+            steps=report["steps"],
+            parallelism=report["parallelism"],
+        ),
+    )
+
+    WriteSteps("Slowest translation units", report["slowest_compiles"])
+    WriteSteps("Slowest link steps", report["slowest_links"])
+
+    if report["targets"]:
+        output_stream.write("\nTargets:\n")
+
+        for info in report["targets"][:top_count]:
+            output_stream.write(
+                "    {:>10}  {} (compile: {}, link: {}, steps: {})\n".format(
+                    Seconds(info["total_ms"]),
+                    info["name"],
+                    Seconds(info["compile_ms"]),
+                    Seconds(info["link_ms"]),
+                    info["steps"],
+                ),
+            )
+
+    serial_tail = report["longest_serial_tail"]
+
+    if serial_tail["steps"]:
+        output_stream.write(
+            "\nLongest serial tail (estimate) ({}):\n".format(Seconds(serial_tail["duration_ms"])),
+        )
+
+        for item in serial_tail["steps"]:
+            output_stream.write("    {:>10}  {}\n".format(Seconds(item["duration_ms"]), item["output"]))
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_target_dir_regex                           = re.compile(r"(?:^|/)CMakeFiles/(?P<target>[^/]+)\.dir/")
+
+
+# ----------------------------------------------------------------------
+def _ReadLines(filename, position):
+    """Returns the lines written after the position or None if they cannot be determined"""
+
+    if not os.path.isfile(filename):
+        return None
+
+    if position is None:
+        position = [None, 0]
+
+    inode, size = position
+
+    with open(filename, "rb") as f:
+        stat = os.fstat(f.fileno())
+
+        # The log was replaced or truncated
+        if (inode is not None and stat.st_ino != inode) or stat.st_size < size:
+            return None
+
+        f.seek(size)
+        content = f.read()
+
+    return content.decode("utf-8", "replace").splitlines()
+
+
+# ----------------------------------------------------------------------
+def _ParseLines(lines):
+    """Returns a list of (start_ms, end_ms, output) tuples"""
+
+    results = []
+    keys = set()
+
+    for line in lines:
+        if line.startswith("#"):
+            continue
+
+        parts = line.split("\t")
+        if len(parts) < 4:
+            continue
+
+        try:
+            start_ms = int(parts[0])
+            end_ms = int(parts[1])
+        except ValueError:
+            continue
+
+        # Commands that generate multiple outputs write a line for each output;
+        # only record the first.
+        key = (start_ms, end_ms, parts[-1] if len(parts) > 4 else None)
+        if key in keys:
+            continue
+
+        keys.add(key)
+        results.append((start_ms, end_ms, parts[3].replace("\\", "/")))
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def _Classify(output):
+    """Returns (kind, target)"""
+
+    basename = os.path.basename(output)
+    name, ext = os.path.splitext(basename)
+
+    if ext in COMPILE_EXTENSIONS:
+        match = _target_dir_regex.search(output)
+        return "compile", match.group("target") if match else None
+
+    if "CMakeFiles/" not in output and (ext in LINK_EXTENSIONS or not ext):
+        if ext in [".a", ".so", ".dylib"] and name.startswith("lib"):
+            name = name[len("lib"):]
+
+        return "link", name
+
+    return "other", None
+
+
+# ----------------------------------------------------------------------
+def _EstimateLongestSerialTail(steps):
+    steps = sorted(steps, key=lambda step: step.end_ms)
+
+    path = [steps[-1]]
+
+    while True:
+        start_ms = path[-1].start_ms
+
+        predecessor = None
+
+        for step in steps:
+            if step.end_ms > start_ms:
+                break
+
+            predecessor = step
+
+        if predecessor is None:
+            break
+
+        path.append(predecessor)
+
+    path.reverse()
+    return path
+
+
+# ----------------------------------------------------------------------
+def _StepToDict(step):
+    return OrderedDict(
+        [
+            ("output", step.output),
+            ("kind", step.kind),
+            ("target", step.target),
+            ("start_ms", step.start_ms),
+            ("duration_ms", step.end_ms - step.start_ms),
+        ],
+    )
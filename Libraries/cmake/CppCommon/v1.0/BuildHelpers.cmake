@@ -24,6 +24,19 @@ set(_BuildHelpers_CXX_STANDARD_DefaultValue 17)
 set(_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue ON)
 set(_BuildHelpers_CXX_EXTENSIONS_DefaultValue OFF)
 
+# Must match 'BenchmarkRunner.py:RESOURCE_TYPE'
+set(_BuildHelpers_BENCHMARK_RESOURCE_TYPE cores)
+
+# Catch2 configuration values applied to the shared Catch2 main and all test
+# targets that link with it. Values are defined such that they are identical to
+# the equivalent '#define' statements within test files (which would otherwise
+# generate macro redefinition warnings).
+set(
+    _BuildHelpers_SHARED_CATCH2_DEFINITIONS
+    "CATCH_CONFIG_CONSOLE_WIDTH=200"
+    "CATCH_CONFIG_ENABLE_BENCHMARKING="
+)
+
 # ----------------------------------------------------------------------
 function(build_binary)
     # Parse the arguments
@@ -52,6 +65,9 @@ function(build_binary)
         COMMENTS                    # None                          See 'GenerateFileAttributes.cmake::generate_file_attributes` for default value
         ORIGINAL_FILENAME           # None                          See 'GenerateFileAttributes.cmake::generate_file_attributes` for default value
         INTERNAL_NAME               # None                          See 'GenerateFileAttributes.cmake::generate_file_attributes` for default value
+
+        UNITY                       # ${CppCommon_UNITY_BUILD}      ON to combine sources into unity batches
+        UNITY_BATCH_SIZE            # ${CppCommon_UNITY_BUILD_BATCH_SIZE}   Maximum number of sources in a unity batch
     )
     set(multi_value_args
         FILES                       # <Required>                    Files to build
@@ -60,6 +76,7 @@ function(build_binary)
         LINK_DIRECTORIES            # None                          Link include directories
         PRECOMPILED_HEADERS         # None                          Precompiled header names
         PRECOMPILED_LIBRARY_HEADERS # None                          Library names that include precompiled headers
+        UNITY_EXCLUDE_FILES         # None                          Files that are always compiled individually
     )
 
     cmake_parse_arguments(
@@ -81,6 +98,7 @@ function(build_binary)
     _SetValue(BUILD_CXX_STANDARD ${_BuildHelpers_CXX_STANDARD_DefaultValue})
     _SetValue(BUILD_CXX_STANDARD_REQUIRED ${_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue})
     _SetValue(BUILD_CXX_EXTENSIONS ${_BuildHelpers_CXX_EXTENSIONS_DefaultValue})
+    _SetUnityValues()
 
     if("${BUILD_VERSION_PRERELEASE_INFO}" STREQUAL "")
         set(BUILD_VERSION_PRERELEASE_INFO "")
@@ -208,6 +226,7 @@ function(build_binary)
     endif()
 
     _ApplyPrecompiledHeaders(${BUILD_NAME} PUBLIC)
+    _ApplyUnityBuild(${BUILD_NAME})
 endfunction()
 
 # ----------------------------------------------------------------------
@@ -223,6 +242,9 @@ function(build_library)
         CXX_STANDARD                    # ${_BuildHelpers_CXX_STANDARD_DefaultValue}
         CXX_STANDARD_REQUIRED           # ${_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue}
         CXX_EXTENSIONS                  # ${_BuildHelpers_CXX_EXTENSIONS_DefaultValue}
+
+        UNITY                           # ${CppCommon_UNITY_BUILD}      ON to combine sources into unity batches (ignored for interface-only libraries)
+        UNITY_BATCH_SIZE                # ${CppCommon_UNITY_BUILD_BATCH_SIZE}   Maximum number of sources in a unity batch
     )
     set(multi_value_args
         FILES                           # <Required>                    Files to build
@@ -231,6 +253,7 @@ function(build_library)
         PUBLIC_LINK_LIBRARIES           # None                          Libraries to link
         PUBLIC_LINK_DIRECTORIES         # None                          Link include directories
         PRECOMPILED_HEADERS             # None                          Precompiled header names
+        UNITY_EXCLUDE_FILES             # None                          Files that are always compiled individually
     )
 
     cmake_parse_arguments(
@@ -256,6 +279,7 @@ function(build_library)
     _SetValue(BUILD_CXX_STANDARD ${_BuildHelpers_CXX_STANDARD_DefaultValue})
     _SetValue(BUILD_CXX_STANDARD_REQUIRED ${_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue})
     _SetValue(BUILD_CXX_EXTENSIONS ${_BuildHelpers_CXX_EXTENSIONS_DefaultValue})
+    _SetUnityValues()
 
     # Apply the values
     set(CMAKE_CXX_STANDARD ${BUILD_CXX_STANDARD})
@@ -316,6 +340,8 @@ function(build_library)
                 ${_libs}
             )
         endif()
+
+        _ApplyUnityBuild(${BUILD_NAME})
     endif()
 
     if(NOT "${BUILD_PUBLIC_INCLUDE_DIRECTORIES}" STREQUAL "")
@@ -350,15 +376,26 @@ function(build_tests)
     #
     # Note that 'enable_testing()' must be called before invoking this function
     #
+    # When 'CppCommon_SHARED_CATCH2' is ON, the Catch2 main is compiled once (per C++
+    # standard) and linked with every test; tests that define 'CATCH_CONFIG_MAIN' continue
+    # to work, as the linker only uses the shared main when the test doesn't provide one.
+    # Tests that provide their own main via 'CATCH_CONFIG_RUNNER' must specify
+    # 'NO_SHARED_CATCH2'. The precompiled Catch2 header requires CMake 3.16 or later.
+    #
 
     # Parse the arguments
-    set(options)
+    set(options
+        NO_SHARED_CATCH2            # Do not link with the shared Catch2 main or use the precompiled Catch2 header
+    )
                                     # Required or Default Value     Desc
                                     # -------------------------     --------------------------------
     set(single_value_args
         CXX_STANDARD                # ${_BuildHelpers_CXX_STANDARD_DefaultValue}
         CXX_STANDARD_REQUIRED       # ${_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue}
         CXX_EXTENSIONS              # ${_BuildHelpers_CXX_EXTENSIONS_DefaultValue}
+
+        UNITY                       # ${CppCommon_UNITY_BUILD}      ON to combine the sources of each test into unity batches
+        UNITY_BATCH_SIZE            # ${CppCommon_UNITY_BUILD_BATCH_SIZE}   Maximum number of sources in a unity batch
     )
     set(multi_value_args
         FILES                       # <Required>                    Files to build
@@ -367,6 +404,7 @@ function(build_tests)
         LINK_DIRECTORIES            # None                          Link include directories
         PRECOMPILED_HEADERS         # None                          Precompiled header names
         PRECOMPILED_LIBRARY_HEADERS # None                          Library names that include precompiled headers
+        UNITY_EXCLUDE_FILES         # None                          Files that are always compiled individually
     )
 
     cmake_parse_arguments(
@@ -386,6 +424,7 @@ function(build_tests)
     _SetValue(BUILD_CXX_STANDARD ${_BuildHelpers_CXX_STANDARD_DefaultValue})
     _SetValue(BUILD_CXX_STANDARD_REQUIRED ${_BuildHelpers_CXX_STANDARD_REQUIRED_DefaultValue})
     _SetValue(BUILD_CXX_EXTENSIONS ${_BuildHelpers_CXX_EXTENSIONS_DefaultValue})
+    _SetUnityValues()
 
     # Apply the values
     set(CMAKE_CXX_STANDARD ${BUILD_CXX_STANDARD})
@@ -405,6 +444,12 @@ function(build_tests)
     _MakeRelativePaths(BUILD_LINK_DIRECTORIES)
     _MakeRelativePaths(_libs)
 
+    if(CppCommon_SHARED_CATCH2 AND NOT BUILD_NO_SHARED_CATCH2)
+        _CreateSharedCatch2Target(_catch2_target "${_includes}")
+    else()
+        set(_catch2_target)
+    endif()
+
     foreach(_test_file IN ITEMS ${BUILD_FILES})
         get_filename_component(_test_name ${_test_file} NAME_WE)
 
@@ -445,6 +490,29 @@ function(build_tests)
         endif()
 
         _ApplyPrecompiledHeaders(${_test_name} PRIVATE)
+        _ApplyUnityBuild(${_test_name})
+
+        if(NOT "${_catch2_target}" STREQUAL "")
+            target_link_libraries(
+                ${_test_name}
+                PRIVATE
+                ${_catch2_target}
+            )
+
+            # A target can only have one precompiled header, so those provided by the
+            # caller take precedence.
+            if(
+                "${BUILD_PRECOMPILED_HEADERS}" STREQUAL ""
+                AND "${BUILD_PRECOMPILED_LIBRARY_HEADERS}" STREQUAL ""
+                AND NOT CMAKE_VERSION VERSION_LESS 3.16
+            )
+                target_precompile_headers(
+                    ${_test_name}
+                    REUSE_FROM
+                    ${_catch2_target}
+                )
+            endif()
+        endif()
 
         # Run all tests with verbose output except those tagged with "[benchmark]"
         add_test(
@@ -454,11 +522,32 @@ function(build_tests)
 
         # If not in debug mode, run tests tagged with "[benchmark]". Note that we
         # don't want to run with verbose output in this scenario, as that output will
-        # prevent accurate benchmark statistics.
-        if(NOT "${CMAKE_BUILD_TYPE}" STREQUAL "Debug")
+        # prevent accurate benchmark statistics. Results are generated by the XML
+        # reporter, as its output is easier to parse reliably. The launcher (if any)
+        # is responsible for stabilizing the results.
+        get_property(_is_multi_config GLOBAL PROPERTY GENERATOR_IS_MULTI_CONFIG)
+
+        if(_is_multi_config)
+            # The configuration isn't known until build time when using a multi-configuration generator
             add_test(
                 NAME ${_test_name}_benchmark
-                COMMAND ${_test_name} [benchmark]
+                COMMAND ${CppCommon_BENCHMARK_LAUNCHER} $<TARGET_FILE:${_test_name}> [benchmark] --reporter xml
+                CONFIGURATIONS Release ReleaseMinSize ReleaseNoOpt
+            )
+        elseif(NOT "${CMAKE_BUILD_TYPE}" STREQUAL "Debug")
+            add_test(
+                NAME ${_test_name}_benchmark
+                COMMAND ${CppCommon_BENCHMARK_LAUNCHER} $<TARGET_FILE:${_test_name}> [benchmark] --reporter xml
+            )
+        endif()
+
+        # Benchmarks require exclusive use of a core when CTest is invoked with a resource
+        # specification file (see 'BenchmarkRunner.py'); the property is ignored otherwise.
+        if(TEST ${_test_name}_benchmark AND NOT CMAKE_VERSION VERSION_LESS 3.16)
+            set_tests_properties(
+                ${_test_name}_benchmark
+                PROPERTIES
+                RESOURCE_GROUPS "${_BuildHelpers_BENCHMARK_RESOURCE_TYPE}:1"
             )
         endif()
     endforeach()
@@ -533,6 +622,113 @@ macro(_ApplyPrecompiledHeaders target_name visibility)
     endif()
 endmacro()
 
+# ----------------------------------------------------------------------
+function(_CreateSharedCatch2Target result_var include_directories)
+    # Tests compiled with different language settings cannot share objects or
+    # precompiled headers.
+    set(_target_name "CppCommon_Catch2_cxx${CMAKE_CXX_STANDARD}")
+
+    if(CMAKE_CXX_EXTENSIONS)
+        string(APPEND _target_name "_ext")
+    endif()
+
+    set(${result_var} ${_target_name} PARENT_SCOPE)
+
+    if(TARGET ${_target_name})
+        return()
+    endif()
+
+    set(_output_dir "${CMAKE_BINARY_DIR}/CppCommon_Catch2")
+
+    set(_main_filename "${_output_dir}/${_target_name}.main.cpp")
+    set(_pch_filename "${_output_dir}/${_target_name}.pch.cpp")
+
+    _WriteGeneratedFile(
+        "${_main_filename}"
+        "// Generated by BuildHelpers.cmake\n#define CATCH_CONFIG_MAIN\n#include <catch.hpp>\n"
+    )
+
+    # The precompiled header can only be reused by other targets when it is used by at
+    # least one of this target's sources (which isn't the case for the main file).
+    _WriteGeneratedFile(
+        "${_pch_filename}"
+        "// Generated by BuildHelpers.cmake\n#include <catch.hpp>\n"
+    )
+
+    add_library(${_target_name} STATIC ${_main_filename} ${_pch_filename})
+
+    target_compile_definitions(
+        ${_target_name}
+        PUBLIC
+        ${_BuildHelpers_SHARED_CATCH2_DEFINITIONS}
+    )
+
+    if(NOT "${include_directories}" STREQUAL "")
+        target_include_directories(
+            ${_target_name}
+            PRIVATE
+            ${include_directories}
+        )
+    endif()
+
+    if(NOT CMAKE_VERSION VERSION_LESS 3.16)
+        target_precompile_headers(
+            ${_target_name}
+            PRIVATE
+            <catch.hpp>
+        )
+
+        # 'CATCH_CONFIG_MAIN' must be defined before catch.hpp is included, which isn't
+        # possible when the precompiled header is (implicitly) included first.
+        set_source_files_properties(
+            ${_main_filename}
+            PROPERTIES
+            SKIP_PRECOMPILE_HEADERS ON
+        )
+    endif()
+endfunction()
+
+# ----------------------------------------------------------------------
+function(_WriteGeneratedFile filename content)
+    # Only update the file when its content changes to prevent unnecessary rebuilds
+    file(WRITE "${filename}.tmp" "${content}")
+    configure_file("${filename}.tmp" "${filename}" COPYONLY)
+endfunction()
+
+# ----------------------------------------------------------------------
+macro(_SetUnityValues)
+    _SetValue(BUILD_UNITY ${CppCommon_UNITY_BUILD})
+    _SetValue(BUILD_UNITY_BATCH_SIZE ${CppCommon_UNITY_BUILD_BATCH_SIZE})
+
+    # Values used when 'CppCommon.cmake' has not been included
+    _SetValue(BUILD_UNITY OFF)
+    _SetValue(BUILD_UNITY_BATCH_SIZE 8)
+endmacro()
+
+# ----------------------------------------------------------------------
+macro(_ApplyUnityBuild target_name)
+    if(BUILD_UNITY)
+        _VerifyCmakeVersion(3.16 "Unity build functionality")
+
+        set_target_properties(
+            ${target_name}
+            PROPERTIES
+            UNITY_BUILD ON
+            UNITY_BUILD_BATCH_SIZE ${BUILD_UNITY_BATCH_SIZE}
+        )
+
+        # Files that define conflicting symbols (for example, functions or variables in
+        # anonymous namespaces with the same name) cannot be combined with other files.
+        if(NOT "${BUILD_UNITY_EXCLUDE_FILES}" STREQUAL "")
+            set_source_files_properties(
+                ${BUILD_UNITY_EXCLUDE_FILES}
+                PROPERTIES
+                SKIP_UNITY_BUILD_INCLUSION ON
+            )
+        endif()
+    endif()
+endmacro()
+
 # ----------------------------------------------------------------------
 macro(_VerifyCmakeVersion version desc)
     if(${CMAKE_VERSION} VERSION_LESS ${version})
@@ -122,3 +122,38 @@ set(_EXE_LINKER_FLAGS_CppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION_FALSE "-pi
 
 # CppCommon_PREPROCESSOR_OUTPUT
 set(_CXX_FLAGS_CppCommon_PREPROCESSOR_OUTPUT_TRUE "-E")
+
+# CppCommon_PGO_GENERATE
+foreach(_flag IN ITEMS
+    "-fprofile-generate=${CppCommon_PGO_PROFILE_DIR}"   # Instrument the code to write raw profile data (*.profraw) to the profile dir
+)
+    STRING(APPEND _CXX_FLAGS_CppCommon_PGO_GENERATE_TRUE " ${_flag}")
+endforeach()
+
+# CppCommon_PGO_USE
+#
+# The raw profile data must be merged (via `llvm-profdata merge`) into "default.profdata"
+# before building.
+foreach(_flag IN ITEMS
+    "-fprofile-use=${CppCommon_PGO_PROFILE_DIR}/default.profdata"  # Optimize using the merged profile data
+    -Wno-profile-instr-out-of-date          # Functions modified after the profile data was generated
+    -Wno-profile-instr-unprofiled           # Functions not exercised when generating profile data
+)
+    STRING(APPEND _CXX_FLAGS_CppCommon_PGO_USE_TRUE " ${_flag}")
+endforeach()
+
+# CppCommon_LTO_FULL
+foreach(_configuration_type IN ITEMS
+    RELEASE
+    RELEASEMINSIZE
+)
+    set(_CXX_FLAGS_CppCommon_LTO_FULL_TRUE_${_configuration_type} "-flto")
+endforeach()
+
+# CppCommon_LTO_THIN
+foreach(_configuration_type IN ITEMS
+    RELEASE
+    RELEASEMINSIZE
+)
+    set(_CXX_FLAGS_CppCommon_LTO_THIN_TRUE_${_configuration_type} "-flto=thin")
+endforeach()
@@ -33,3 +33,25 @@ foreach(_flag IN ITEMS
 )
     STRING(APPEND _EXE_LINKER_FLAGS_CppCommon_CODE_COVERAGE_TRUE " ${_flag}")
 endforeach()
+
+# CppCommon_LTO_FULL
+foreach(_configuration_type IN ITEMS
+    RELEASE
+    RELEASEMINSIZE
+)
+    set(_EXE_LINKER_FLAGS_CppCommon_LTO_FULL_TRUE_${_configuration_type} "-flto")
+endforeach()
+
+# CppCommon_LTO_THIN
+foreach(_configuration_type IN ITEMS
+    RELEASE
+    RELEASEMINSIZE
+)
+    set(_EXE_LINKER_FLAGS_CppCommon_LTO_THIN_TRUE_${_configuration_type} "-flto=thin")
+endforeach()
+
+# Static libraries contain LLVM bitcode, which requires an archiver that understands it
+if((CppCommon_LTO_FULL OR CppCommon_LTO_THIN) AND CMAKE_CXX_COMPILER_AR AND CMAKE_CXX_COMPILER_RANLIB)
+    set(CMAKE_AR "${CMAKE_CXX_COMPILER_AR}")
+    set(CMAKE_RANLIB "${CMAKE_CXX_COMPILER_RANLIB}")
+endif()
@@ -124,3 +124,43 @@ foreach(_flag IN ITEMS
 )
     STRING(APPEND _CXX_FLAGS_CppCommon_CODE_COVERAGE_TRUE " ${_flag}")
 endforeach()
+
+# CppCommon_PGO_GENERATE
+foreach(_flag IN ITEMS
+    "-fprofile-generate=${CppCommon_PGO_PROFILE_DIR}"   # Instrument the code to write profile data to the profile dir
+    -fprofile-update=atomic                 # Accurate profile data in multithreaded code
+)
+    STRING(APPEND _CXX_FLAGS_CppCommon_PGO_GENERATE_TRUE " ${_flag}")
+endforeach()
+
+# CppCommon_PGO_USE
+foreach(_flag IN ITEMS
+    "-fprofile-use=${CppCommon_PGO_PROFILE_DIR}"        # Optimize using the profile data in the profile dir
+    -fprofile-correction                    # Tolerate inconsistent profile data generated by multithreaded code
+    -Wno-missing-profile                    # Not every translation unit is exercised when generating profile data
+)
+    STRING(APPEND _CXX_FLAGS_CppCommon_PGO_USE_TRUE " ${_flag}")
+endforeach()
+
+# CppCommon_LTO_FULL / CppCommon_LTO_THIN (GCC does not support ThinLTO, so full LTO is used for both)
+if(CppCommon_LTO_THIN)
+    message(WARNING "ThinLTO is not supported by GCC; full link-time optimization will be used instead.\n")
+endif()
+
+if(CMAKE_CXX_COMPILER_VERSION VERSION_LESS 10.0.0)
+    set(_lto_flag "-flto")
+else()
+    set(_lto_flag "-flto=auto")             # Use the jobserver or the number of cores for link-time compilation
+endif()
+
+foreach(_flag_type IN ITEMS
+    CppCommon_LTO_FULL
+    CppCommon_LTO_THIN
+)
+    foreach(_configuration_type IN ITEMS
+        RELEASE
+        RELEASEMINSIZE
+    )
+        set(_CXX_FLAGS_${_flag_type}_TRUE_${_configuration_type} "${_lto_flag}")
+    endforeach()
+endforeach()
@@ -23,3 +23,25 @@ foreach(_flag IN ITEMS
     STRING(APPEND _EXE_LINKER_FLAGS_RELEASEMINSIZE " ${_flag}")
     STRING(APPEND _EXE_LINKER_FLAGS_RELEASENOOPT " ${_flag}")
 endforeach()
+
+# ----------------------------------------------------------------------
+# |  Dynamic Flags
+
+# CppCommon_LTO_FULL / CppCommon_LTO_THIN
+foreach(_flag_type IN ITEMS
+    CppCommon_LTO_FULL
+    CppCommon_LTO_THIN
+)
+    foreach(_configuration_type IN ITEMS
+        RELEASE
+        RELEASEMINSIZE
+    )
+        set(_EXE_LINKER_FLAGS_${_flag_type}_TRUE_${_configuration_type} "${_lto_flag}")
+    endforeach()
+endforeach()
+
+# Static libraries contain LTO bytecode, which requires an archiver that loads the LTO plugin
+if((CppCommon_LTO_FULL OR CppCommon_LTO_THIN) AND CMAKE_CXX_COMPILER_AR AND CMAKE_CXX_COMPILER_RANLIB)
+    set(CMAKE_AR "${CMAKE_CXX_COMPILER_AR}")
+    set(CMAKE_RANLIB "${CMAKE_CXX_COMPILER_RANLIB}")
+endif()
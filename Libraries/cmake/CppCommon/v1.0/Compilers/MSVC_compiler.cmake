@@ -60,7 +60,7 @@ endforeach()
 foreach(_flag IN ITEMS
     /DNDEBUG
     /D_NDEBUG
-    /GL                                     # enable link-time code generation
+    /GL                                     # enable link-time code generation (always enabled, so `CppCommon_LTO` has no impact)
     /Gy                                     # separate functions for linker
     /O2                                     # maximum optimizations (favor speed)
     /Ob2                                    # inline expansion (default n=0)
@@ -134,3 +134,8 @@ set(_CXX_FLAGS_CppCommon_NO_DEBUG_INFO_FALSE_RELEASENOOPT "${_CXX_FLAGS_CppCommo
 
 # CppCommon_PREPROCESSOR_OUTPUT
 set(_CXX_FLAGS_CppCommon_PREPROCESSOR_OUTPUT_TRUE "/P")
+
+# CppCommon_PGO_GENERATE / CppCommon_PGO_USE
+if(CppCommon_PGO_GENERATE OR CppCommon_PGO_USE)
+    message(FATAL_ERROR "Profile-guided optimization is not supported with this compiler")
+endif()
@@ -61,6 +61,77 @@ option(
     OFF
 )
 
+option(
+    CppCommon_PGO_GENERATE
+    "Produce builds instrumented to generate profile data for profile-guided optimization (requires a Release build)."
+    OFF
+)
+
+option(
+    CppCommon_PGO_USE
+    "Produce builds optimized with profile data generated by a `CppCommon_PGO_GENERATE` build."
+    OFF
+)
+
+set(
+    CppCommon_PGO_PROFILE_DIR
+    "${CMAKE_BINARY_DIR}/pgo_profile"
+    CACHE PATH
+    "Directory that contains the profile data used by `CppCommon_PGO_GENERATE` and `CppCommon_PGO_USE`."
+)
+
+if(CppCommon_PGO_GENERATE AND CppCommon_PGO_USE)
+    message(FATAL_ERROR "'CppCommon_PGO_GENERATE' and 'CppCommon_PGO_USE' cannot be enabled at the same time")
+endif()
+
+set(
+    CppCommon_LTO
+    "OFF"
+    CACHE STRING
+    "Link-time optimization for Release and ReleaseMinSize builds: 'OFF', 'FULL' ('ON'), or 'THIN' (Clang only)."
+)
+set_property(CACHE CppCommon_LTO PROPERTY STRINGS OFF FULL THIN)
+
+# Dynamic flags are boolean, so `CppCommon_LTO` is converted into a boolean value for each variant
+string(TOUPPER "${CppCommon_LTO}" _lto)
+
+set(CppCommon_LTO_FULL OFF)
+set(CppCommon_LTO_THIN OFF)
+
+if(_lto STREQUAL "FULL" OR _lto STREQUAL "ON")
+    set(CppCommon_LTO_FULL ON)
+elseif(_lto STREQUAL "THIN")
+    set(CppCommon_LTO_THIN ON)
+elseif(NOT _lto STREQUAL "OFF" AND NOT _lto STREQUAL "")
+    message(FATAL_ERROR "'${CppCommon_LTO}' is not a valid value for 'CppCommon_LTO'; valid values are 'OFF', 'FULL', and 'THIN'")
+endif()
+
+option(
+    CppCommon_UNITY_BUILD
+    "Combine the sources of targets created by 'BuildHelpers.cmake' into unity batches (this is the default value of each function's 'UNITY' argument)."
+    OFF
+)
+
+set(
+    CppCommon_UNITY_BUILD_BATCH_SIZE
+    8
+    CACHE STRING
+    "Maximum number of sources combined into a unity batch (0 combines all sources of a target into a single batch)."
+)
+
+set(
+    CppCommon_BENCHMARK_LAUNCHER
+    ""
+    CACHE STRING
+    "Command (a list) that launches the benchmark tests created by 'BuildHelpers.cmake::build_tests' (for example, CppCommon's BenchmarkRunner.py, which pins the process to specific CPUs and aggregates multiple invocations)."
+)
+
+option(
+    CppCommon_SHARED_CATCH2
+    "Compile the Catch2 main (and a precompiled Catch2 header, with CMake 3.16 or later) once and share it with all targets created by 'BuildHelpers.cmake::build_tests'; tests that provide their own main via 'CATCH_CONFIG_RUNNER' must specify 'NO_SHARED_CATCH2'."
+    OFF
+)
+
 if("$ENV{DEVELOPMENT_ENVIRONMENT_CPP_CMAKE_DISABLE_PRECOMPILE_HEADERS}" STREQUAL "1")
     set(CMAKE_DISABLE_PRECOMPILE_HEADERS ON)
 endif()
@@ -155,6 +226,10 @@ foreach(_flag_prefix IN ITEMS
         CppCommon_NO_DEBUG_INFO
         CppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION
         CppCommon_PREPROCESSOR_OUTPUT
+        CppCommon_PGO_GENERATE
+        CppCommon_PGO_USE
+        CppCommon_LTO_FULL
+        CppCommon_LTO_THIN
     )
         set("_${_flag_prefix}_FLAGS_${_flag_type}" "")
 
@@ -253,6 +328,10 @@ foreach(_flag_prefix IN ITEMS
         CppCommon_NO_DEBUG_INFO
         CppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION
         CppCommon_PREPROCESSOR_OUTPUT
+        CppCommon_PGO_GENERATE
+        CppCommon_PGO_USE
+        CppCommon_LTO_FULL
+        CppCommon_LTO_THIN
     )
         set(_flag_name "_${_flag_prefix}_FLAGS_${_flag_type}")
 
@@ -315,6 +394,10 @@ foreach(_flag_prefix IN ITEMS
         CppCommon_NO_DEBUG_INFO
         CppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION
         CppCommon_PREPROCESSOR_OUTPUT
+        CppCommon_PGO_GENERATE
+        CppCommon_PGO_USE
+        CppCommon_LTO_FULL
+        CppCommon_LTO_THIN
     )
         foreach(_boolean_type IN ITEMS
             TRUE
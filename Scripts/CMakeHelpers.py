@@ -15,356 +15,1350 @@
 # ----------------------------------------------------------------------
 """Tools that operate on cmake in parallel"""
 
+import multiprocessing
 import os
+import re
+import signal
+import subprocess
 import sys
 import textwrap
 import threading
 
+from collections import namedtuple
+
+import six
+
 import CommonEnvironment
 from CommonEnvironment.CallOnExit import CallOnExit
 from CommonEnvironment import CommandLine
 from CommonEnvironment import FileSystem
-from CommonEnvironment import Process
 from CommonEnvironment.Shell.All import CurrentShell
 from CommonEnvironment.StreamDecorator import StreamDecorator
 from CommonEnvironment import TaskPool
 
+from CppCommon import CMakeFileApi
+from CppCommon import CMakeFingerprint
+from CppCommon import CompilerCache
+from CppCommon import JobServer
+from CppCommon import NinjaLog
+
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
 _script_dir, _script_name                   = os.path.split(_script_fullpath)
 # ----------------------------------------------------------------------
 
+# Configuration types supported by CppCommon.cmake
+CONFIGURATION_TYPES                         = ["Debug", "Release", "ReleaseMinSize", "ReleaseNoOpt"]
+
+DEFAULT_CONFIGURATION_TYPES                 = ["Debug", "Release"]
+
+# Memory (in MB) reserved for each concurrent link job
+DEFAULT_LINK_MEMORY_MB                      = 2048
+
+# Name of the file within a build directory that contains the fingerprint of the
+# inputs used to generate it
+FINGERPRINT_FILENAME                        = "CMakeHelpers.fingerprint.json"
+
+# Name of the file within a build directory that contains the build time report
+# generated from the Ninja log after the most recent build
+BUILD_TIMES_FILENAME                        = "CMakeHelpers.build_times.json"
 
-@CommandLine.EntryPoint
+# When pipelining tests, the number of jobs used by tests that run concurrently with
+# the build is the number of jobs available to the configuration divided by this value
+PIPELINE_TEST_JOBS_DIVISOR                  = 4
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint(
+    working_dir=CommandLine.EntryPoint.Parameter("Directory(s) that contain a 'CMakeLists.txt' file; defaults to the current directory when '/discovery_root' is not provided"),
+    discovery_root=CommandLine.EntryPoint.Parameter("Directory searched for CMake projects (directories whose 'CMakeLists.txt' file invokes 'project'); the projects found are processed along with any working dirs"),
+    configuration=CommandLine.EntryPoint.Parameter("Configuration(s) to generate; defaults to {}".format(", ".join(DEFAULT_CONFIGURATION_TYPES))),
+    compiler=CommandLine.EntryPoint.Parameter("Compiler name(s) to generate; a name may be followed by '=<c++ compiler executable>[,<c compiler executable>]' when it is not the currently active compiler (the c compiler is derived from the c++ compiler when not provided)"),
+    architecture=CommandLine.EntryPoint.Parameter("Architecture(s) to generate; defaults to the currently active architecture"),
+    max_jobs=CommandLine.EntryPoint.Parameter("Maximum number of jobs shared by all configurations; defaults to the number of cores"),
+    link_memory_mb=CommandLine.EntryPoint.Parameter("Memory (in MB) reserved for each concurrent link job; used to limit the number of concurrent links (Ninja only)"),
+    compiler_cache=CommandLine.EntryPoint.Parameter("Compile via a content-addressed object cache"),
+    compiler_cache_dir=CommandLine.EntryPoint.Parameter("Directory used by the object cache; implies '/compiler_cache' and defaults to the value of the '{}' environment variable or a directory in the user's home directory".format(CompilerCache.CACHE_DIR_ENVIRONMENT_VARIABLE)),
+    force=CommandLine.EntryPoint.Parameter("Remove existing build directories before generating"),
+    multi_config=CommandLine.EntryPoint.Parameter("Configure once with a multi-configuration generator (for example, 'Ninja Multi-Config') and build each configuration from that build directory"),
+    incremental=CommandLine.EntryPoint.Parameter("Preserve existing build directories, configuring them again only when the CMake files, cmake params, toolchain environment, or CMake modules have changed"),
+    pipeline=CommandLine.EntryPoint.Parameter("Run the tests associated with an executable as soon as it has been linked, while the remainder of the build continues (Ninja only)"),
+    fail_fast=CommandLine.EntryPoint.Parameter("Cancel all other configurations as soon as a configuration fails"),
+    build_times=CommandLine.EntryPoint.Parameter("Display the slowest translation units, link steps, targets, and the longest serial tail (estimate) of each build (Ninja only); this information is always written to '{}' in the build directory".format(BUILD_TIMES_FILENAME)),
+    lto=CommandLine.EntryPoint.Parameter("Enable link-time optimization for Release and ReleaseMinSize configurations"),
+    thin_lto=CommandLine.EntryPoint.Parameter("Enable ThinLTO for Release and ReleaseMinSize configurations (Clang only)"),
+)
 @CommandLine.Constraints(
     generator=CommandLine.StringTypeInfo(
         arity="?",
     ),
     working_dir=CommandLine.DirectoryTypeInfo(
+        arity="*",
+    ),
+    discovery_root=CommandLine.DirectoryTypeInfo(
         arity="?",
     ),
     cmake_param=CommandLine.StringTypeInfo(
         arity="*",
     ),
+    configuration=CommandLine.EnumTypeInfo(
+        CONFIGURATION_TYPES,
+        arity="*",
+    ),
+    compiler=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    architecture=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    max_jobs=CommandLine.IntTypeInfo(
+        min=1,
+        arity="?",
+    ),
+    link_memory_mb=CommandLine.IntTypeInfo(
+        min=1,
+        arity="?",
+    ),
+    compiler_cache_dir=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
     output_stream=None,
 )
 def Generate(
-    working_dir=os.getcwd(),
+    working_dir=None,
+    discovery_root=None,
     generator=(
         None
         if os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_USE_DEFAULT_CMAKE_GENERATOR")
         else "Ninja"
     ),
     cmake_param=None,
+    configuration=None,
+    compiler=None,
+    architecture=None,
+    max_jobs=None,
+    link_memory_mb=DEFAULT_LINK_MEMORY_MB,
+    compiler_cache=False,
+    compiler_cache_dir=None,
     force=False,
+    incremental=False,
+    multi_config=False,
     build=False,
     test=False,
+    pipeline=False,
+    fail_fast=False,
+    build_times=False,
+    lto=False,
+    thin_lto=False,
     output_stream=sys.stdout,
     verbose=False,
 ):
     """Generates build files for multiple build configurations"""
 
-    cmake_params = cmake_param
+    working_dirs = working_dir
+    del working_dir
+
+    cmake_params = list(cmake_param or [])
     del cmake_param
 
+    configurations = configuration
+    del configuration
+
+    compilers = compiler
+    del compiler
+
+    architectures = architecture
+    del architecture
+
     if test and not build:
         raise CommandLine.UsageException(
             "'/build' must be provided if '/test' is provided",
         )
 
-    command_line_template = 'cmake {generator} -S "{working_dir}" -B "{{build_dir}}" -DCMAKE_BUILD_TYPE={{configuration}} {params} {root_dir}'.format(
+    if pipeline and not test:
+        raise CommandLine.UsageException(
+            "'/test' must be provided if '/pipeline' is provided",
+        )
+
+    if pipeline and not (generator and generator.startswith("Ninja")):
+        raise CommandLine.UsageException(
+            "'/pipeline' requires a Ninja generator",
+        )
+
+    if force and incremental:
+        raise CommandLine.UsageException(
+            "'/force' and '/incremental' cannot be provided together",
+        )
+
+    if lto and thin_lto:
+        raise CommandLine.UsageException(
+            "'/lto' and '/thin_lto' cannot be provided together",
+        )
+
+    # Provide the value as a cmake param so that it is included in the fingerprint
+    if lto:
+        cmake_params.append("-DCppCommon_LTO=FULL")
+    elif thin_lto:
+        cmake_params.append("-DCppCommon_LTO=THIN")
+
+    if multi_config:
+        if generator == "Ninja":
+            generator = "Ninja Multi-Config"
+        elif generator is None or not (
+            generator == "Ninja Multi-Config"
+            or generator.startswith("Visual Studio")
+            or generator == "Xcode"
+        ):
+            raise CommandLine.UsageException(
+                "'/multi_config' requires a multi-configuration generator",
+            )
+
+    if compiler_cache_dir is None and compiler_cache:
+        compiler_cache_dir = CompilerCache.GetDefaultCacheDir()
+
+    active_compiler = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME")
+
+    for compiler_name, compiler_executable, c_compiler_executable in _ParseCompilers(compilers):
+        if compiler_name != active_compiler and compiler_executable is None:
+            raise CommandLine.UsageException(
+                "The compiler '{name}' is not the active compiler ('{active}'); provide its executable via '/compiler={name}=<c++ compiler executable>'".format(
+                    name=compiler_name,
+                    active=active_compiler,
+                ),
+            )
+
+        if compiler_executable is not None and c_compiler_executable is None:
+            raise CommandLine.UsageException(
+                "The c compiler associated with '{executable}' could not be determined; provide it via '/compiler={name}={executable},<c compiler executable>'".format(
+                    name=compiler_name,
+                    executable=compiler_executable,
+                ),
+            )
+
+    # When supported by the generator, each compilation acquires a token from the pool
+    # shared by all builds (see `_Scheduler`) before invoking the compiler (or the cache).
+    launcher = []
+
+    if _SupportsCompilerLaunchers(generator):
+        launcher += JobServer.GetLauncher()
+
+    if compiler_cache_dir:
+        launcher += CompilerCache.GetLauncher(compiler_cache_dir)
+
+    command_line_template = 'cmake {generator} -S "{{working_dir}}" -B "{{configure_dir}}" {{configuration_types}}{{compiler}}{{job_pools}}{launcher} {params} {root_dir}'.format(
         generator='-G "{}"'.format(generator) if generator else "",
-        working_dir=working_dir,
+        launcher="".join(
+            ' "-DCMAKE_{}_COMPILER_LAUNCHER={}"'.format(language, ";".join(launcher))
+            for language in ["C", "CXX"]
+        ) if launcher else "",
         params=" ".join(cmake_params),
         root_dir=os.path.join(*([".."] * 5))
     )
 
-    # ----------------------------------------------------------------------
-    def Callback(test_lock, configuration, build_dir, output_stream, on_status_update):
-        on_status_update("Generating")
-        _PrintHeader("Generate Output", output_stream)
+    # Configuration happens once per configure dir; with multi-configuration generators,
+    # that directory is shared by multiple cells.
+    configure_infos = {}
+    configure_infos_lock = threading.Lock()
 
-        if os.path.isdir(build_dir):
-            if not force:
-                output_stream.write(
-                    "The output dir '{}' already exists and will not be overwritten.\n".format(
-                        build_dir,
-                    ),
-                )
-                return 1
+    # ----------------------------------------------------------------------
+    def Configure(cell, scheduler, output_stream):
+        """Returns (result, is_new_configure_dir)"""
 
-            FileSystem.RemoveTree(build_dir)
+        configure_dir = cell.configure_dir
 
-        FileSystem.MakeDirs(build_dir)
+        if cell.is_multi_config:
+            configuration_types_arg = '"-DCMAKE_CONFIGURATION_TYPES={}"'.format(
+                ";".join(configurations or DEFAULT_CONFIGURATION_TYPES),
+            )
+        else:
+            configuration_types_arg = "-DCMAKE_BUILD_TYPE={}".format(cell.configuration)
 
-        result = Process.Execute(
-            command_line_template.format(
-                build_dir=build_dir,
-                configuration=configuration,
-            ),
-            output_stream,
-        )
-        if result != 0:
-            return result
+        fingerprint_filename = os.path.join(configure_dir, FINGERPRINT_FILENAME)
 
-        # Create a python file that can be used to clean the directory
-        existing_items = os.listdir(build_dir)
-        assert existing_items
+        # ----------------------------------------------------------------------
+        def CalculateFingerprint():
+            # Note that the job pools are not included in the fingerprint, as they are
+            # based on the memory available at the time of invocation.
+            return CMakeFingerprint.Calculate(
+                cell.working_dir,
+                values=[
+                    generator,
+                    cmake_params,
+                    configuration_types_arg,
+                    cell.compiler_executable,
+                    cell.c_compiler_executable,
+                    launcher,
+                ],
+                environment=cell.environment,
+                build_dir=configure_dir,
+            )
 
-        with open(os.path.join(build_dir, "Clean.py"), "w") as f:
-            f.write(
-                textwrap.dedent(
-                    """\
-                    #!/usr/bin/env python
+        # ----------------------------------------------------------------------
 
-                    import os
-                    import sys
+        fingerprint = CalculateFingerprint()
 
-                    import CommonEnvironment
-                    from CommonEnvironment import CommandLine
-                    from CommonEnvironment import FileSystem
-                    from CommonEnvironment.StreamDecorator import StreamDecorator
+        is_existing_configure_dir = os.path.isdir(configure_dir)
+        is_up_to_date = False
 
-                    # ----------------------------------------------------------------------
-                    _script_fullpath                            = CommonEnvironment.ThisFullpath()
-                    _script_dir, _script_name                   = os.path.split(_script_fullpath)
-                    # ----------------------------------------------------------------------
+        if is_existing_configure_dir:
+            if incremental:
+                changes = CMakeFingerprint.GetChanges(
+                    fingerprint,
+                    CMakeFingerprint.Load(fingerprint_filename),
+                )
 
-                    @CommandLine.EntryPoint
-                    @CommandLine.Constraints(
-                        output_stream=None,
+                if not changes:
+                    output_stream.write(
+                        "The output dir '{}' is up-to-date.\n".format(configure_dir),
+                    )
+                    is_up_to_date = True
+                else:
+                    output_stream.write(
+                        "The output dir '{}' will be configured again due to changes in: {}.\n\n".format(
+                            configure_dir,
+                            ", ".join(changes),
+                        ),
                     )
-                    def EntryPoint(
-                        all=False,
-                        output_stream=sys.stdout,
-                    ):
-                        with StreamDecorator(output_stream).DoneManager(
-                            line_prefix="",
-                            prefix="\\nResults: ",
-                            suffix="\\n",
-                        ) as dm:
-                            existing_items = set([{existing_items_list}])
-
-                            for item in os.listdir(_script_dir):
-                                if item in existing_items or item == _script_name:
-                                    continue
-
-                                fullpath = os.path.join(_script_dir, item)
-
-                                dm.stream.write("Removing '{{}}'...".format(fullpath))
-                                with dm.stream.DoneManager():
-                                    FileSystem.RemoveItem(fullpath)
 
-                            cmake_dirs = os.path.join(_script_dir, "CMakeFiles")
+            elif force:
+                FileSystem.RemoveTree(configure_dir)
+                is_existing_configure_dir = False
 
-                            if all:
-                                dm.stream.write("Removing '{{}}'...".format(cmake_dirs))
-                                with dm.stream.DoneManager():
-                                    FileSystem.RemoveTree(cmake_dirs)
-
-                            else:
-                                dirs_to_delete = []
-
-                                for fullpath, _ in FileSystem.WalkDirs(
-                                    cmake_dirs,
-                                    include_dir_names=[lambda name: os.path.splitext(name)[1] == ".dir"],
-                                ):
-                                    dirs_to_delete.append(fullpath)
-
-                                for dir_to_delete in dirs_to_delete:
-                                    dm.stream.write("Removing '{{}}'...".format(dir_to_delete))
-                                    with dm.stream.DoneManager():
-                                        FileSystem.RemoveTree(dir_to_delete)
-
-                            return dm.result
-
-
-                    # ----------------------------------------------------------------------
-                    # ----------------------------------------------------------------------
-                    # ----------------------------------------------------------------------
-                    if __name__ == "__main__":
-                        try:
-                            sys.exit(CommandLine.Main())
-                        except KeyboardInterrupt:
-                            pass
-                    """,
-                ).format(
-                    existing_items_list=", ".join(
-                        ['"{}"'.format(existing_item) for existing_item in existing_items],
+            else:
+                output_stream.write(
+                    "The output dir '{}' already exists and will not be overwritten.\n".format(
+                        configure_dir,
+                    ),
+                )
+                return 1, False
+
+        if not is_up_to_date:
+            FileSystem.MakeDirs(configure_dir)
+
+            # Remove the fingerprint so that it doesn't appear valid if configuration fails
+            FileSystem.RemoveFile(fingerprint_filename)
+
+            # Request the list of files read during configuration (CMake 3.14 and later)
+            CMakeFileApi.WriteQuery(configure_dir)
+
+            result = scheduler.Execute(
+                cell,
+                command_line_template.format(
+                    working_dir=cell.working_dir,
+                    configure_dir=configure_dir,
+                    configuration_types=configuration_types_arg,
+                    compiler=' -DCMAKE_CXX_COMPILER="{}" -DCMAKE_C_COMPILER="{}"'.format(
+                        cell.compiler_executable,
+                        cell.c_compiler_executable,
+                    ) if cell.compiler_executable else "",
+                    job_pools=(
+                        # Ninja is the only generator that supports job pools
+                        " -DCMAKE_JOB_POOLS=link_pool={} -DCMAKE_JOB_POOL_LINK=link_pool".format(
+                            scheduler.LinkJobs,
+                        )
+                        if generator and generator.startswith("Ninja") and scheduler.LinkJobs is not None
+                        else ""
                     ),
                 ),
+                output_stream,
             )
+            if result != 0:
+                return result, False
 
-        if build:
-            on_status_update("Building")
-            _PrintHeader("Build Output", output_stream)
+            # Calculate the fingerprint again, as the files read during configuration
+            # (which may be outside of the working dir) are now known.
+            CMakeFingerprint.Save(fingerprint_filename, CalculateFingerprint())
 
-            result = _BuildImpl(build_dir, output_stream)
-            if result != 0:
-                return result
+        return 0, not is_existing_configure_dir
+
+    # ----------------------------------------------------------------------
+    def Callback(cell, scheduler, output_stream, on_status_update):
+        on_status_update("Generating")
+        _PrintHeader("Generate Output", output_stream)
+
+        with configure_infos_lock:
+            configure_info = configure_infos.setdefault(
+                cell.configure_dir,
+                CommonEnvironment.Nonlocals(
+                    lock=threading.Lock(),
+                    result=None,
+                    is_new=None,
+                ),
+            )
+
+        with configure_info.lock:
+            if configure_info.result is None:
+                configure_info.result, configure_info.is_new = Configure(
+                    cell,
+                    scheduler,
+                    output_stream,
+                )
+            else:
+                output_stream.write(
+                    "The output dir '{}' was configured by another configuration.\n".format(
+                        cell.configure_dir,
+                    ),
+                )
 
-        if test:
-            on_status_update("Testing (Waiting)")
-            _PrintHeader("Test Output", output_stream)
+        if configure_info.result != 0:
+            return configure_info.result
 
-            with test_lock:
-                on_status_update("Testing")
+        # Create a python file that can be used to clean the directory. Note that this
+        # file is only created for new build directories, as the items in an existing build
+        # directory include build output.
+        if configure_info.is_new:
+            _CreateCleanScript(cell)
 
-                result = _TestImpl(build_dir, output_stream)
-                if result != 0:
-                    return result
+        if build:
+            return _BuildAndTest(
+                cell,
+                scheduler,
+                output_stream,
+                on_status_update,
+                test=test,
+                pipeline=pipeline,
+            )
 
         return 0
 
     # ----------------------------------------------------------------------
 
-    return _Impl(working_dir, output_stream, verbose, Callback)
+    return _Impl(
+        working_dirs,
+        discovery_root,
+        configurations,
+        compilers,
+        architectures,
+        output_stream,
+        verbose,
+        Callback,
+        max_jobs=max_jobs,
+        link_memory_mb=link_memory_mb,
+        multi_config=multi_config,
+        fail_fast=fail_fast,
+        build_times=build_times,
+    )
 
 
 # ----------------------------------------------------------------------
-@CommandLine.EntryPoint
+@CommandLine.EntryPoint(
+    working_dir=CommandLine.EntryPoint.Parameter("Directory(s) that contain a 'CMakeLists.txt' file; defaults to the current directory when '/discovery_root' is not provided"),
+    discovery_root=CommandLine.EntryPoint.Parameter("Directory searched for CMake projects (directories whose 'CMakeLists.txt' file invokes 'project'); the projects found are processed along with any working dirs"),
+    configuration=CommandLine.EntryPoint.Parameter("Configuration(s) to build; defaults to {}".format(", ".join(DEFAULT_CONFIGURATION_TYPES))),
+    compiler=CommandLine.EntryPoint.Parameter("Compiler name(s) to build; defaults to the currently active compiler"),
+    architecture=CommandLine.EntryPoint.Parameter("Architecture(s) to build; defaults to the currently active architecture"),
+    max_jobs=CommandLine.EntryPoint.Parameter("Maximum number of jobs shared by all configurations; defaults to the number of cores"),
+    pipeline=CommandLine.EntryPoint.Parameter("Run the tests associated with an executable as soon as it has been linked, while the remainder of the build continues (Ninja only)"),
+    fail_fast=CommandLine.EntryPoint.Parameter("Cancel all other configurations as soon as a configuration fails"),
+    build_times=CommandLine.EntryPoint.Parameter("Display the slowest translation units, link steps, targets, and the longest serial tail (estimate) of each build (Ninja only); this information is always written to '{}' in the build directory".format(BUILD_TIMES_FILENAME)),
+)
 @CommandLine.Constraints(
     working_dir=CommandLine.DirectoryTypeInfo(
+        arity="*",
+    ),
+    discovery_root=CommandLine.DirectoryTypeInfo(
+        arity="?",
+    ),
+    configuration=CommandLine.EnumTypeInfo(
+        CONFIGURATION_TYPES,
+        arity="*",
+    ),
+    compiler=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    architecture=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    max_jobs=CommandLine.IntTypeInfo(
+        min=1,
         arity="?",
     ),
     output_stream=None,
 )
 def Build(
-    working_dir=os.getcwd(),
+    working_dir=None,
+    discovery_root=None,
+    configuration=None,
+    compiler=None,
+    architecture=None,
+    max_jobs=None,
     test=False,
+    pipeline=False,
+    fail_fast=False,
+    build_times=False,
     output_stream=sys.stdout,
     verbose=False,
 ):
     """Executes builds for multiple configurations"""
 
-    # ----------------------------------------------------------------------
-    def Callback(test_lock, configuration, build_dir, output_stream, on_status_update):
-        if not os.path.isdir(build_dir):
-            output_stream.write("ERROR: '{}' is not a valid directory.".format(build_dir))
-            return -1
+    working_dirs = working_dir
+    del working_dir
 
-        on_status_update("Building")
-        _PrintHeader("Build Output", output_stream)
+    configurations = configuration
+    del configuration
 
-        result = _BuildImpl(build_dir, output_stream)
-        if result != 0:
-            return result
+    compilers = compiler
+    del compiler
 
-        if test:
-            on_status_update("Testing (Waiting)")
-            _PrintHeader("Test Output", output_stream)
+    architectures = architecture
+    del architecture
 
-            with test_lock:
-                on_status_update("Testing")
+    if pipeline and not test:
+        raise CommandLine.UsageException(
+            "'/test' must be provided if '/pipeline' is provided",
+        )
 
-                result = _TestImpl(build_dir, output_stream)
-                if result != 0:
-                    return result
+    # ----------------------------------------------------------------------
+    def Callback(cell, scheduler, output_stream, on_status_update):
+        if not os.path.isdir(cell.configure_dir):
+            output_stream.write("ERROR: '{}' is not a valid directory.".format(cell.configure_dir))
+            return -1
 
-        return 0
+        return _BuildAndTest(
+            cell,
+            scheduler,
+            output_stream,
+            on_status_update,
+            test=test,
+            pipeline=pipeline,
+        )
 
     # ----------------------------------------------------------------------
 
-    return _Impl(working_dir, output_stream, verbose, Callback)
+    return _Impl(
+        working_dirs,
+        discovery_root,
+        configurations,
+        compilers,
+        architectures,
+        output_stream,
+        verbose,
+        Callback,
+        max_jobs=max_jobs,
+        fail_fast=fail_fast,
+        build_times=build_times,
+    )
 
 
 # ----------------------------------------------------------------------
-@CommandLine.EntryPoint
+@CommandLine.EntryPoint(
+    working_dir=CommandLine.EntryPoint.Parameter("Directory(s) that contain a 'CMakeLists.txt' file; defaults to the current directory when '/discovery_root' is not provided"),
+    discovery_root=CommandLine.EntryPoint.Parameter("Directory searched for CMake projects (directories whose 'CMakeLists.txt' file invokes 'project'); the projects found are processed along with any working dirs"),
+    configuration=CommandLine.EntryPoint.Parameter("Configuration(s) to test; defaults to {}".format(", ".join(DEFAULT_CONFIGURATION_TYPES))),
+    compiler=CommandLine.EntryPoint.Parameter("Compiler name(s) to test; defaults to the currently active compiler"),
+    architecture=CommandLine.EntryPoint.Parameter("Architecture(s) to test; defaults to the currently active architecture"),
+    max_jobs=CommandLine.EntryPoint.Parameter("Maximum number of jobs shared by all configurations; defaults to the number of cores"),
+    fail_fast=CommandLine.EntryPoint.Parameter("Cancel all other configurations as soon as a configuration fails"),
+)
 @CommandLine.Constraints(
     working_dir=CommandLine.DirectoryTypeInfo(
+        arity="*",
+    ),
+    discovery_root=CommandLine.DirectoryTypeInfo(
+        arity="?",
+    ),
+    configuration=CommandLine.EnumTypeInfo(
+        CONFIGURATION_TYPES,
+        arity="*",
+    ),
+    compiler=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    architecture=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    max_jobs=CommandLine.IntTypeInfo(
+        min=1,
         arity="?",
     ),
     output_stream=None,
 )
 def Test(
-    working_dir=os.getcwd(),
+    working_dir=None,
+    discovery_root=None,
+    configuration=None,
+    compiler=None,
+    architecture=None,
+    max_jobs=None,
+    fail_fast=False,
     output_stream=sys.stdout,
     verbose=False,
 ):
     """Executes tests for multiple configurations"""
 
+    working_dirs = working_dir
+    del working_dir
+
+    configurations = configuration
+    del configuration
+
+    compilers = compiler
+    del compiler
+
+    architectures = architecture
+    del architecture
+
     # ----------------------------------------------------------------------
-    def Callback(test_lock, configuration, build_dir, output_stream, on_status_update):
-        if not os.path.isdir(build_dir):
-            output_stream.write("ERROR: '{}' is not a valid directory.".format(build_dir))
+    def Callback(cell, scheduler, output_stream, on_status_update):
+        if not os.path.isdir(cell.configure_dir):
+            output_stream.write("ERROR: '{}' is not a valid directory.".format(cell.configure_dir))
             return -1
 
-        on_status_update("Testing (Waiting)")
+        on_status_update("Testing")
         _PrintHeader("Test Output", output_stream)
 
-        with test_lock:
-            on_status_update("Testing")
-
-            result = _TestImpl(build_dir, output_stream)
-            if result != 0:
-                return result
+        result = _TestImpl(cell, scheduler, output_stream)
+        if result != 0:
+            return result
 
         return 0
 
     # ----------------------------------------------------------------------
 
-    return _Impl(working_dir, output_stream, verbose, Callback)
+    return _Impl(
+        working_dirs,
+        discovery_root,
+        configurations,
+        compilers,
+        architectures,
+        output_stream,
+        verbose,
+        Callback,
+        max_jobs=max_jobs,
+        fail_fast=fail_fast,
+    )
 
 
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
-def _Impl(working_dir, output_stream, verbose, callback_func):
-    if not os.path.isfile(os.path.join(working_dir, "CMakeLists.txt")):
-        raise CommandLine.UsageException(
-            "The directory '{}' does not contain the file 'CMakeLists.txt'".format(
-                working_dir,
-            ),
-        )
+# Information about a single working_dir/configuration/compiler/architecture combination.
+# `configure_dir` is the directory configured by cmake and `build_dir` is the directory that
+# contains the configuration's output; these values are the same unless a multi-configuration
+# generator is used.
+_Cell                                       = namedtuple(
+    "_Cell",
+    [
+        "working_dir",
+        "configuration",
+        "compiler",
+        "compiler_executable",
+        "c_compiler_executable",
+        "architecture",
+        "configure_dir",
+        "build_dir",
+        "is_multi_config",
+        "environment",
+    ],
+)
+
+
+# ----------------------------------------------------------------------
+def _Impl(
+    working_dirs,
+    discovery_root,
+    configurations,
+    compilers,
+    architectures,
+    output_stream,
+    verbose,
+    callback_func,
+    max_jobs=None,
+    link_memory_mb=None,
+    multi_config=None,
+    fail_fast=False,
+    build_times=False,
+):
+    """\
+    `multi_config` should be None when the layout of existing build directories
+    should be detected.
+    """
+
+    working_dirs = list(working_dirs or [])
+
+    if discovery_root is not None:
+        discovered_dirs = _DiscoverWorkingDirs(discovery_root)
+        if not discovered_dirs:
+            raise CommandLine.UsageException(
+                "No CMake projects were found in '{}'".format(discovery_root),
+            )
+
+        working_dirs += discovered_dirs
+
+    if not working_dirs:
+        working_dirs.append(os.getcwd())
+
+    working_dirs = [os.path.realpath(working_dir) for working_dir in working_dirs]
+
+    # Remove duplicates while preserving order
+    working_dirs = [
+        working_dir
+        for index, working_dir in enumerate(working_dirs)
+        if working_dir not in working_dirs[:index]
+    ]
+
+    for working_dir in working_dirs:
+        if not os.path.isfile(os.path.join(working_dir, "CMakeLists.txt")):
+            raise CommandLine.UsageException(
+                "The directory '{}' does not contain the file 'CMakeLists.txt'".format(
+                    working_dir,
+                ),
+            )
+
+    configurations = configurations or DEFAULT_CONFIGURATION_TYPES
+    compilers = _ParseCompilers(compilers)
+    architectures = architectures or [os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_ARCHITECTURE")]
 
     with StreamDecorator(output_stream).DoneManager(
         line_prefix="",
         prefix="\nResults: ",
         suffix="\n",
     ) as dm:
-        build_dir_prefix = [
-            "build",
-            CurrentShell.CategoryName,
-            os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME"),
-            os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_ARCHITECTURE"),
-        ]
+        cells = []
+
+        for working_dir in working_dirs:
+            for compiler_name, compiler_executable, c_compiler_executable in compilers:
+                for architecture in architectures:
+                    environment = dict(os.environ)
+
+                    environment["DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME"] = compiler_name
+                    environment["DEVELOPMENT_ENVIRONMENT_CPP_ARCHITECTURE"] = architecture
+
+                    root_dir = os.path.join(
+                        working_dir,
+                        "build",
+                        CurrentShell.CategoryName,
+                        compiler_name,
+                        architecture,
+                    )
+
+                    if multi_config is None:
+                        is_multi_config = os.path.isfile(os.path.join(root_dir, "CMakeCache.txt"))
+                    else:
+                        is_multi_config = multi_config
+
+                    for configuration in configurations:
+                        build_dir = os.path.join(root_dir, configuration)
+
+                        cells.append(
+                            _Cell(
+                                working_dir,
+                                configuration,
+                                compiler_name,
+                                compiler_executable,
+                                c_compiler_executable,
+                                architecture,
+                                root_dir if is_multi_config else build_dir,
+                                build_dir,
+                                is_multi_config,
+                                environment,
+                            ),
+                        )
+
+        # Only decorate the task names with the working dir, compiler, and architecture
+        # when more than one of them is being processed.
+        if len(working_dirs) > 1:
+            common_dir = os.path.commonpath(working_dirs)
+
+            project_names = {
+                working_dir: (
+                    os.path.relpath(working_dir, common_dir)
+                    if working_dir != common_dir
+                    else os.path.basename(working_dir)
+                )
+                for working_dir in working_dirs
+            }
+        else:
+            project_names = None
+
+        task_names = []
+
+        for cell in cells:
+            name_parts = []
 
-        configuration_types = ["Debug", "Release"]
+            if project_names is not None:
+                name_parts.append(project_names[cell.working_dir])
 
-        # Tests cannot execute in parallel, as they must be invoked from the build
-        # dir (which impacts the global working directory)
-        test_lock = threading.Lock()
+            if len(compilers) != 1 or len(architectures) != 1:
+                name_parts += [cell.compiler, cell.architecture]
+
+            name_parts.append(cell.configuration)
+
+            task_names.append(" - ".join(name_parts))
+
+        # Object cache statistics are written to a file specific to this invocation so
+        # that they aren't combined with the statistics of other builds using the same cache.
+        compiler_cache_statistics_filename = CurrentShell.CreateTempFilename()
+
+        scheduler = _Scheduler(
+            cells,
+            max_jobs=max_jobs,
+            link_memory_mb=link_memory_mb,
+            compiler_cache_statistics_filename=compiler_cache_statistics_filename,
+        )
+
+        cancelled_task_names = []
+        failed_task_names = []
 
         # ----------------------------------------------------------------------
         def Impl(task_index, output_stream, on_status_update):
-            configuration = configuration_types[task_index]
-            build_dir = os.path.join(
-                *([working_dir] + build_dir_prefix + [configuration])
-            )
+            cell = cells[task_index]
+
+            # Return this cell's jobs to the pool once it is complete, regardless of
+            # the phase in which it terminated.
+            with CallOnExit(lambda: scheduler.Complete(cell)):
+                if scheduler.IsCancelled:
+                    result = -1
+                    is_cancelled = True
+                else:
+                    result = callback_func(
+                        cell,
+                        scheduler,
+                        output_stream,
+                        on_status_update,
+                    )
 
-            return callback_func(
-                test_lock,
-                configuration,
-                build_dir,
-                output_stream,
-                on_status_update,
-            )
+                    is_cancelled = result != 0 and scheduler.WasCancelled(cell)
+
+                if is_cancelled:
+                    output_stream.write("\n\nCANCELLED due to the failure of another configuration.\n")
+                    cancelled_task_names.append(task_names[task_index])
+
+                elif result != 0 and fail_fast and scheduler.Cancel():
+                    failed_task_names.append(task_names[task_index])
+
+                return result
 
         # ----------------------------------------------------------------------
 
         dm.result = TaskPool.Execute(
-            [
-                TaskPool.Task(configuration_type, Impl)
-                for configuration_type in configuration_types
-            ],
+            [TaskPool.Task(task_name, Impl) for task_name in task_names],
             dm.stream,
             progress_bar=True,
             verbose=verbose,
         )
 
+        if cancelled_task_names:
+            dm.stream.write(
+                "\nThe failure of '{}' cancelled:\n{}\n".format(
+                    failed_task_names[0],
+                    "".join(
+                        "    - {}\n".format(task_name)
+                        for task_name in sorted(cancelled_task_names, key=task_names.index)
+                    ),
+                ),
+            )
+
+        compiler_cache_statistics = CompilerCache.GetStatistics(compiler_cache_statistics_filename)
+        FileSystem.RemoveFile(compiler_cache_statistics_filename)
+
+        for this_compiler_cache_dir, statistics in sorted(six.iteritems(compiler_cache_statistics)):
+            summary = CompilerCache.CreateStatisticsSummary(this_compiler_cache_dir, statistics)
+            if summary is None:
+                continue
+
+            dm.stream.write("\n{}\n".format(summary))
+
+        if build_times:
+            for cell, task_name in zip(cells, task_names):
+                report = scheduler.BuildReports.get(cell.build_dir)
+                if report is None:
+                    continue
+
+                dm.stream.write(
+                    textwrap.dedent(
+                        """\
+
+                        ----------------------------------------------------------------------
+                        |  Build Times: {}
+                        ----------------------------------------------------------------------
+                        """,
+                    ).format(task_name),
+                )
+
+                NinjaLog.WriteSummary(report, dm.stream)
+
         return dm.result
 
 
+# ----------------------------------------------------------------------
+class _Scheduler(object):
+    """\
+    Distributes a global job budget across the configurations that are actively
+    being processed.
+
+    Builds generated with the JobServer compiler launcher (Ninja and Makefile
+    generators) share a token pool the size of the budget: each build may run as
+    many jobs as the budget allows, but each compilation holds a token while it
+    runs. Jobs released by a build (including one that completes) are therefore
+    used by the builds that are still running, without interrupting them.
+
+    Other builds are started with their fair share of the budget at the time that
+    they start; builds that start after other configurations have completed receive
+    a larger share.
+
+    The number of concurrent link jobs (Ninja only) is based on the memory available
+    when the build directories are generated, as it is written to the build files;
+    link jobs do not acquire tokens from the pool.
+
+    Tests that run while a build is in progress (see `_TestPipeline`) acquire tokens
+    from the pool when the build uses it; otherwise, the jobs that they use are
+    reserved from the build's share of the budget.
+
+    Configurations that share a configure dir (which is the case when using a
+    multi-configuration generator) are built one at a time, as the build tool
+    state within that directory is shared; these configurations are treated as
+    a single consumer of the job budget.
+
+    All processes are launched via `Execute` so that they can be interrupted
+    when the scheduler is cancelled; `WasCancelled` indicates if the processes
+    associated with a configuration were interrupted (or not started) as a result.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        cells,
+        max_jobs=None,
+        link_memory_mb=None,
+        compiler_cache_statistics_filename=None,
+    ):
+        max_jobs = max_jobs or multiprocessing.cpu_count()
+
+        link_jobs = None
+
+        if link_memory_mb:
+            available_memory_mb = _GetAvailableMemoryMB()
+            if available_memory_mb is not None:
+                link_jobs = max(
+                    1,
+                    (available_memory_mb // link_memory_mb) // len(set(cell.configure_dir for cell in cells)),
+                )
+
+        self.MaxJobs                        = max_jobs
+        self.LinkJobs                       = link_jobs
+
+        # build_dir -> build time report generated from the Ninja log
+        self.BuildReports                   = {}
+
+        self.IsCancelled                    = False
+
+        self._compiler_cache_statistics_filename = compiler_cache_statistics_filename
+
+        self._lock                          = threading.Lock()
+        self._processes                     = set()
+        self._interrupted_processes         = set()
+
+        # build_dirs of configurations whose processes were interrupted (or not started)
+        # due to cancellation
+        self._cancelled_build_dirs          = set()
+
+        # configure_dir -> number of cells that have not completed
+        self._pending_configure_dirs        = {}
+
+        # configure_dir -> lock used to serialize builds within the directory
+        self._build_locks                   = {}
+
+        for cell in cells:
+            self._pending_configure_dirs[cell.configure_dir] = self._pending_configure_dirs.get(cell.configure_dir, 0) + 1
+            self._build_locks.setdefault(cell.configure_dir, threading.Lock())
+
+    # ----------------------------------------------------------------------
+    def GetJobs(self):
+        with self._lock:
+            return self._GetJobsNoLock()
+
+    # ----------------------------------------------------------------------
+    def Execute(
+        self,
+        cell,
+        command_line,
+        output_stream,
+        on_process_started=None,
+        on_output_line=None,
+        additional_environment=None,
+        cwd=None,
+    ):
+        """\
+        Executes the command line within the cell's environment, returning its result
+        (or -1 if the scheduler was cancelled before it started).
+        """
+
+        if self.IsCancelled:
+            with self._lock:
+                self._cancelled_build_dirs.add(cell.build_dir)
+
+            return -1
+
+        processes = []
+
+        # ----------------------------------------------------------------------
+        def OnProcessStarted(process):
+            with self._lock:
+                processes.append(process)
+                self._processes.add(process)
+
+                is_cancelled = self.IsCancelled
+
+                if is_cancelled:
+                    self._interrupted_processes.add(process)
+
+            # The scheduler may have been cancelled while the process was being created
+            if is_cancelled:
+                _InterruptProcess(process)
+
+            if on_process_started is not None:
+                on_process_started(process)
+
+        # ----------------------------------------------------------------------
+
+        environment = dict(cell.environment)
+
+        if self._compiler_cache_statistics_filename is not None:
+            environment[CompilerCache.STATISTICS_FILENAME_ENVIRONMENT_VARIABLE] = self._compiler_cache_statistics_filename
+
+        if additional_environment:
+            environment.update(additional_environment)
+
+        result = -1
+
+        try:
+            result = _Execute(
+                command_line,
+                output_stream,
+                environment=environment,
+                on_process_started=OnProcessStarted,
+                on_output_line=on_output_line,
+                cwd=cwd,
+            )
+        finally:
+            with self._lock:
+                for process in processes:
+                    self._processes.discard(process)
+
+                    # A process that completed successfully wasn't impacted by the interruption
+                    if process in self._interrupted_processes:
+                        self._interrupted_processes.discard(process)
+
+                        if result != 0:
+                            self._cancelled_build_dirs.add(cell.build_dir)
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def WasCancelled(self, cell):
+        """Returns True if processes associated with the cell were interrupted (or not started) due to cancellation"""
+
+        with self._lock:
+            return cell.build_dir in self._cancelled_build_dirs
+
+    # ----------------------------------------------------------------------
+    def Cancel(self):
+        """Interrupts all running processes; returns False if the scheduler was already cancelled"""
+
+        with self._lock:
+            if self.IsCancelled:
+                return False
+
+            self.IsCancelled = True
+            processes = list(self._processes)
+
+            self._interrupted_processes.update(processes)
+
+        for process in processes:
+            _InterruptProcess(process)
+
+        return True
+
+    # ----------------------------------------------------------------------
+    def AcquirePoolTokens(self, max_tokens):
+        """\
+        Blocks until at least one token in the pool shared by builds that use the
+        JobServer compiler launcher is available, returning the acquired tokens (up
+        to `max_tokens`); close the returned files to release the tokens.
+        """
+
+        return JobServer.AcquireTokens(
+            JobServer.GetDefaultPoolDir(self.MaxJobs),
+            self.MaxJobs,
+            max_tokens,
+        )
+
+    # ----------------------------------------------------------------------
+    def Build(
+        self,
+        cell,
+        output_stream,
+        on_status_update,
+        on_output_line=None,
+        reserved_jobs=0,
+    ):
+        on_status_update("Building (Waiting)")
+
+        with self._build_locks[cell.configure_dir]:
+            ninja_log_filename = os.path.join(cell.configure_dir, NinjaLog.LOG_FILENAME)
+
+            # Report on the steps written to the log by this build
+            ninja_log_position = NinjaLog.GetLogPosition(ninja_log_filename)
+
+            if _UsesJobServerLauncher(cell.configure_dir):
+                jobs = self.MaxJobs
+                additional_environment = JobServer.GetLauncherEnvironment(self.MaxJobs)
+
+                on_status_update("Building (shared pool of {} jobs)".format(jobs))
+            else:
+                # Jobs used by other processes associated with the configuration
+                # (for example, pipelined tests) are not available to the build
+                jobs = max(1, self.GetJobs() - reserved_jobs)
+                additional_environment = None
+
+                on_status_update("Building ({} jobs)".format(jobs))
+
+            result = self.Execute(
+                cell,
+                'cmake --build "{configure_dir}"{config} --parallel {jobs}'.format(
+                    configure_dir=cell.configure_dir,
+                    config=" --config {}".format(cell.configuration) if cell.is_multi_config else "",
+                    jobs=jobs,
+                ),
+                output_stream,
+                on_output_line=on_output_line,
+                additional_environment=additional_environment,
+            )
+
+            report = NinjaLog.CreateReport(
+                ninja_log_filename,
+                position=ninja_log_position,
+            )
+
+        if report is not None:
+            FileSystem.MakeDirs(cell.build_dir)
+            NinjaLog.Save(os.path.join(cell.build_dir, BUILD_TIMES_FILENAME), report)
+
+            with self._lock:
+                self.BuildReports[cell.build_dir] = report
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def Complete(self, cell):
+        with self._lock:
+            assert self._pending_configure_dirs[cell.configure_dir] > 0, cell.configure_dir
+            self._pending_configure_dirs[cell.configure_dir] -= 1
+
+            # Builds that start after this point receive a larger share of the budget
+            if not self._pending_configure_dirs[cell.configure_dir]:
+                del self._pending_configure_dirs[cell.configure_dir]
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetJobsNoLock(self):
+        return max(1, self.MaxJobs // max(1, len(self._pending_configure_dirs)))
+
+
+# ----------------------------------------------------------------------
+def _DiscoverWorkingDirs(discovery_root):
+    """\
+    Returns the directories under `discovery_root` that contain a 'CMakeLists.txt' file
+    that invokes 'project'. Directories below a discovered project are not searched, as
+    they are considered to be a part of that project.
+    """
+
+    project_regex = re.compile(r"^\s*project\s*\(", re.IGNORECASE | re.MULTILINE)
+
+    exclude_dir_names = set(FileSystem.CODE_EXCLUDE_DIR_NAMES) | set(["build"])
+
+    working_dirs = []
+
+    for root, dirs, filenames in os.walk(discovery_root):
+        if "CMakeLists.txt" in filenames:
+            with open(os.path.join(root, "CMakeLists.txt")) as f:
+                content = f.read()
+
+            if project_regex.search(content):
+                working_dirs.append(root)
+
+                dirs[:] = []
+                continue
+
+        dirs[:] = sorted(dirname for dirname in dirs if dirname not in exclude_dir_names)
+
+    return working_dirs
+
+
+# ----------------------------------------------------------------------
+def _ParseCompilers(compilers):
+    """\
+    Returns a list of (compiler_name, compiler_executable or None, c_compiler_executable or None)
+    tuples; `c_compiler_executable` is None when it isn't provided and cannot be derived from
+    `compiler_executable`.
+    """
+
+    if not compilers:
+        return [(os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME"), None, None)]
+
+    results = []
+
+    for compiler in compilers:
+        compiler_name, sep, executables = compiler.partition("=")
+
+        if not sep:
+            results.append((compiler_name, None, None))
+            continue
+
+        compiler_executable, sep, c_compiler_executable = executables.partition(",")
+
+        if not sep:
+            c_compiler_executable = _DeriveCCompiler(compiler_executable)
+
+        results.append((compiler_name, compiler_executable, c_compiler_executable))
+
+    return results
+
+
+# ----------------------------------------------------------------------
+_c_compiler_substitutions                   = [
+    (re.compile(r"clang\+\+"), "clang"),
+    (re.compile(r"g\+\+"), "gcc"),
+    (re.compile(r"c\+\+"), "cc"),
+    (re.compile(r"^icpc"), "icc"),
+    (re.compile(r"^icpx"), "icx"),
+    (re.compile(r"^(clang-)?cl$"), None),
+]
+
+
+# ----------------------------------------------------------------------
+def _DeriveCCompiler(compiler_executable):
+    """Returns the c compiler associated with the c++ compiler executable or None if it cannot be determined"""
+
+    dirname, basename = os.path.split(compiler_executable)
+    name, ext = os.path.splitext(basename)
+
+    # 'splitext' treats version suffixes (for example, 'g++-12.2') as extensions
+    if ext.lower() != ".exe":
+        name = basename
+        ext = ""
+
+    for regex, replacement in _c_compiler_substitutions:
+        if not regex.search(name):
+            continue
+
+        # MSVC-style compilers compile both c and c++
+        if replacement is not None:
+            name = regex.sub(replacement, name, count=1)
+
+        return os.path.join(dirname, name + ext) if dirname else name + ext
+
+    return None
+
+
+# ----------------------------------------------------------------------
+def _CreateCleanScript(cell):
+    """Creates a python file that can be used to clean the directory"""
+
+    if cell.is_multi_config:
+        # The configuration-specific output dir is created during the build
+        FileSystem.MakeDirs(cell.build_dir)
+
+    existing_items = os.listdir(cell.build_dir)
+    assert existing_items or cell.is_multi_config
+
+    with open(os.path.join(cell.build_dir, "Clean.py"), "w") as f:
+        f.write(
+            textwrap.dedent(
+                """\
+                #!/usr/bin/env python
+
+                import os
+                import sys
+
+                import CommonEnvironment
+                from CommonEnvironment import CommandLine
+                from CommonEnvironment import FileSystem
+                from CommonEnvironment.StreamDecorator import StreamDecorator
+
+                # ----------------------------------------------------------------------
+                _script_fullpath                            = CommonEnvironment.ThisFullpath()
+                _script_dir, _script_name                   = os.path.split(_script_fullpath)
+                # ----------------------------------------------------------------------
+
+                @CommandLine.EntryPoint
+                @CommandLine.Constraints(
+                    output_stream=None,
+                )
+                def EntryPoint(
+                    all=False,
+                    output_stream=sys.stdout,
+                ):
+                    with StreamDecorator(output_stream).DoneManager(
+                        line_prefix="",
+                        prefix="\\nResults: ",
+                        suffix="\\n",
+                    ) as dm:
+                        existing_items = set([{existing_items_list}])
+
+                        for item in os.listdir(_script_dir):
+                            if item in existing_items or item == _script_name:
+                                continue
+
+                            fullpath = os.path.join(_script_dir, item)
+
+                            dm.stream.write("Removing '{{}}'...".format(fullpath))
+                            with dm.stream.DoneManager():
+                                FileSystem.RemoveItem(fullpath)
+
+                        cmake_dirs = os.path.normpath(os.path.join(_script_dir, {cmake_files_dir}))
+
+                        # Multi-configuration build dirs share 'CMakeFiles' across configurations;
+                        # only content specific to this configuration is removed in that scenario.
+                        configuration = {configuration}
+
+                        if all and configuration is None:
+                            dm.stream.write("Removing '{{}}'...".format(cmake_dirs))
+                            with dm.stream.DoneManager():
+                                FileSystem.RemoveTree(cmake_dirs)
+
+                        else:
+                            dirs_to_delete = []
+
+                            for fullpath, _ in FileSystem.WalkDirs(
+                                cmake_dirs,
+                                include_dir_names=[lambda name: os.path.splitext(name)[1] == ".dir"],
+                            ):
+                                if configuration is not None:
+                                    fullpath = os.path.join(fullpath, configuration)
+                                    if not os.path.isdir(fullpath):
+                                        continue
+
+                                dirs_to_delete.append(fullpath)
+
+                            for dir_to_delete in dirs_to_delete:
+                                dm.stream.write("Removing '{{}}'...".format(dir_to_delete))
+                                with dm.stream.DoneManager():
+                                    FileSystem.RemoveTree(dir_to_delete)
+
+                        return dm.result
+
+
+                # ----------------------------------------------------------------------
+                # ----------------------------------------------------------------------
+                # ----------------------------------------------------------------------
+                if __name__ == "__main__":
+                    try:
+                        sys.exit(CommandLine.Main())
+                    except KeyboardInterrupt:
+                        pass
+                """,
+            ).format(
+                existing_items_list=", ".join(
+                    ['"{}"'.format(existing_item) for existing_item in existing_items],
+                ),
+                cmake_files_dir=repr("../CMakeFiles" if cell.is_multi_config else "CMakeFiles"),
+                configuration=repr(cell.configuration if cell.is_multi_config else None),
+            ),
+        )
+
+
 # ----------------------------------------------------------------------
 def _PrintHeader(name, output_stream):
     output_stream.write(
@@ -382,22 +1376,348 @@ def _PrintHeader(name, output_stream):
 
 
 # ----------------------------------------------------------------------
-def _BuildImpl(build_dir, output_stream):
-    return Process.Execute(
-        'cmake --build "{build_dir}"'.format(
-            build_dir=build_dir,
+def _BuildAndTest(
+    cell,
+    scheduler,
+    output_stream,
+    on_status_update,
+    test=False,
+    pipeline=False,
+):
+    on_status_update("Building")
+    _PrintHeader("Build Output", output_stream)
+
+    test_pipeline = None
+
+    if test and pipeline:
+        if os.path.isfile(os.path.join(cell.configure_dir, "build.ninja")):
+            test_pipeline = _TestPipeline(cell, scheduler)
+        else:
+            output_stream.write(
+                "Tests will not be pipelined, as '{}' was not generated by Ninja.\n\n".format(
+                    cell.configure_dir,
+                ),
+            )
+
+    result = scheduler.Build(
+        cell,
+        output_stream,
+        on_status_update,
+        on_output_line=test_pipeline.OnOutputLine if test_pipeline is not None else None,
+        reserved_jobs=test_pipeline.ReservedJobs if test_pipeline is not None else 0,
+    )
+
+    pipelined_test_names = None
+
+    if test_pipeline is not None:
+        _PrintHeader("Pipelined Test Output", output_stream)
+
+        # Tests that haven't started yet won't be run if the build failed
+        pipeline_result, pipelined_test_names = test_pipeline.Complete(
+            output_stream,
+            cancel=result != 0,
+        )
+
+        if result == 0:
+            result = pipeline_result
+
+    if result != 0:
+        return result
+
+    if test:
+        on_status_update("Testing")
+        _PrintHeader("Test Output", output_stream)
+
+        result = _TestImpl(
+            cell,
+            scheduler,
+            output_stream,
+            exclude_test_names=pipelined_test_names,
+        )
+        if result != 0:
+            return result
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+class _TestPipeline(object):
+    """\
+    Runs the tests associated with an executable as soon as it has been linked,
+    while the remainder of the build continues.
+
+    Ninja writes the description of a build step once the step has completed
+    (when its output is not a terminal), so the executable is available as soon
+    as its "Linking CXX executable" line is encountered. Only the test named
+    after the executable (as registered by `build_tests`) is run; benchmark
+    tests are deferred until the build is complete so that their results are
+    not skewed by the build.
+
+    CTest writes its logs and cost data to the build dir, so pipelined tests are
+    run by a single ctest process at a time; the tests of all executables that
+    were linked while the previous process was running are run by the next one.
+    The jobs used by these processes are acquired from the scheduler's token pool
+    when the build uses it and reserved from the build's share of the budget when
+    it does not (see `ReservedJobs`).
+    """
+
+    _linking_regex                          = re.compile(r"Linking CXX executable (?P<filename>.+?)\s*$")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, cell, scheduler):
+        self._cell                          = cell
+        self._scheduler                     = scheduler
+
+        self._jobs                          = max(1, scheduler.GetJobs() // PIPELINE_TEST_JOBS_DIVISOR)
+        self._uses_pool                     = _UsesJobServerLauncher(cell.configure_dir)
+
+        self._queue                         = six.moves.queue.Queue()
+        self._results                       = []
+        self._is_cancelled                  = False
+
+        self._thread                        = threading.Thread(target=self._Worker)
+        self._thread.start()
+
+    # ----------------------------------------------------------------------
+    @property
+    def ReservedJobs(self):
+        """Number of jobs that should not be used by the build"""
+        return 0 if self._uses_pool else self._jobs
+
+    # ----------------------------------------------------------------------
+    def OnOutputLine(self, line):
+        match = self._linking_regex.search(line)
+        if not match:
+            return
+
+        filename = match.group("filename")
+
+        if CurrentShell.CategoryName == "Windows":
+            filename = os.path.splitext(filename)[0]
+
+        self._queue.put(os.path.basename(filename))
+
+    # ----------------------------------------------------------------------
+    def Complete(self, output_stream, cancel=False):
+        """Waits for running tests to complete and returns (result, test_names)"""
+
+        if cancel:
+            self._is_cancelled = True
+
+        self._queue.put(None)
+        self._thread.join()
+
+        result = 0
+        test_names = []
+
+        for these_test_names, this_result, output in self._results:
+            output_stream.write(output)
+
+            if this_result != 0 and result == 0:
+                result = this_result
+
+            test_names += these_test_names
+
+        return result, test_names
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Worker(self):
+        is_complete = False
+
+        while not is_complete:
+            test_names = [self._queue.get()]
+
+            while True:
+                try:
+                    test_names.append(self._queue.get_nowait())
+                except six.moves.queue.Empty:
+                    break
+
+            if None in test_names:
+                is_complete = True
+                test_names = [test_name for test_name in test_names if test_name is not None]
+
+            if not test_names or self._is_cancelled or self._scheduler.IsCancelled:
+                continue
+
+            tokens = self._scheduler.AcquirePoolTokens(self._jobs) if self._uses_pool else []
+
+            try:
+                sink = six.moves.StringIO()
+
+                result = self._scheduler.Execute(
+                    self._cell,
+                    'ctest{config} -R "^({test_names})$" --parallel {jobs}'.format(
+                        config=" -C {}".format(self._cell.configuration) if self._cell.is_multi_config else "",
+                        test_names="|".join(re.escape(test_name) for test_name in test_names),
+                        jobs=len(tokens) or self._jobs,
+                    ),
+                    sink,
+                    cwd=self._cell.configure_dir,
+                )
+
+            finally:
+                for token in tokens:
+                    token.close()
+
+            output = sink.getvalue()
+
+            # Executables created by `build_binary` do not have associated tests
+            if "No tests were found" in output:
+                continue
+
+            self._results.append((test_names, result, output))
+
+
+# ----------------------------------------------------------------------
+def _TestImpl(
+    cell,
+    scheduler,
+    output_stream,
+    exclude_test_names=None,
+):
+    # Tests must be executed from the build dir. Set the working directory of the
+    # spawned process rather than this process so that tests associated with different
+    # configurations can run at the same time.
+    return scheduler.Execute(
+        cell,
+        'ctest{config}{exclude} --parallel {jobs}'.format(
+            config=" -C {}".format(cell.configuration) if cell.is_multi_config else "",
+            exclude=' -E "^({})$"'.format(
+                "|".join(re.escape(test_name) for test_name in exclude_test_names),
+            ) if exclude_test_names else "",
+            jobs=scheduler.GetJobs(),
         ),
         output_stream,
+        cwd=cell.configure_dir,
     )
 
 
 # ----------------------------------------------------------------------
-def _TestImpl(build_dir, output_stream):
-    # Tests must be executed from the build dir
-    prev_dir = os.getcwd()
-    os.chdir(build_dir)
-    with CallOnExit(lambda: os.chdir(prev_dir)):
-        return Process.Execute("ctest --parallel", output_stream)
+def _Execute(
+    command_line,
+    output_stream,
+    environment=None,
+    on_process_started=None,
+    on_output_line=None,
+    cwd=None,
+):
+    """Executes the command line in its own process group so that it can be interrupted via `_InterruptProcess`"""
+
+    if CurrentShell.CategoryName == "Windows":
+        kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        kwargs = {"start_new_session": True}
+
+    process = subprocess.Popen(
+        command_line,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=environment,
+        cwd=cwd,
+        **kwargs
+    )
+
+    if on_process_started is not None:
+        on_process_started(process)
+
+    for line in iter(process.stdout.readline, b""):
+        line = line.decode("utf-8", "replace").replace("\r\n", "\n")
+
+        output_stream.write(line)
+
+        if on_output_line is not None:
+            on_output_line(line)
+
+    return process.wait()
+
+
+# ----------------------------------------------------------------------
+def _SupportsCompilerLaunchers(generator):
+    if generator is None:
+        # The default generator is Visual Studio on Windows and Unix Makefiles elsewhere
+        return CurrentShell.CategoryName != "Windows"
+
+    return generator.startswith("Ninja") or generator.endswith("Makefiles")
+
+
+# ----------------------------------------------------------------------
+def _UsesJobServerLauncher(configure_dir):
+    """Returns True if the build dir was generated with the JobServer compiler launcher"""
+
+    cache_filename = os.path.join(configure_dir, "CMakeCache.txt")
+    if not os.path.isfile(cache_filename):
+        return False
+
+    script_name = os.path.basename(JobServer.GetLauncher()[1])
+
+    with open(cache_filename) as f:
+        for line in f:
+            if line.startswith("CMAKE_CXX_COMPILER_LAUNCHER") and script_name in line:
+                return True
+
+    return False
+
+
+# ----------------------------------------------------------------------
+def _InterruptProcess(process):
+    """Interrupts the process (and all of its children) started by `_Execute`"""
+
+    try:
+        if CurrentShell.CategoryName == "Windows":
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            os.killpg(process.pid, signal.SIGINT)
+    except OSError:
+        # The process has already terminated
+        pass
+
+
+# ----------------------------------------------------------------------
+def _GetAvailableMemoryMB():
+    """Returns the available physical memory (in MB) or None if it cannot be determined"""
+
+    if CurrentShell.CategoryName == "Windows":
+        import ctypes
+
+        # ----------------------------------------------------------------------
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        # ----------------------------------------------------------------------
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+
+        return status.ullAvailPhys // (1024 * 1024)
+
+    # Prefer 'MemAvailable', as it includes memory that can be reclaimed from caches
+    if os.path.isfile("/proc/meminfo"):
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+
+    try:
+        return (os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")) // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
 
 
 # ----------------------------------------------------------------------
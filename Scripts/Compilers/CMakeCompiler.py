@@ -15,11 +15,18 @@
 # ----------------------------------------------------------------------
 """Contains the Compiler object and entry point"""
 
+import json
 import os
 import re
 import shutil
 import sys
 import textwrap
+import threading
+import time
+
+from collections import OrderedDict
+
+import six
 
 import CommonEnvironment
 from CommonEnvironment.CallOnExit import CallOnExit
@@ -49,11 +56,50 @@ from CommonEnvironment.TypeInfo.FundamentalTypes.DirectoryTypeInfo import (
     DirectoryTypeInfo,
 )
 
+from CppCommon import ArtifactStore
+from CppCommon import BenchmarkRunner
+from CppCommon import CMakeFileApi
+from CppCommon import CMakeFingerprint
+from CppCommon import CompilerCache
+from CppCommon import JobServer
+from CppCommon import NinjaLog
+
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
 _script_dir, _script_name                   = os.path.split(_script_fullpath)
 # ----------------------------------------------------------------------
 
+sys.path.insert(0, os.path.join(_script_dir, "..", "TestParsers"))
+with CallOnExit(lambda: sys.path.pop(0)):
+    from CMakeTestParser import StreamParser as CMakeTestStreamParser
+
+# Name of the file within the output dir that contains the build time report
+# generated from the Ninja log
+BUILD_TIMES_FILENAME                        = "CMakeCompiler.build_times.json"
+
+# Name of the file within the output dir that contains the cached list of output filenames
+# and (when available) the names of the targets that compile each source file
+OUTPUT_FILENAMES_CACHE_FILENAME             = "CMakeCompiler.output_filenames.json"
+
+# Name of the file within the output dir that contains metrics about the removal of
+# temporary artifacts
+CLEANUP_METRICS_FILENAME                    = "CMakeCompiler.cleanup.json"
+
+# Name of the file within the output dir that the compiler cache writes statistics to
+# during an invocation
+COMPILER_CACHE_STATISTICS_FILENAME          = "CMakeCompiler.compiler_cache_statistics.txt"
+
+# Maximum number of threads used to remove temporary artifacts
+MAX_CLEANUP_THREADS                         = 8
+
+# Name of the directory within the output dir that contains profile data generated
+# during profile-guided optimization (this is the default value of `CppCommon_PGO_PROFILE_DIR`)
+PGO_PROFILE_DIRNAME                         = "pgo_profile"
+
+# Name of the file within the output dir that contains the benchmark results of the
+# baseline and profile-guided optimization builds
+PGO_RESULTS_FILENAME                        = "CMakeCompiler.pgo.json"
+
 # ----------------------------------------------------------------------
 @Interface.staticderived
 class Compiler(
@@ -88,52 +134,177 @@ class Compiler(
     @staticmethod
     @Interface.override
     def CreateInvokeCommandLine(context, verbose_stream):
-        return 'cmake --build "{build}"'.format(
+        command_lines = []
+
+        # The output dir will not have been configured if the output filenames were cached
+        if not os.path.isfile(os.path.join(context["output_dir"], "CMakeCache.txt")):
+            configure_command_line = context["configure_command_line"]
+
+            if context["use_jobserver"]:
+                configure_command_line = JobServer.CreateCommandLine(
+                    configure_command_line,
+                    max_tokens=1,
+                )
+
+            command_lines.append(configure_command_line)
+
+        build_command_line = 'cmake --build "{build}"'.format(
             build=context["output_dir"],
         )
 
+        if context["use_jobserver"]:
+            build_command_line = JobServer.CreateCommandLine(build_command_line)
+
+        command_lines.append(build_command_line)
+
+        return " && ".join(command_lines)
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    @Interface.override
+    def _InvokeImplEx(cls, invoke_reason, context, status_stream, verbose_stream, verbose):
+        if context["artifact_store_entry"] is not None:
+            artifact_id = context["artifact_store_entry"][0]
+
+            if ArtifactStore.Restore(
+                context["artifact_store_dir"],
+                artifact_id,
+                context["output_dir"],
+                context["artifact_store_root_dir"],
+            ):
+                verbose_stream.write("Outputs were restored from the artifact store ({}).\n".format(artifact_id))
+                return 0
+
+        environment = None
+        statistics_filename = None
+
+        if context["compiler_cache_dir"]:
+            # Statistics are written to a file specific to this invocation
+            statistics_filename = os.path.join(context["output_dir"], COMPILER_CACHE_STATISTICS_FILENAME)
+            FileSystem.RemoveFile(statistics_filename)
+
+            environment = dict(os.environ)
+            environment[CompilerCache.STATISTICS_FILENAME_ENVIRONMENT_VARIABLE] = statistics_filename
+
+        try:
+            if context["is_pgo"]:
+                return _InvokePgo(context, status_stream, verbose_stream, verbose, environment)
+
+            if context["artifact_store_key"] is not None:
+                # Files restored from the store may be hardlinks; remove them so that the
+                # linker doesn't modify the stored content in place.
+                ArtifactStore.RemoveRestored(context["output_dir"])
+
+            result, _ = _ExecuteCommandLine(
+                cls.CreateInvokeCommandLine(context, verbose_stream),
+                status_stream,
+                verbose_stream,
+                verbose,
+                environment,
+            )
+
+            if result == 0 and context["artifact_store_key"] is not None:
+                _StoreArtifacts(context, verbose_stream)
+
+            return result
+
+        finally:
+            if statistics_filename is not None:
+                for cache_dir, statistics in sorted(six.iteritems(CompilerCache.GetStatistics(statistics_filename))):
+                    summary = CompilerCache.CreateStatisticsSummary(cache_dir, statistics)
+                    if summary is not None:
+                        verbose_stream.write("{}\n".format(summary))
+
+                FileSystem.RemoveFile(statistics_filename)
+
     # ----------------------------------------------------------------------
     @staticmethod
     @Interface.override
     def RemoveTemporaryArtifacts(context):
         output_dir = context["output_dir"]
 
-        # Move GCC-generated profile data to the output dir
-        for filename in FileSystem.WalkFiles(
+        # Preserve information about where the build time was spent
+        report = NinjaLog.CreateReport(
+            os.path.join(output_dir, NinjaLog.LOG_FILENAME),
+            position=context["ninja_log_position"],
+        )
+        if report is not None:
+            NinjaLog.Save(os.path.join(output_dir, BUILD_TIMES_FILENAME), report)
+
+        start_time = time.time()
+
+        if context["preserve_build_tree"]:
+            # Keep the build tree so that the next build is incremental; only remove
+            # the output generated by ctest.
+            remove_dir_names = ["Testing"]
+            remove_file_names = []
+            remove_extensions = []
+        else:
+            remove_dir_names = ["CMakeFiles", "Testing", CMakeFileApi.API_DIRNAME, PGO_PROFILE_DIRNAME]
+            remove_file_names = ["CMakeCache.txt", "cmake_install.cmake", "Makefile"]
+            remove_extensions = [".ilk"]
+
+        profile_filenames, remove_dirs, remove_files = _ScanOutputDir(
             output_dir,
-            include_file_extensions=[".gcno", ".gcda"],
-        ):
+            remove_dir_names,
+            remove_file_names,
+            remove_extensions,
+        )
+
+        # Move GCC-generated profile data to the output dir. The files can be moved
+        # when the directories that contain them are about to be removed; otherwise,
+        # they are linked so that the build tree remains intact.
+        linked = 0
+        copied = 0
+
+        for filename in profile_filenames:
             dest_filename = os.path.join(output_dir, os.path.basename(filename))
-            if dest_filename == filename:
+            if os.path.isfile(dest_filename):
                 continue
 
-            if not os.path.isfile(dest_filename):
-                shutil.copyfile(filename, dest_filename)
+            try:
+                if context["preserve_build_tree"]:
+                    os.link(filename, dest_filename)
+                else:
+                    os.rename(filename, dest_filename)
 
-        for potential_dir in ["CMakeFiles", "Testing"]:
-            potential_dir = os.path.join(output_dir, potential_dir)
-            FileSystem.RemoveTree(potential_dir)
+                linked += 1
 
-        for potential_file in ["CMakeCache.txt", "cmake_install.cmake", "Makefile"]:
-            potential_file = os.path.join(output_dir, potential_file)
-            FileSystem.RemoveFile(potential_file)
+            except (OSError, AttributeError):
+                shutil.copyfile(filename, dest_filename)
+                copied += 1
 
-        remove_extensions = set([".ilk"])
+        _RemoveInParallel(remove_dirs, remove_files)
 
-        for item in os.listdir(output_dir):
-            if os.path.splitext(item)[1] not in remove_extensions:
-                continue
+        # Directories that contained the items removed in parallel are now empty
+        for dir_name in remove_dir_names:
+            FileSystem.RemoveTree(os.path.join(output_dir, dir_name))
 
-            fullpath = os.path.join(output_dir, item)
-            FileSystem.RemoveFile(fullpath)
+        with open(os.path.join(output_dir, CLEANUP_METRICS_FILENAME), "w") as f:
+            json.dump(
+                OrderedDict(
+                    [
+                        ("cleanup_ms", int((time.time() - start_time) * 1000)),
+                        ("profile_files_linked", linked),
+                        ("profile_files_copied", copied),
+                        ("removed_dirs", len(remove_dirs)),
+                        ("removed_files", len(remove_files)),
+                    ],
+                ),
+                f,
+                indent=2,
+            )
 
     # ----------------------------------------------------------------------
     @staticmethod
     @Interface.override
     def ExecuteExclusively(context):
         # Don't allow the parallel execution of cmake files, as each of them
-        # internally will compile on all available threads.
-        return True
+        # internally will compile on all available threads. Builds may run in parallel
+        # when the job server has been explicitly requested, as the number of threads
+        # used by each build is limited by the tokens that it acquires (this requires
+        # build tools that honor CMAKE_BUILD_PARALLEL_LEVEL).
+        return not context["use_jobserver"]
 
     # ----------------------------------------------------------------------
     # ----------------------------------------------------------------------
@@ -157,8 +328,20 @@ class Compiler(
             ),
             ("is_profile", False),
             ("is_benchmark", False),
+            ("is_pgo", False),
+            ("lto", None),                  # None, "FULL", or "THIN"
             ("disable_debug_info", False),
             ("disable_aslr", False),
+            ("compiler_cache_dir", os.getenv(CompilerCache.CACHE_DIR_ENVIRONMENT_VARIABLE) or None),
+            (
+                "preserve_build_tree",
+                True if os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_PRESERVE_CMAKE_BUILD_TREE") else False,
+            ),
+            (
+                "use_jobserver",
+                True if os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_USE_JOBSERVER") else False,
+            ),
+            ("artifact_store_dir", os.getenv(ArtifactStore.STORE_DIR_ENVIRONMENT_VARIABLE) or None),
         ] + super(Compiler, cls)._GetOptionalMetadata()
 
     # ----------------------------------------------------------------------
@@ -174,90 +357,126 @@ class Compiler(
         if "output_dir" not in metadata:
             return metadata
 
-        # Invoke cmake to get a list of the generated files. The best way that I have found
-        # to do this is to parse generated dot files (as we don't want to get into the business
-        # of parsing cmake files).
-        temp_directory = CurrentShell.CreateTempDirectory()
-        with CallOnExit(lambda: FileSystem.RemoveTree(temp_directory)):
-            dot_filename = os.path.join(temp_directory, "generated.dot")
-
-            command_line_options = [
-                '-S "{}"'.format(metadata["input"]),
-                '-B "{}"'.format(metadata["output_dir"]),
-                '"--graphviz={}"'.format(dot_filename),
-                "-DCMAKE_BUILD_TYPE={}".format(
-                    "Debug" if metadata["is_debug"] else "Release",
-                ),
-                "-DCppCommon_CMAKE_DEBUG_OUTPUT={}".format(
-                    "ON" if metadata["cmake_debug_output"] else "OFF",
-                ),
-                "-DCppCommon_UNICODE={}".format(
-                    "ON" if metadata["use_unicode"] else "OFF",
-                ),
-                "-DCppCommon_STATIC_CRT={}".format(
-                    "ON" if metadata["static_crt"] else "OFF",
-                ),
-                "-DCppCommon_CODE_COVERAGE={}".format(
-                    "ON" if metadata["is_profile"] else "OFF",
-                ),
-                "-DCppCommon_NO_DEBUG_INFO={}".format(
-                    "ON" if metadata["disable_debug_info"] else "OFF",
-                ),
-                "-DCppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION={}".format(
-                    "ON" if metadata["disable_aslr"] else "OFF",
-                ),
-            ]
+        command_line_options = [
+            '-S "{}"'.format(metadata["input"]),
+            '-B "{}"'.format(metadata["output_dir"]),
+            "-DCMAKE_BUILD_TYPE={}".format(
+                "Debug" if metadata["is_debug"] else "Release",
+            ),
+            "-DCppCommon_CMAKE_DEBUG_OUTPUT={}".format(
+                "ON" if metadata["cmake_debug_output"] else "OFF",
+            ),
+            "-DCppCommon_UNICODE={}".format(
+                "ON" if metadata["use_unicode"] else "OFF",
+            ),
+            "-DCppCommon_STATIC_CRT={}".format(
+                "ON" if metadata["static_crt"] else "OFF",
+            ),
+            "-DCppCommon_CODE_COVERAGE={}".format(
+                "ON" if metadata["is_profile"] else "OFF",
+            ),
+            "-DCppCommon_NO_DEBUG_INFO={}".format(
+                "ON" if metadata["disable_debug_info"] else "OFF",
+            ),
+            "-DCppCommon_NO_ADDRESS_SPACE_LAYOUT_RANDOMIZATION={}".format(
+                "ON" if metadata["disable_aslr"] else "OFF",
+            ),
+            "-DCppCommon_LTO={}".format(metadata["lto"] or "OFF"),
+        ]
+
+        if metadata["generator"]:
+            command_line_options.append('-G "{}"'.format(metadata["generator"]))
 
-            if metadata["generator"]:
-                command_line_options.append('-G "{}"'.format(metadata["generator"]))
+        # The outputs do not depend upon the output dir, the use of the compiler cache, or
+        # the benchmark launcher, so the artifact store key is calculated before those
+        # values are applied.
+        artifact_store_values = [option for option in command_line_options if not option.startswith("-B ")]
 
-            result, output = Process.Execute(
-                "cmake {}".format(" ".join(command_line_options)),
+        if metadata["compiler_cache_dir"]:
+            command_line_options += CompilerCache.GetLauncherCMakeArgs(metadata["compiler_cache_dir"])
+
+        command_line_options += BenchmarkRunner.GetLauncherCMakeArgs()
+
+        # The output dir is only configured here when the list of generated files isn't
+        # cached; `CreateInvokeCommandLine` will configure it in that scenario.
+        metadata["configure_command_line"] = "cmake {}".format(" ".join(command_line_options))
+
+        # The files read during configuration (which may be outside of the input dir) are
+        # cached with the output filenames, as the files that list them are removed along
+        # with the rest of the configuration (unless the build tree is preserved).
+        cache_content = _LoadOutputFilenamesCache(metadata["output_dir"])
+
+        # ----------------------------------------------------------------------
+        def CalculateFingerprint(configure_inputs):
+            return CMakeFingerprint.Calculate(
+                metadata["input"],
+                values=command_line_options,
+                configure_inputs=configure_inputs,
             )
-            if result != 0:
-                raise Exception(
-                    textwrap.dedent(
-                        """\
-                        cmake failed ({}):
-                            {}
-                        """,
-                    ).format(result, StringHelpers.LeftJustify(output, 4)),
-                )
 
-            # Parse the dot file. This regular expression has been configured to work
-            # with dot files generated by:
-            #
-            #   - CMake 3.13.4
-            #   - CMake 3.17.2
-            #
-            regex = re.compile(
-                r"""(?#
-                node                        )\"node\d+\"\s*(?#
-                lbracket                    )\[\s*(?#
-                label key                   )label\s*=\s*(?#
-                name                        )\"(?P<name>.+?)\"(?#
-                [optional] comma delimiter  ),?\s+(?#
-                shape key                   )shape\s*=\s*(?#
-                value                       )(?:\"house\"|egg)\s*(?#
-                rbracket                    )\](?#
-                terminator                  );(?#
-                )""",
+        # ----------------------------------------------------------------------
+
+        fingerprint = CalculateFingerprint(
+            cache_content.get("configure_inputs") if cache_content else None,
+        )
+
+        # Incremental builds rely on the build tree rather than the store, profile data
+        # is generated when the outputs are run (and is therefore not stored), and profile-
+        # guided optimization depends upon the behavior of the benchmarks.
+        metadata["artifact_store_root_dir"] = None
+        metadata["artifact_store_key"] = None
+        metadata["artifact_store_entry"] = None
+
+        if (
+            metadata["artifact_store_dir"]
+            and not metadata["preserve_build_tree"]
+            and not metadata["is_profile"]
+            and not metadata["is_pgo"]
+        ):
+            metadata["artifact_store_root_dir"] = ArtifactStore.GetSourceRoot(metadata["input"])
+
+            metadata["artifact_store_key"] = ArtifactStore.CalculateKey(
+                metadata["input"],
+                values=artifact_store_values,
+                compiler_identity=ArtifactStore.GetCompilerIdentity(),
+                root_dir=metadata["artifact_store_root_dir"],
             )
 
-            with open(dot_filename) as f:
-                content = f.read()
+            metadata["artifact_store_entry"] = ArtifactStore.Lookup(
+                metadata["artifact_store_dir"],
+                metadata["artifact_store_key"],
+                metadata["artifact_store_root_dir"],
+            )
 
-            output_filenames = []
+        if metadata["artifact_store_entry"] is not None:
+            # The output dir doesn't need to be configured to know the output filenames
+            output_filenames = [
+                os.path.join(metadata["output_dir"], relpath)
+                for relpath in metadata["artifact_store_entry"][1]
+            ]
+        else:
+            output_filenames = _LoadCachedOutputFilenames(metadata["output_dir"], fingerprint)
+            if output_filenames is None:
+                output_filenames, source_index = _GetOutputFilenames(metadata, command_line_options)
 
-            for match in regex.finditer(content):
-                output_filenames.append(
-                    os.path.join(
-                        metadata["output_dir"],
-                        CurrentShell.CreateExecutableName(match.group("name")),
-                    ),
+                # Calculate the fingerprint again, as the files read during configuration
+                # are now known.
+                configure_inputs = CMakeFingerprint.EnumConfigureInputs(metadata["output_dir"]) or []
+
+                _SaveCachedOutputFilenames(
+                    metadata["output_dir"],
+                    CalculateFingerprint(configure_inputs),
+                    output_filenames,
+                    source_index,
+                    configure_inputs,
                 )
 
-            metadata["output_filenames"] = output_filenames
+        metadata["output_filenames"] = output_filenames
+
+        # The build time report is based on the steps written to the log after this point
+        metadata["ninja_log_position"] = NinjaLog.GetLogPosition(
+            os.path.join(metadata["output_dir"], NinjaLog.LOG_FILENAME),
+        )
 
         return super(Compiler, cls)._CreateContext(metadata, status_stream)
 
@@ -274,6 +493,12 @@ class Compiler(
     generator=CommandLine.StringTypeInfo(
         arity="?",
     ),
+    compiler_cache_dir=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
+    artifact_store_dir=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
     output_stream=None,
 )
 def Compile(
@@ -286,8 +511,15 @@ def Compile(
     no_static_crt=False,
     profile=False,
     benchmark=False,
+    pgo=False,
+    lto=False,
+    thin_lto=False,
     disable_debug_info=False,
     disable_aslr=False,
+    compiler_cache_dir=None,
+    incremental=False,
+    jobserver=False,
+    artifact_store_dir=None,
     output_stream=sys.stdout,
     verbose=False,
 ):
@@ -296,6 +528,12 @@ def Compile(
     inputs = input
     del input
 
+    if pgo and not release:
+        raise CommandLine.UsageException("'/pgo' requires '/release'")
+
+    if lto and thin_lto:
+        raise CommandLine.UsageException("'/lto' and '/thin_lto' cannot be provided together")
+
     return CompilerMod.CommandLineCompile(
         Compiler,
         inputs,
@@ -308,11 +546,476 @@ def Compile(
         static_crt=not no_static_crt,
         is_profile=profile,
         is_benchmark=benchmark,
+        is_pgo=pgo,
+        lto="FULL" if lto else "THIN" if thin_lto else None,
         disable_debug_info=disable_debug_info,
         disable_aslr=disable_aslr,
+        compiler_cache_dir=compiler_cache_dir or os.getenv(CompilerCache.CACHE_DIR_ENVIRONMENT_VARIABLE) or None,
+        preserve_build_tree=incremental or bool(os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_PRESERVE_CMAKE_BUILD_TREE")),
+        use_jobserver=jobserver or bool(os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_USE_JOBSERVER")),
+        artifact_store_dir=artifact_store_dir or os.getenv(ArtifactStore.STORE_DIR_ENVIRONMENT_VARIABLE) or None,
     )
 
 
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _GetOutputFilenames(metadata, command_line_options):
+    """Returns (output_filenames, source_index), where `source_index` is None if it isn't available"""
+
+    # Invoke cmake to get a list of the generated files via the CMake File API. The File API
+    # is not available in versions of CMake prior to 3.14, so fall back to parsing generated
+    # dot files in those scenarios (as we don't want to get into the business of parsing
+    # cmake files). The dot files are generated during the same configuration so that
+    # cmake only needs to be invoked once, regardless of the version.
+    CMakeFileApi.WriteQuery(metadata["output_dir"])
+
+    temp_directory = CurrentShell.CreateTempDirectory()
+    with CallOnExit(lambda: FileSystem.RemoveTree(temp_directory)):
+        dot_filename = os.path.join(temp_directory, "generated.dot")
+
+        _ConfigureCMake(
+            command_line_options + ['"--graphviz={}"'.format(dot_filename)],
+            metadata["use_jobserver"],
+        )
+
+        targets = CMakeFileApi.ReadTargets(metadata["output_dir"])
+        if targets is not None:
+            return CMakeFileApi.GetExecutableFilenames(targets), CMakeFileApi.CreateSourceIndex(targets)
+
+        # Parse the dot file. This regular expression has been configured to work
+        # with dot files generated by:
+        #
+        #   - CMake 3.13.4
+        #   - CMake 3.17.2
+        #
+        regex = re.compile(
+            r"""(?#
+            node                        )\"node\d+\"\s*(?#
+            lbracket                    )\[\s*(?#
+            label key                   )label\s*=\s*(?#
+            name                        )\"(?P<name>.+?)\"(?#
+            [optional] comma delimiter  ),?\s+(?#
+            shape key                   )shape\s*=\s*(?#
+            value                       )(?:\"house\"|egg)\s*(?#
+            rbracket                    )\](?#
+            terminator                  );(?#
+            )""",
+        )
+
+        with open(dot_filename) as f:
+            content = f.read()
+
+        output_filenames = []
+
+        for match in regex.finditer(content):
+            output_filenames.append(
+                os.path.join(
+                    metadata["output_dir"],
+                    CurrentShell.CreateExecutableName(match.group("name")),
+                ),
+            )
+
+        return output_filenames, None
+
+
+# ----------------------------------------------------------------------
+def _ConfigureCMake(command_line_options, use_jobserver):
+    command_line = "cmake {}".format(" ".join(command_line_options))
+
+    # Contexts are created concurrently; acquire a token so that the number of
+    # configurations is limited by the pool shared with the builds.
+    if use_jobserver:
+        command_line = JobServer.CreateCommandLine(command_line, max_tokens=1)
+
+    result, output = Process.Execute(command_line)
+    if result != 0:
+        raise Exception(
+            textwrap.dedent(
+                """\
+                cmake failed ({}):
+                    {}
+                """,
+            ).format(result, StringHelpers.LeftJustify(output, 4)),
+        )
+
+
+# ----------------------------------------------------------------------
+def _LoadCachedOutputFilenames(output_dir, fingerprint):
+    """Returns the cached output filenames or None if they are not cached or the cache is stale"""
+
+    content = _LoadOutputFilenamesCache(output_dir)
+    if content is None:
+        return None
+
+    if CMakeFingerprint.GetChanges(fingerprint, content.get("fingerprint")):
+        return None
+
+    return content.get("output_filenames")
+
+
+# ----------------------------------------------------------------------
+def _LoadOutputFilenamesCache(output_dir):
+    cache_filename = os.path.join(output_dir, OUTPUT_FILENAMES_CACHE_FILENAME)
+    if not os.path.isfile(cache_filename):
+        return None
+
+    try:
+        with open(cache_filename) as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+def _SaveCachedOutputFilenames(output_dir, fingerprint, output_filenames, source_index, configure_inputs):
+    FileSystem.MakeDirs(output_dir)
+
+    with open(os.path.join(output_dir, OUTPUT_FILENAMES_CACHE_FILENAME), "w") as f:
+        json.dump(
+            {
+                "fingerprint": fingerprint,
+                "output_filenames": output_filenames,
+                "source_index": source_index,
+                "configure_inputs": configure_inputs,
+            },
+            f,
+            indent=2,
+        )
+
+
+# ----------------------------------------------------------------------
+def _InvokePgo(context, status_stream, verbose_stream, verbose, environment):
+    """\
+    Builds the output dir three times: a baseline build, a build instrumented to generate
+    profile data (which is generated by running the benchmark tests), and a build optimized
+    with that profile data. All builds use the same output dir, as GCC locates profile data
+    by the name of the object file that it is associated with.
+
+    The benchmark results of the baseline and optimized builds are written to the status
+    stream and `PGO_RESULTS_FILENAME`.
+    """
+
+    output_dir = context["output_dir"]
+    profile_dir = os.path.join(output_dir, PGO_PROFILE_DIRNAME)
+
+    FileSystem.RemoveTree(profile_dir)
+
+    build_command_line = 'cmake --build "{}"'.format(output_dir)
+    benchmark_command_line = 'cd "{}" && ctest --verbose -R "_benchmark$"'.format(output_dir)
+
+    benchmark_results = {}
+
+    for phase, generate, use in [
+        ("baseline", False, False),
+        ("instrumented", True, False),
+        ("optimized", False, True),
+    ]:
+        verbose_stream.write("Profile-guided optimization: {} build...\n".format(phase))
+
+        if use:
+            result = _MergePgoProfileData(profile_dir, status_stream, verbose_stream, verbose)
+            if result != 0:
+                return result
+
+        configure_command_line = '{} "-DCppCommon_PGO_PROFILE_DIR={}" -DCppCommon_PGO_GENERATE={} -DCppCommon_PGO_USE={}'.format(
+            context["configure_command_line"],
+            profile_dir,
+            "ON" if generate else "OFF",
+            "ON" if use else "OFF",
+        )
+
+        # Report on the build time of the final (optimized) build
+        context["ninja_log_position"] = NinjaLog.GetLogPosition(
+            os.path.join(output_dir, NinjaLog.LOG_FILENAME),
+        )
+
+        if context["use_jobserver"]:
+            command_lines = [
+                JobServer.CreateCommandLine(configure_command_line, max_tokens=1),
+                JobServer.CreateCommandLine(build_command_line),
+            ]
+        else:
+            command_lines = [configure_command_line, build_command_line]
+
+        result, output = _ExecuteCommandLine(
+            " && ".join(command_lines + [benchmark_command_line]),
+            status_stream,
+            verbose_stream,
+            verbose,
+            environment,
+        )
+        if result != 0:
+            return result
+
+        if phase == "instrumented":
+            continue
+
+        if "No tests were found" in output:
+            benchmark_data = {}
+        else:
+            # Results for the individual phases are not added to the benchmark history
+            parser = CMakeTestStreamParser()
+            parser.write(output)
+
+            parse_result = parser.Finish()
+
+            if parse_result == -1:
+                if not verbose:
+                    status_stream.write(output)
+
+                return -1
+
+            benchmark_data = parse_result[1] if isinstance(parse_result, tuple) else {}
+
+        benchmark_results[phase] = OrderedDict(
+            (
+                "{} - {}".format(test_name, stat.Name),
+                (stat.Mean, stat.Units),
+            )
+            for test_name, stats in six.iteritems(benchmark_data)
+            for stat in stats
+        )
+
+    # Report the results
+    results = []
+
+    for name, (mean, units) in six.iteritems(benchmark_results["optimized"]):
+        baseline_mean, baseline_units = benchmark_results["baseline"].get(name, (None, None))
+
+        if baseline_units != units:
+            baseline_mean = None
+
+        results.append(
+            OrderedDict(
+                [
+                    ("name", name),
+                    ("units", units),
+                    ("baseline_mean", baseline_mean),
+                    ("pgo_mean", mean),
+                    (
+                        "change_percent",
+                        round(100.0 * (mean - baseline_mean) / baseline_mean, 2)
+                        if baseline_mean
+                        else None,
+                    ),
+                ],
+            ),
+        )
+
+    with open(os.path.join(output_dir, PGO_RESULTS_FILENAME), "w") as f:
+        json.dump(results, f, indent=2)
+
+    if not results:
+        status_stream.write("Profile-guided optimization: no benchmark tests were found; profile data was not generated.\n")
+        return 0
+
+    name_width = max(len(info["name"]) for info in results)
+
+    status_stream.write(
+        "\n{name:<{width}}  {baseline:>16}  {pgo:>16}  {change:>8}\n".format(
+            name="Benchmark",
+            width=name_width,
+            baseline="Baseline",
+            pgo="PGO",
+            change="Change",
+        ),
+    )
+
+    for info in results:
+        status_stream.write(
+            "{name:<{width}}  {baseline:>16}  {pgo:>16}  {change:>8}\n".format(
+                name=info["name"],
+                width=name_width,
+                baseline="{:.2f} {}".format(info["baseline_mean"], info["units"]) if info["baseline_mean"] is not None else "-",
+                pgo="{:.2f} {}".format(info["pgo_mean"], info["units"]),
+                change="{:+.1f}%".format(info["change_percent"]) if info["change_percent"] is not None else "-",
+            ),
+        )
+
+    status_stream.write("\n")
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+def _MergePgoProfileData(profile_dir, status_stream, verbose_stream, verbose):
+    """Merges the raw profile data generated by Clang; GCC profile data is used as-is"""
+
+    if not os.path.isdir(profile_dir):
+        return 0
+
+    profraw_filenames = [item for item in os.listdir(profile_dir) if item.endswith(".profraw")]
+    if not profraw_filenames:
+        return 0
+
+    result, _ = _ExecuteCommandLine(
+        'llvm-profdata merge "-output={}" {}'.format(
+            os.path.join(profile_dir, "default.profdata"),
+            " ".join('"{}"'.format(os.path.join(profile_dir, item)) for item in profraw_filenames),
+        ),
+        status_stream,
+        verbose_stream,
+        verbose,
+    )
+
+    return result
+
+
+# ----------------------------------------------------------------------
+def _ExecuteCommandLine(command_line, status_stream, verbose_stream, verbose, environment=None):
+    """Returns (result, output)"""
+
+    sink = six.moves.StringIO()
+
+    result = Process.Execute(
+        command_line,
+        StreamDecorator([sink, verbose_stream]),
+        environment=environment,
+    )
+
+    if result != 0 and not verbose:
+        status_stream.write(sink.getvalue())
+
+    return result, sink.getvalue()
+
+
+# ----------------------------------------------------------------------
+def _ScanOutputDir(output_dir, remove_dir_names, remove_file_names, remove_extensions):
+    """\
+    Scans the output dir in a single pass, returning (profile_filenames, remove_dirs,
+    remove_files). Directories to remove are split into their immediate children so
+    that they can be removed in parallel.
+    """
+
+    profile_filenames = []
+    remove_dirs = []
+    remove_files = []
+
+    # ----------------------------------------------------------------------
+    def Impl(directory, is_root, is_removed_dir):
+        for entry in os.scandir(directory):
+            is_dir = entry.is_dir(follow_symlinks=False)
+
+            if is_removed_dir:
+                (remove_dirs if is_dir else remove_files).append(entry.path)
+
+            if is_dir:
+                Impl(entry.path, False, is_root and entry.name in remove_dir_names)
+                continue
+
+            ext = os.path.splitext(entry.name)[1]
+
+            if ext in [".gcno", ".gcda"]:
+                if not is_root:
+                    profile_filenames.append(entry.path)
+
+            elif is_root and (entry.name in remove_file_names or ext in remove_extensions):
+                remove_files.append(entry.path)
+
+    # ----------------------------------------------------------------------
+
+    Impl(output_dir, True, False)
+
+    return profile_filenames, remove_dirs, remove_files
+
+
+# ----------------------------------------------------------------------
+def _RemoveInParallel(dirs, files):
+    queue = six.moves.queue.Queue()
+
+    for fullpath in dirs:
+        queue.put((FileSystem.RemoveTree, fullpath))
+
+    for fullpath in files:
+        queue.put((FileSystem.RemoveFile, fullpath))
+
+    # ----------------------------------------------------------------------
+    def Worker():
+        while True:
+            try:
+                func, fullpath = queue.get_nowait()
+            except six.moves.queue.Empty:
+                break
+
+            func(fullpath)
+
+    # ----------------------------------------------------------------------
+
+    threads = [
+        threading.Thread(target=Worker)
+        for _ in range(min(MAX_CLEANUP_THREADS, queue.qsize()))
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+
+# ----------------------------------------------------------------------
+def _StoreArtifacts(context, verbose_stream):
+    output_dir = context["output_dir"]
+
+    # Source files and the artifacts of each target are provided by the File API and
+    # headers by the compiler (via Ninja); the outputs can't be stored if either is
+    # unavailable.
+    content = _LoadOutputFilenamesCache(output_dir)
+    source_index = content.get("source_index") if content else None
+
+    if source_index is None:
+        return
+
+    targets = CMakeFileApi.ReadTargets(output_dir)
+    if targets is None:
+        return
+
+    dependencies = ArtifactStore.GetNinjaDependencies(output_dir)
+    if dependencies is None:
+        return
+
+    # The files read during configuration (which may be outside of the input dir) aren't
+    # part of the store key.
+    dependencies += CMakeFingerprint.EnumConfigureInputs(output_dir) or []
+
+    # Store everything required to run the tests: the executables, the libraries they load,
+    # and the CTest files (which contain the fullpaths of the executables).
+    runtime_filenames = [
+        artifact
+        for target in targets
+        if target.type in ["EXECUTABLE", "SHARED_LIBRARY", "MODULE_LIBRARY"]
+        for artifact in target.artifacts
+        if artifact.startswith(os.path.join(output_dir, "")) and os.path.isfile(artifact)
+    ]
+
+    ctest_filenames = []
+
+    for root, dirs, filenames in os.walk(output_dir):
+        dirs[:] = [
+            dirname
+            for dirname in dirs
+            if dirname not in ["CMakeFiles", "Testing", CMakeFileApi.API_DIRNAME]
+        ]
+
+        if "CTestTestfile.cmake" in filenames:
+            ctest_filenames.append(os.path.join(root, "CTestTestfile.cmake"))
+
+    artifact_id = ArtifactStore.Store(
+        context["artifact_store_dir"],
+        context["artifact_store_key"],
+        context["artifact_store_root_dir"],
+        output_dir,
+        context["output_filenames"],
+        list(source_index.keys()) + dependencies,
+        additional_filenames=runtime_filenames,
+        relocated_filenames=ctest_filenames,
+    )
+
+    if artifact_id is not None:
+        verbose_stream.write("Outputs were added to the artifact store ({}).\n".format(artifact_id))
+
+
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
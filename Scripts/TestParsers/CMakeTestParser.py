@@ -15,15 +15,23 @@
 # ----------------------------------------------------------------------
 """Contains the TestParser object"""
 
+import multiprocessing
 import os
 import re
 
+from collections import OrderedDict
+
+import six
+
 import CommonEnvironment
 from CommonEnvironment import FileSystem
 from CommonEnvironment import Interface
 from CommonEnvironment.TestParserImpl import TestParserImpl
 
-from Catch2TestParser import ExtractBenchmarkOutput as ExtractCatch2BenchmarkOutput
+from CppCommon import BenchmarkHistory
+from CppCommon import BenchmarkRunner
+
+from Catch2TestParser import BenchmarkOutputExtractor as Catch2BenchmarkOutputExtractor, EnumLines
 
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
@@ -51,46 +59,29 @@ class TestParser(TestParserImpl):
     @staticmethod
     @Interface.override
     def Parse(test_data):
-        if "100% tests passed" not in test_data:
-            return -1
+        parser = StreamParser()
 
-        # CTest will append an index before each line of the test output -
-        # remove that if it exists.
-        line_regex = re.compile(r"^\d+: (?P<content>.*)")
+        for line in EnumLines(test_data):
+            parser.ParseLine(line)
 
-        lines = test_data.split("\n")
-        for index, line in enumerate(lines):
-            match = line_regex.match(line)
-            if not match:
-                continue
+        result = parser.Finish()
 
-            lines[index] = match.group("content")
-
-        scrubbed_test_data = "\n".join(lines)
-
-        # CTest can wrap many individual test frameworks - attempt to extract benchmark
-        # data from well-know test frameworks.
-        benchmark_data = None
+        if isinstance(result, tuple) and not BenchmarkHistory.Update(
+            result[1],
+            BenchmarkHistory.ExtractBuildIdentity(test_data),
+        ):
+            result = -1, result[1]
 
-        for extract_func in [ExtractCatch2BenchmarkOutput]:
-            benchmark_data = extract_func(scrubbed_test_data)
-            if benchmark_data:
-                return 0, benchmark_data
-
-        return 0
+        return result
 
     # ----------------------------------------------------------------------
     @staticmethod
     @Interface.override
     def CreateInvokeCommandLine(context, debug_on_error):
-        is_profile_or_benchmark = context.get("is_profile", False) or context.get(
-            "is_benchmark",
-            False,
-        )
-
-        return 'cd "{output_dir}" && ctest --verbose{parallel}'.format(
-            output_dir=context["output_dir"],
-            parallel="" if is_profile_or_benchmark else " --parallel",
+        # The build identity distinguishes the benchmark results in the benchmark history
+        return "{} && {}".format(
+            BenchmarkHistory.CreateBuildIdentityCommandLine(context),
+            _CreateCTestCommandLine(context),
         )
 
     # ----------------------------------------------------------------------
@@ -100,3 +91,137 @@ class TestParser(TestParserImpl):
         for potential_dir in ["Testing"]:
             potential_dir = os.path.join(context["output_dir"], potential_dir)
             FileSystem.RemoveTree(potential_dir)
+
+        FileSystem.RemoveFile(os.path.join(context["output_dir"], BenchmarkRunner.RESOURCE_SPEC_FILENAME))
+
+
+# ----------------------------------------------------------------------
+class StreamParser(object):
+    """\
+    Parses CTest output incrementally, as it is generated; the memory used is
+    independent of the size of the output (beyond the state kept for each test).
+
+    Instances can be used as a stream (for example, the output stream provided to
+    `Process.Execute`) or provided individual lines via `ParseLine`. Call `Finish`
+    once all output has been provided to retrieve a result equivalent to that
+    returned by `TestParser.Parse` (results are not added to the benchmark history).
+    """
+
+    # CTest will append an index before each line of the test output -
+    # remove that if it exists. Output from tests run in parallel is interleaved,
+    # so the index is used to separate the output of each test.
+    _line_regex                             = re.compile(r"^(?P<index>\d+): ")
+
+    # Output may contain the summaries of multiple CTest invocations
+    _summary_regex                          = re.compile(r"^(?P<percent>\d+)% tests passed, \d+ tests? failed out of \d+")
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._has_passed                    = False
+        self._has_failed                    = False
+        self._partial_line                  = ""
+
+        # CTest can wrap many individual test frameworks - attempt to extract benchmark
+        # data from well-know test frameworks. Each test (identified by its index) has
+        # its own extractors.
+        self._benchmark_extractor_types     = [Catch2BenchmarkOutputExtractor]
+        self._benchmark_extractors          = OrderedDict()
+
+    # ----------------------------------------------------------------------
+    def write(self, content):
+        lines = content.split("\n")
+
+        if len(lines) == 1:
+            self._partial_line += lines[0]
+            return
+
+        self.ParseLine(self._partial_line + lines[0])
+
+        for line in lines[1:-1]:
+            self.ParseLine(line)
+
+        self._partial_line = lines[-1]
+
+    # ----------------------------------------------------------------------
+    def flush(self):
+        pass
+
+    # ----------------------------------------------------------------------
+    def ParseLine(self, line):
+        if not self._has_passed and "100% tests passed" in line:
+            self._has_passed = True
+
+        match = self._summary_regex.match(line)
+        if match and match.group("percent") != "100":
+            self._has_failed = True
+
+        match = self._line_regex.match(line)
+        if match:
+            index = match.group("index")
+            line = line[match.end():]
+        else:
+            index = None
+
+        extractors = self._benchmark_extractors.get(index)
+        if extractors is None:
+            extractors = [extractor_type() for extractor_type in self._benchmark_extractor_types]
+            self._benchmark_extractors[index] = extractors
+
+        for extractor in extractors:
+            extractor.ParseLine(line)
+
+    # ----------------------------------------------------------------------
+    def Finish(self):
+        if self._partial_line:
+            self.ParseLine(self._partial_line)
+            self._partial_line = ""
+
+        if not self._has_passed or self._has_failed:
+            return -1
+
+        benchmark_data = OrderedDict()
+
+        for extractors in six.itervalues(self._benchmark_extractors):
+            for extractor in extractors:
+                this_benchmark_data = extractor.Finish()
+                if this_benchmark_data:
+                    benchmark_data.update(this_benchmark_data)
+                    break
+
+        if benchmark_data:
+            return 0, benchmark_data
+
+        return 0
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _CreateCTestCommandLine(context):
+    output_dir = context["output_dir"]
+
+    if context.get("is_profile", False):
+        return 'cd "{}" && ctest --verbose'.format(output_dir)
+
+    if context.get("is_benchmark", False):
+        cpu_groups = BenchmarkRunner.GetCpuGroups()
+
+        if cpu_groups:
+            # Run the tests that aren't benchmarks in parallel, and then run the
+            # benchmarks concurrently, where CTest allocates a CPU group to each
+            # benchmark (see 'BuildHelpers.cmake::build_tests'). Versions of CTest
+            # prior to 3.29 consume the next argument when '--parallel' isn't followed
+            # by a job count, so the count is always provided.
+            resource_spec_filename = os.path.join(output_dir, BenchmarkRunner.RESOURCE_SPEC_FILENAME)
+            BenchmarkRunner.WriteResourceSpecFile(resource_spec_filename, cpu_groups)
+
+            return 'cd "{output_dir}" && ctest --verbose --parallel {num_cpus} -E "_benchmark$" && ctest --verbose --parallel {num_groups} --resource-spec-file "{resource_spec_filename}" -R "_benchmark$"'.format(
+                output_dir=output_dir,
+                num_cpus=multiprocessing.cpu_count(),
+                num_groups=len(cpu_groups),
+                resource_spec_filename=resource_spec_filename,
+            )
+
+        return 'cd "{}" && ctest --verbose'.format(output_dir)
+
+    return 'cd "{}" && ctest --verbose --parallel'.format(output_dir)
@@ -19,13 +19,16 @@ import os
 import re
 import textwrap
 
-from collections import OrderedDict
+from collections import deque, OrderedDict
+from xml.etree import ElementTree
 
 import CommonEnvironment
 from CommonEnvironment import Interface
-from CommonEnvironment import RegularExpression
 from CommonEnvironment.TestParserImpl import TestParserImpl
 
+from CppCommon import BenchmarkHistory
+from CppCommon import BenchmarkRunner
+
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
 _script_dir, _script_name                   = os.path.split(_script_fullpath)
@@ -53,11 +56,28 @@ class TestParser(TestParserImpl):
     @staticmethod
     @Interface.override
     def Parse(test_data):
-        if "All tests passed" not in test_data:
+        extractor = BenchmarkOutputExtractor()
+
+        for line in EnumLines(test_data):
+            extractor.ParseLine(line)
+
+        # Output generated by the XML reporter contains the results; otherwise, rely on
+        # the console reporter's summary.
+        succeeded = extractor.Succeeded
+        if succeeded is None:
+            succeeded = "All tests passed" in test_data
+
+        if not succeeded:
             return -1
 
-        benchmark_data = ExtractBenchmarkOutput(test_data)
+        benchmark_data = extractor.Finish()
         if benchmark_data:
+            if not BenchmarkHistory.Update(
+                benchmark_data,
+                BenchmarkHistory.ExtractBuildIdentity(test_data),
+            ):
+                return -1, benchmark_data
+
             return 0, benchmark_data
 
         return 0
@@ -77,140 +97,471 @@ class TestParser(TestParserImpl):
         dirname, basename = os.path.split(output_filename)
 
         if context.get("is_benchmark", False):
-            flags = "[benchmark]"
-        else:
-            flags = "~[benchmark] --success"
+            # Benchmark results are parsed from output generated by the XML reporter; the
+            # runner pins the process to specific CPUs and aggregates the results of
+            # multiple invocations. The build identity distinguishes the results in the
+            # benchmark history.
+            return '{build_identity} && cd "{output_dir}" && {command_line}'.format(
+                build_identity=BenchmarkHistory.CreateBuildIdentityCommandLine(context),
+                output_dir=dirname,
+                command_line=BenchmarkRunner.CreateCommandLine(
+                    '"{}" [benchmark] --reporter xml'.format(output_filename),
+                ),
+            )
 
-        return 'cd "{output_dir}" && {output_name} {flags}'.format(
+        return 'cd "{output_dir}" && {output_name} ~[benchmark] --success'.format(
             output_dir=dirname,
             output_name=basename,
-            flags=flags,
         )
 
 
 # ----------------------------------------------------------------------
-_ExtractBenchmarkOutput_content_regex       = re.compile(
-    textwrap.dedent(
-        r"""(?#
-        Header          )\~~~~+\r?\n(?#
-        Name            )(?P<name>[^\n]+)(?#
-        text            ) is a Catch v(?#
-        Version         )(?P<catch_version>[\d\.]+)(?#
-        text            ) host application.\s+(?#
-        Content         )(?P<content>.+?)(?#
-        Footer          )====+\r?\n(?#
-        )""",
-    ),
-    re.DOTALL | re.MULTILINE,
+# Console output is processed line by line (rather than with regular expressions
+# that span lines) so that memory is bounded regardless of the size of the output.
+# The expressions below match (complete) lines, with line endings removed.
+
+# Section header in the form:
+#
+#     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#     <name> is a Catch v<version> host application.
+#
+_ConsoleBenchmarkOutputExtractor_section_header_regex          = re.compile(r"~~~~+$")
+_ConsoleBenchmarkOutputExtractor_section_name_regex            = re.compile(
+    r"(?P<name>.+) is a Catch v(?P<catch_version>[\d\.]+) host application\.",
 )
 
-# Note that the representation of line numbers is different on Linux
-# and Windows.
-_ExtractBenchmarkOutput_benchmarks_regex    = re.compile(
+_ConsoleBenchmarkOutputExtractor_section_footer_regex          = re.compile(r"====+$")
+
+# Test header in the form:
+#
+#     ----------------------------------------------------------------
+#     <test name>
+#     ----------------------------------------------------------------
+#     <test filename>:<line>            (Linux)
+#     <test filename>(<line>)           (Windows)
+#     ................................................................
+#
+#     benchmark name            samples       iterations    estimated
+#                               mean          low mean      high mean
+#                               std dev       low std dev   high std dev
+#     ----------------------------------------------------------------
+#
+_ConsoleBenchmarkOutputExtractor_test_header_regex             = re.compile(r"----+$")
+_ConsoleBenchmarkOutputExtractor_test_filename_regex           = re.compile(
     textwrap.dedent(
         r"""(?#
-        Header 1        )----+\r?\n(?#
-        Test Name       )(?P<test_name>[^\r\n]+)\r?\n(?#
-        Header 2        )----+\r?\n(?#
-        Test Filename   )(?P<test_filename>[^\r\n]+)(?#
+        Test Filename   )(?P<test_filename>.+)(?#
         Test line       )(?:(?#
             Windows     )\((?P<test_line_windows>\d+)\)(?#
                         )|(?#
             Linux       ):(?P<test_line_linux>\d+)(?#
-                        ))\r?\n(?#
-        Header 3        )\.+\r?\n(?#
-        Benchmark hdr   )\s+benchmark name\s+samples.+?(?#
-        Header 4        )----+\r?\n(?#
+                        ))$(?#
         )""",
     ),
-    re.DOTALL | re.MULTILINE,
 )
+_ConsoleBenchmarkOutputExtractor_test_separator_regex          = re.compile(r"\.+$")
+_ConsoleBenchmarkOutputExtractor_benchmark_header_regex        = re.compile(r"\s*benchmark name\s+samples")
 
-_ExtractBenchmarkOutput_stats_regex         = re.compile(
+# Stats in the form (spanning 3 lines):
+#
+#     <name>                    <samples>     <iterations>  <estimated>
+#                               <mean>        <low mean>    <high mean>
+#                               <std dev>     <low std dev> <high std dev>
+#
+_ConsoleBenchmarkOutputExtractor_stats_regex                   = re.compile(
     textwrap.dedent(
         r"""(?#
         Name            )(?P<name>[^\n]+?)(?#
         Samples         )\s+(?P<samples>\d+)(?#
         Iterations      )\s+(?P<iterations>\d+)(?#
         Estimated       )\s+(?P<estimated>[\d\.]+) (?P<estimated_units>\S+)(?#
-        newline         )\s*\r?\n(?#
+        newline         )\s*\n(?#
         Mean            )\s+(?P<mean>[\d\.]+) (?P<mean_units>\S+)(?#
         Low Mean        )\s+(?P<low_mean>[\d\.]+) (?P<low_mean_units>\S+)(?#
         High Mean       )\s+(?P<high_mean>[\d\.]+) (?P<high_mean_units>\S+)(?#
-        newline         )\s*\r?\n(?#
+        newline         )\s*\n(?#
         Deviation       )\s+(?P<deviation>[\d\.]+) (?P<deviation_units>\S+)(?#
         Low Deviation   )\s+(?P<low_deviation>[\d\.]+) (?P<low_deviation_units>\S+)(?#
         High Deviation  )\s+(?P<high_deviation>[\d\.]+) (?P<high_deviation_units>\S+)(?#
-        newline         )\s*\r?\n(?#
+        newline         )\s*$(?#
         )""",
     ),
-    re.DOTALL | re.MULTILINE,
 )
 
+_ConsoleBenchmarkOutputExtractor_stats_num_lines               = 3
+
+
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
 # ----------------------------------------------------------------------
-def ExtractBenchmarkOutput(output):
-    benchmarks = OrderedDict()
+class BenchmarkOutputExtractor(object):
+    """\
+    Extracts benchmark information from Catch2 output provided one line at a time;
+    the memory used is independent of the size of the output.
+
+    Output generated by the XML reporter is preferred, as its format is stable across
+    Catch2 versions and platforms; console output is used as a fallback.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._xml_extractor                 = XmlBenchmarkOutputExtractor()
+        self._console_extractor             = ConsoleBenchmarkOutputExtractor()
+
+    # ----------------------------------------------------------------------
+    @property
+    def Succeeded(self):
+        """See `XmlBenchmarkOutputExtractor.Succeeded`"""
+        return self._xml_extractor.Succeeded
+
+    # ----------------------------------------------------------------------
+    def ParseLine(self, line):
+        self._xml_extractor.ParseLine(line)
+        self._console_extractor.ParseLine(line)
+
+    # ----------------------------------------------------------------------
+    def Finish(self):
+        """Returns the benchmarks extracted from all lines parsed"""
+
+        # Output may contain content from both reporters (for example, when the output
+        # is generated by multiple executables).
+        benchmarks = self._console_extractor.Finish()
+        benchmarks.update(self._xml_extractor.Finish())
+
+        return benchmarks
+
+
+# ----------------------------------------------------------------------
+class XmlBenchmarkOutputExtractor(object):
+    """Extracts benchmark information from output generated by the Catch2 XML reporter"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._benchmarks                    = OrderedDict()
+        self._succeeded                     = None
+
+        # Values associated with the current document
+        self._parser                        = None
+        self._element_stack                 = []
 
-    for match in _ExtractBenchmarkOutput_content_regex.finditer(output):
-        name = match.group("name")
-        catch_version = "Catch v{}".format(match.group("catch_version"))
-        content = match.group("content")
+    # ----------------------------------------------------------------------
+    @property
+    def Succeeded(self):
+        """\
+        True if all of the XML documents parsed indicate success, False if any indicate
+        failure, or None if no (complete) XML documents were found.
+        """
+        return self._succeeded
+
+    # ----------------------------------------------------------------------
+    def ParseLine(self, line):
+        if self._parser is None:
+            if not line.lstrip().startswith("<?xml"):
+                return
+
+            self._parser = ElementTree.XMLPullParser(["start", "end"])
+            self._element_stack = []
+
+        try:
+            self._parser.feed(line.rstrip("\r\n") + "\n")
+
+            for event, element in self._parser.read_events():
+                if event == "start":
+                    self._element_stack.append(element)
+                    continue
+
+                self._element_stack.pop()
+
+                if element.tag == "TestCase":
+                    self._OnTestCase(element)
+
+                    # Remove the content so that memory doesn't grow with the size of
+                    # the output.
+                    element.clear()
+
+                    if self._element_stack:
+                        self._element_stack[-1].remove(element)
+
+                elif not self._element_stack:
+                    self._OnDocument(element)
+
+        except ElementTree.ParseError:
+            # The output wasn't generated by the XML reporter (or was interleaved with
+            # other output); discard the document.
+            self._parser = None
+
+    # ----------------------------------------------------------------------
+    def Finish(self):
+        """Returns the benchmarks extracted from all lines parsed"""
+
+        # Documents that weren't terminated are incomplete and are not included
+        return self._benchmarks
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _OnTestCase(self, element):
+        catch_element = self._element_stack[0]
 
-        these_benchmarks = []
         dest_units = "ns"
 
-        for match in RegularExpression.Generate(
-            _ExtractBenchmarkOutput_benchmarks_regex,
-            content,
-            leading_delimiter=True,
-        ):
-            # If there is only one match, that means nothing was found
-            if len(match) == 1:
-                assert None in match, match
+        # Benchmarks may be nested within sections
+        for benchmark_element in element.iter("BenchmarkResults"):
+            mean_element = benchmark_element.find("mean")
+            deviation_element = benchmark_element.find("standardDeviation")
+
+            # A failed benchmark won't contain results
+            if mean_element is None or deviation_element is None:
                 continue
 
-            test_line = match["test_line_windows"]
-            if test_line is None:
-                test_line = match["test_line_linux"]
-                if test_line is None:
-                    assert False
-
-            for stats in _ExtractBenchmarkOutput_stats_regex.finditer(match[None]):
-                these_benchmarks.append(
-                    TestParserImpl.BenchmarkStat(
-                        "{} - {}".format(match["test_name"], stats.group("name")),
-                        match["test_filename"],
-                        int(test_line),
-                        catch_version,
-                        TestParserImpl.BenchmarkStat.ConvertTime(
-                            float(stats.group("low_mean")),
-                            stats.group("low_mean_units"),
-                            dest_units,
-                        ),
-                        TestParserImpl.BenchmarkStat.ConvertTime(
-                            float(stats.group("high_mean")),
-                            stats.group("high_mean_units"),
-                            dest_units,
-                        ),
-                        TestParserImpl.BenchmarkStat.ConvertTime(
-                            float(stats.group("mean")),
-                            stats.group("mean_units"),
-                            dest_units,
-                        ),
-                        TestParserImpl.BenchmarkStat.ConvertTime(
-                            float(stats.group("deviation")),
-                            stats.group("deviation_units"),
-                            dest_units,
-                        ),
-                        int(stats.group("samples")),
-                        dest_units,
-                        int(stats.group("iterations")),
-                    ),
-                )
-
-        if these_benchmarks:
-            benchmarks[name] = these_benchmarks
-
-    return benchmarks
+            # Results generated via BenchmarkRunner are tagged with the CPUs they ran on
+            extractor = "Catch2 XML"
+
+            cpus = benchmark_element.get("cpus")
+            if cpus:
+                extractor += " (CPUs {})".format(cpus)
+
+            # All values are in nanoseconds
+            self._benchmarks.setdefault(catch_element.get("name"), []).append(
+                TestParserImpl.BenchmarkStat(
+                    "{} - {}".format(element.get("name"), benchmark_element.get("name")),
+                    element.get("filename"),
+                    int(element.get("line")),
+                    extractor,
+                    float(mean_element.get("lowerBound")),
+                    float(mean_element.get("upperBound")),
+                    float(mean_element.get("value")),
+                    float(deviation_element.get("value")),
+                    int(benchmark_element.get("samples")),
+                    dest_units,
+                    int(benchmark_element.get("iterations")),
+                ),
+            )
+
+    # ----------------------------------------------------------------------
+    def _OnDocument(self, element):
+        overall_results_element = element.find("OverallResults")
+
+        succeeded = (
+            overall_results_element is not None
+            and overall_results_element.get("failures") == "0"
+        )
+
+        self._succeeded = succeeded if self._succeeded is None else (self._succeeded and succeeded)
+        self._parser = None
+
+
+# ----------------------------------------------------------------------
+class ConsoleBenchmarkOutputExtractor(object):
+    """\
+    Extracts benchmark information from output generated by the Catch2 console
+    reporter.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._benchmarks                    = OrderedDict()
+
+        self._prev_line                     = None
+
+        # Values associated with the current section
+        self._section_name                  = None
+        self._section_catch_version         = None
+        self._section_benchmarks            = None
+
+        # The most recent lines within the section (used to detect test headers)
+        self._recent_lines                  = deque(maxlen=4)
+
+        # Test info associated with a test header that may be followed by a benchmark header
+        self._pending_test_info             = None
+        self._is_pending_benchmark_header   = False
+
+        # Test info associated with the benchmark stats currently being processed
+        self._test_info                     = None
+        self._stats_lines                   = deque(maxlen=_ConsoleBenchmarkOutputExtractor_stats_num_lines)
+
+    # ----------------------------------------------------------------------
+    def ParseLine(self, line):
+        line = line.rstrip("\r\n")
+
+        prev_line = self._prev_line
+        self._prev_line = line
+
+        if self._section_name is None:
+            if prev_line is not None and _ConsoleBenchmarkOutputExtractor_section_header_regex.search(prev_line):
+                match = _ConsoleBenchmarkOutputExtractor_section_name_regex.match(line)
+                if match:
+                    self._BeginSection(match.group("name"), match.group("catch_version"))
+
+            return
+
+        if _ConsoleBenchmarkOutputExtractor_section_footer_regex.search(line):
+            self._EndSection()
+            return
+
+        self._ParseSectionLine(line)
+
+    # ----------------------------------------------------------------------
+    def Finish(self):
+        """Returns the benchmarks extracted from all lines parsed"""
+
+        # Sections without a footer are incomplete and are not included
+        return self._benchmarks
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _BeginSection(self, name, catch_version):
+        self._section_name = name
+        self._section_catch_version = "Catch v{}".format(catch_version)
+        self._section_benchmarks = []
+
+        self._recent_lines.clear()
+        self._pending_test_info = None
+        self._is_pending_benchmark_header = False
+        self._test_info = None
+        self._stats_lines.clear()
+
+    # ----------------------------------------------------------------------
+    def _EndSection(self):
+        if self._section_benchmarks:
+            self._benchmarks[self._section_name] = self._section_benchmarks
+
+        self._section_name = None
+        self._section_catch_version = None
+        self._section_benchmarks = None
+
+    # ----------------------------------------------------------------------
+    def _ParseSectionLine(self, line):
+        if self._is_pending_benchmark_header:
+            # Wait for the line that terminates the benchmark header
+            if _ConsoleBenchmarkOutputExtractor_test_header_regex.search(line):
+                self._test_info = self._pending_test_info
+                self._pending_test_info = None
+                self._is_pending_benchmark_header = False
+
+                self._stats_lines.clear()
+                self._recent_lines.clear()
+
+            return
+
+        if self._pending_test_info is not None:
+            if not line.strip():
+                return
+
+            if _ConsoleBenchmarkOutputExtractor_benchmark_header_regex.match(line):
+                self._is_pending_benchmark_header = True
+                return
+
+            # This wasn't a benchmark test
+            self._pending_test_info = None
+
+        if (
+            len(self._recent_lines) == self._recent_lines.maxlen
+            and _ConsoleBenchmarkOutputExtractor_test_separator_regex.match(line)
+        ):
+            test_info = self._CreateTestInfo(*self._recent_lines)
+            if test_info is not None:
+                self._pending_test_info = test_info
+
+        self._recent_lines.append(line)
+
+        if self._test_info is not None:
+            self._ParseStatsLine(line)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _CreateTestInfo(header1, test_name, header2, test_filename):
+        if (
+            not _ConsoleBenchmarkOutputExtractor_test_header_regex.search(header1)
+            or not test_name
+            or not _ConsoleBenchmarkOutputExtractor_test_header_regex.match(header2)
+        ):
+            return None
+
+        match = _ConsoleBenchmarkOutputExtractor_test_filename_regex.match(test_filename)
+        if not match:
+            return None
+
+        test_line = match.group("test_line_windows")
+        if test_line is None:
+            test_line = match.group("test_line_linux")
+            assert test_line is not None
+
+        return test_name, match.group("test_filename"), int(test_line)
+
+    # ----------------------------------------------------------------------
+    def _ParseStatsLine(self, line):
+        self._stats_lines.append(line)
+
+        if len(self._stats_lines) != self._stats_lines.maxlen:
+            return
+
+        stats = _ConsoleBenchmarkOutputExtractor_stats_regex.search("\n".join(self._stats_lines))
+        if not stats:
+            return
+
+        self._stats_lines.clear()
+
+        test_name, test_filename, test_line = self._test_info
+        dest_units = "ns"
+
+        self._section_benchmarks.append(
+            TestParserImpl.BenchmarkStat(
+                "{} - {}".format(test_name, stats.group("name")),
+                test_filename,
+                test_line,
+                self._section_catch_version,
+                TestParserImpl.BenchmarkStat.ConvertTime(
+                    float(stats.group("low_mean")),
+                    stats.group("low_mean_units"),
+                    dest_units,
+                ),
+                TestParserImpl.BenchmarkStat.ConvertTime(
+                    float(stats.group("high_mean")),
+                    stats.group("high_mean_units"),
+                    dest_units,
+                ),
+                TestParserImpl.BenchmarkStat.ConvertTime(
+                    float(stats.group("mean")),
+                    stats.group("mean_units"),
+                    dest_units,
+                ),
+                TestParserImpl.BenchmarkStat.ConvertTime(
+                    float(stats.group("deviation")),
+                    stats.group("deviation_units"),
+                    dest_units,
+                ),
+                int(stats.group("samples")),
+                dest_units,
+                int(stats.group("iterations")),
+            ),
+        )
+
+
+# ----------------------------------------------------------------------
+def ExtractBenchmarkOutput(output):
+    extractor = BenchmarkOutputExtractor()
+
+    for line in EnumLines(output):
+        extractor.ParseLine(line)
+
+    return extractor.Finish()
+
+
+# ----------------------------------------------------------------------
+def EnumLines(content):
+    """Generates the lines in content without creating a copy of the content"""
+
+    start = 0
+
+    while True:
+        end = content.find("\n", start)
+        if end == -1:
+            break
+
+        yield content[start:end]
+        start = end + 1
+
+    if start < len(content):
+        yield content[start:]